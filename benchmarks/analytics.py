@@ -0,0 +1,65 @@
+"""Time each section of the platform analytics report on synthetic data
+
+Usage: python -m benchmarks.analytics [--allocations N] [--repeat N]
+"""
+
+import argparse
+import statistics
+import time
+from benchmarks.common import setup_django, test_database
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--allocations", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from decimal import Decimal
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+    from impactreeapi import synthetic
+    from impactreeapi.views import analytics
+
+    with test_database():
+        started = time.perf_counter()
+        created = synthetic.generate(allocations=args.allocations)
+        print(
+            f"generated {created['allocations']} allocations across"
+            f" {created['impact_plans']} plans"
+            f" in {time.perf_counter() - started:.1f}s"
+        )
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="bench", is_staff=True))
+
+        def send():
+            response = client.get("/analytics?refresh=true")
+            assert response.status_code == 200, response.status_code
+
+        sections = {
+            "by_charity + by_category": analytics.dollars_by_charity,
+            "by_milestone": analytics.dollars_by_milestone,
+            "philanthropy_percentage": lambda: analytics.philanthropy_distribution(
+                Decimal("1")
+            ),
+            "GET /analytics?refresh=true": send,
+            "GET /analytics (cached)": lambda: client.get("/analytics"),
+        }
+        for name, function in sections.items():
+            print(f"{name:<30} {timed(function, args.repeat):>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Load test the read endpoints under gunicorn in WSGI and ASGI mode
+
+Starts gunicorn once per SERVER_MODE against the project's db.sqlite3,
+which must already be migrated and seeded (see the README), and sends
+concurrent authenticated GET requests from a pool of client threads.
+
+Usage: python -m benchmarks.asgi_vs_wsgi [--duration S] [--clients N] [--workers N]
+"""
+
+import argparse
+import statistics
+from benchmarks.common import gunicorn_server, run_clients, setup_django
+
+PATHS = ["/charities", "/milestones", "/impactplans"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.authtoken.models import Token
+
+    token = Token.objects.first()
+    if token is None:
+        raise SystemExit("db.sqlite3 has no tokens; seed it as described in the README")
+
+    print(f"{args.clients} clients, {args.workers} workers, {args.duration:.0f}s")
+    headers = {"Authorization": "Token " + token.key}
+    for mode in ("wsgi", "asgi"):
+        env = {"SERVER_MODE": mode, "WEB_CONCURRENCY": str(args.workers)}
+        with gunicorn_server(args.port, env):
+            run_clients(args.port, PATHS, headers, args.clients, 1.0)
+            rate, latencies = run_clients(
+                args.port, PATHS, headers, args.clients, args.duration
+            )
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{mode}  {rate:>8.1f} req/s"
+            f"  p50 {quantiles[49]:>7.1f} ms  p99 {quantiles[98]:>7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import contextlib
+import http.client
+import os
+import subprocess
+import threading
+import time
+
+
+def setup_django():
+    """Configure Django for a benchmark run outside manage.py"""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "impactreeproject.settings")
+    os.environ.setdefault("DJANGO_ALLOWED_HOSTS", "testserver,localhost")
+    import django
+
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """Create the test database for the duration of the block"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    # DEBUG would keep a log of every query, which production does not
+    setup_test_environment(debug=False)
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def requests_per_second(send, duration=3.0, warmup=20):
+    """Call send() repeatedly for duration seconds and return the call rate"""
+    for _ in range(warmup):
+        send()
+    count = 0
+    started = time.perf_counter()
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        send()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def wait_for_server(port, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("localhost", port, timeout=1)
+            connection.request("HEAD", "/")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"gunicorn did not start on port {port}")
+
+
+@contextlib.contextmanager
+def gunicorn_server(port, env):
+    """Run gunicorn.conf.py on port with extra environment variables"""
+    env = dict(os.environ, PORT=str(port), DJANGO_ALLOWED_HOSTS="localhost", **env)
+    server = subprocess.Popen(
+        ["gunicorn", "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_server(port)
+        yield server
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def run_clients(port, paths, headers, clients, duration):
+    """GET paths round-robin from client threads for duration seconds
+
+    Returns (requests/sec, latencies in ms).
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection("localhost", port, timeout=30)
+        local = []
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            connection.request("GET", paths[i % len(paths)], headers=headers)
+            response = connection.getresponse()
+            response.read()
+            local.append((time.perf_counter() - started) * 1000)
+            if response.status != 200:
+                errors.append(response.status)
+            i += 1
+        connection.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if errors:
+        raise RuntimeError(f"{len(errors)} requests failed, e.g. {errors[0]}")
+    return len(latencies) / elapsed, latencies
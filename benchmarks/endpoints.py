@@ -0,0 +1,589 @@
+"""Latency, query count and peak memory for every API route
+
+Seeds a throwaway test database with impactreeapi.synthetic, then sends each
+scenario through the test client: every method of every route registered on
+the DefaultRouter in impactreeproject/urls.py, plus login and register. A
+router route without a scenario stops the run, so new endpoints cannot be
+left out. Whatever a write scenario needs (a row to delete, a user without a
+plan) is set up outside the timed request.
+
+Results are written as JSON. With --baseline the run is compared against an
+earlier results file, and the script exits with status 1 when a scenario got
+slower than --tolerance allows, ran more queries or peaked higher in memory.
+
+Usage: python -m benchmarks.endpoints [--allocations N] [--iterations N]
+           [--only REGEX] [--output FILE] [--baseline FILE] [--tolerance F]
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from benchmarks.common import setup_django, test_database
+
+PASSWORD = "benchmark-password"
+
+
+def router_routes():
+    """(url name, HTTP method) for every route the API router serves"""
+    from rest_framework import routers
+    from impactreeproject.urls import build_router
+
+    router = build_router(routers.DefaultRouter)
+    routes = {(router.root_view_name, "GET")}
+    for prefix, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            name = route.name.format(basename=basename)
+            for method in router.get_method_map(viewset, route.mapping):
+                routes.add((name, method.upper()))
+    return routes
+
+
+def build_fixture():
+    """Clients and rows the scenarios share"""
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+    from impactreeapi.models import (
+        Charity,
+        CharityCategory,
+        ImpactPlan,
+        ImpactPlanCharity,
+        Milestone,
+    )
+
+    def client_for(user):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+        return client
+
+    admin = User.objects.create_user(
+        username="bench-admin", password=PASSWORD, is_staff=True
+    )
+    # login answers with the user's existing token
+    login_user = User.objects.create_user(username="bench-login", password=PASSWORD)
+    Token.objects.create(user=login_user)
+    plan = ImpactPlan.objects.order_by("id").select_related("user").first()
+    allocation = ImpactPlanCharity.objects.filter(impact_plan=plan).first()
+    spare = Charity.objects.exclude(impactplancharity__impact_plan=plan).first()
+    return {
+        "admin": client_for(admin),
+        "owner": client_for(plan.user),
+        "anonymous": client_for(None),
+        "plan": plan,
+        "allocation": allocation,
+        "spare_charity": spare,
+        "charity": Charity.objects.order_by("id").first(),
+        "category": CharityCategory.objects.order_by("id").first(),
+        "milestone": Milestone.objects.create(
+            name="Benchmark",
+            description="Benchmark milestone",
+            required_percentage=99.99,
+            image_filename="",
+        ),
+    }
+
+
+def build_scenarios(fixture):
+    """Map (url name, method) to (client, prepare, expected status)
+
+    prepare(i) runs untimed before the i-th request and returns the path and
+    the JSON body to send.
+    """
+    from django.contrib.auth.models import User
+    from impactreeapi.models import (
+        Charity,
+        CharityCategory,
+        ImpactPlan,
+        ImpactPlanCharity,
+        Milestone,
+    )
+
+    plan = fixture["plan"]
+    owner = plan.user
+    allocation = fixture["allocation"]
+    spare = fixture["spare_charity"]
+    charity = fixture["charity"]
+    category = fixture["category"]
+    milestone = fixture["milestone"]
+    # Unique suffixes for names and usernames across every scenario
+    sequence = itertools.count()
+
+    def without_spare_allocation():
+        ImpactPlanCharity.objects.filter(impact_plan=plan, charity=spare).delete()
+
+    def new_user(i):
+        return User.objects.create(username=f"bench-{next(sequence)}", password="!")
+
+    def new_plan(i):
+        return ImpactPlan.objects.create(
+            user=new_user(i),
+            annual_income=50000,
+            philanthropy_percentage=5,
+            total_annual_allocation=2500,
+        )
+
+    def new_spare_allocation(i):
+        without_spare_allocation()
+        return ImpactPlanCharity.objects.create(
+            impact_plan=plan, charity=spare, allocation_amount=100
+        )
+
+    def new_charity(i):
+        body = charity_body(i)
+        body["category_id"] = body.pop("category")
+        return Charity.objects.create(**body)
+
+    def charity_body(i):
+        return {
+            "name": f"Benchmark charity {next(sequence)}",
+            "description": "Benchmark",
+            "impact_metric": "trees planted",
+            "impact_ratio": 1.5,
+            "website_url": "https://example.org",
+            "category": category.pk,
+        }
+
+    def milestone_body(i):
+        return {
+            "name": f"Benchmark {next(sequence)}",
+            "description": "Benchmark milestone",
+            "required_percentage": 99.99,
+            "image_filename": "benchmark.png",
+        }
+
+    def register_body(i):
+        return {
+            "username": f"bench-register-{next(sequence)}",
+            "password": PASSWORD,
+            "email": "bench@example.org",
+            "first_name": "Bench",
+            "last_name": "Mark",
+        }
+
+    return {
+        ("api-root", "GET"): ("admin", lambda i: ("/", None), 200),
+        ("login", "POST"): (
+            "anonymous",
+            lambda i: ("/login", {"username": "bench-login", "password": PASSWORD}),
+            200,
+        ),
+        ("register", "POST"): (
+            "anonymous",
+            lambda i: ("/register", register_body(i)),
+            200,
+        ),
+        # Users
+        ("user-list", "GET"): ("admin", lambda i: ("/users", None), 200),
+        ("user-list", "POST"): (
+            "admin",
+            lambda i: ("/users", {"username": f"bench-user-{next(sequence)}"}),
+            201,
+        ),
+        ("user-detail", "GET"): ("admin", lambda i: (f"/users/{owner.pk}", None), 200),
+        ("user-detail", "PUT"): (
+            "admin",
+            lambda i: (
+                f"/users/{owner.pk}",
+                {"username": owner.username, "first_name": f"Owner {i}"},
+            ),
+            200,
+        ),
+        ("user-detail", "PATCH"): (
+            "admin",
+            lambda i: (f"/users/{owner.pk}", {"last_name": f"Owner {i}"}),
+            200,
+        ),
+        ("user-detail", "DELETE"): (
+            "admin",
+            lambda i: (f"/users/{new_user(i).pk}", None),
+            204,
+        ),
+        # Milestones
+        ("milestone-list", "GET"): ("admin", lambda i: ("/milestones", None), 200),
+        ("milestone-list", "POST"): (
+            "admin",
+            lambda i: ("/milestones", milestone_body(i)),
+            201,
+        ),
+        ("milestone-detail", "GET"): (
+            "admin",
+            lambda i: (f"/milestones/{milestone.pk}", None),
+            200,
+        ),
+        ("milestone-detail", "PUT"): (
+            "admin",
+            lambda i: (f"/milestones/{milestone.pk}", milestone_body(i)),
+            200,
+        ),
+        ("milestone-detail", "PATCH"): (
+            "admin",
+            lambda i: (f"/milestones/{milestone.pk}", {"description": f"Run {i}"}),
+            200,
+        ),
+        ("milestone-detail", "DELETE"): (
+            "admin",
+            lambda i: (
+                f"/milestones/{Milestone.objects.create(**milestone_body(i)).pk}",
+                None,
+            ),
+            204,
+        ),
+        # Categories
+        ("charitycategories-list", "GET"): (
+            "admin",
+            lambda i: ("/charitycategories", None),
+            200,
+        ),
+        ("charitycategories-list", "POST"): (
+            "admin",
+            lambda i: ("/charitycategories", {"name": f"Benchmark {next(sequence)}"}),
+            201,
+        ),
+        ("charitycategories-detail", "GET"): (
+            "admin",
+            lambda i: (f"/charitycategories/{category.pk}", None),
+            200,
+        ),
+        ("charitycategories-detail", "PUT"): (
+            "admin",
+            lambda i: (f"/charitycategories/{category.pk}", {"name": category.name}),
+            200,
+        ),
+        ("charitycategories-detail", "PATCH"): (
+            "admin",
+            lambda i: (f"/charitycategories/{category.pk}", {"name": category.name}),
+            200,
+        ),
+        ("charitycategories-detail", "DELETE"): (
+            "admin",
+            lambda i: (
+                "/charitycategories/"
+                + str(
+                    CharityCategory.objects.create(name=f"Delete {next(sequence)}").pk
+                ),
+                None,
+            ),
+            204,
+        ),
+        # Charities
+        ("charities-list", "GET"): ("admin", lambda i: ("/charities", None), 200),
+        ("charities-list", "POST"): (
+            "admin",
+            lambda i: ("/charities", charity_body(i)),
+            201,
+        ),
+        ("charities-detail", "GET"): (
+            "admin",
+            lambda i: (f"/charities/{charity.pk}", None),
+            200,
+        ),
+        ("charities-detail", "PUT"): (
+            "admin",
+            lambda i: (f"/charities/{charity.pk}", {"description": f"Run {i}"}),
+            204,
+        ),
+        ("charities-detail", "DELETE"): (
+            "admin",
+            lambda i: (
+                f"/charities/{new_charity(i).pk}",
+                None,
+            ),
+            204,
+        ),
+        # Impact plans
+        ("impactplans-list", "GET"): ("owner", lambda i: ("/impactplans", None), 200),
+        ("impactplans-list", "POST"): (
+            "admin",
+            lambda i: (
+                "/impactplans",
+                {
+                    "user": new_user(i).pk,
+                    "annual_income": 60000,
+                    "philanthropy_percentage": 5,
+                    "total_annual_allocation": 3000,
+                    "charities": [
+                        {"charity_id": charity.pk, "allocation_amount": 3000}
+                    ],
+                },
+            ),
+            201,
+        ),
+        ("impactplans-detail", "GET"): (
+            "owner",
+            lambda i: (f"/impactplans/{plan.pk}", None),
+            200,
+        ),
+        ("impactplans-detail", "PUT"): (
+            "owner",
+            lambda i: (
+                f"/impactplans/{plan.pk}",
+                {"philanthropy_percentage": 5 + i % 2},
+            ),
+            200,
+        ),
+        ("impactplans-detail", "DELETE"): (
+            "admin",
+            lambda i: (f"/impactplans/{new_plan(i).pk}", None),
+            204,
+        ),
+        # Allocations
+        ("impactplan_charities-list", "GET"): (
+            "owner",
+            lambda i: ("/impactplan_charities", None),
+            200,
+        ),
+        ("impactplan_charities-list", "POST"): (
+            "owner",
+            lambda i: (
+                without_spare_allocation() or "/impactplan_charities",
+                {
+                    "impact_plan_id": plan.pk,
+                    "charity_id": spare.pk,
+                    "allocation_amount": 250,
+                },
+            ),
+            201,
+        ),
+        ("impactplan_charities-detail", "PUT"): (
+            "owner",
+            lambda i: (
+                f"/impactplan_charities/{allocation.pk}",
+                {"allocation_amount": 100 + i % 2},
+            ),
+            200,
+        ),
+        ("impactplan_charities-detail", "DELETE"): (
+            "owner",
+            lambda i: (f"/impactplan_charities/{new_spare_allocation(i).pk}", None),
+            204,
+        ),
+        ("impactplan_charities-batch", "POST"): (
+            "owner",
+            lambda i: (
+                without_spare_allocation() or "/impactplan_charities/batch",
+                {
+                    "operations": [
+                        {
+                            "op": "update",
+                            "id": allocation.pk,
+                            "allocation_amount": 100 + i % 2,
+                        },
+                        {
+                            "op": "create",
+                            "impact_plan_id": plan.pk,
+                            "charity_id": spare.pk,
+                            "allocation_amount": 250,
+                        },
+                    ]
+                },
+            ),
+            200,
+        ),
+    }
+
+
+def measure(client, method, prepare, expected, iterations, sample):
+    """Time iterations requests, then profile sample more for queries and memory"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    counter = iter(range(sys.maxsize))
+
+    def send():
+        path, body = prepare(next(counter))
+        started = time.perf_counter()
+        response = client.generic(
+            method,
+            path,
+            json.dumps(body) if body is not None else "",
+            content_type="application/json",
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != expected:
+            raise RuntimeError(
+                f"{method} {path} returned {response.status_code}, expected"
+                f" {expected}: {response.content[:200]!r}"
+            )
+        return elapsed
+
+    for _ in range(2):
+        send()
+    # Start each scenario without garbage left over from the previous one
+    gc.collect()
+    latencies = [send() for _ in range(iterations)]
+
+    queries = []
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(sample):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            with CaptureQueriesContext(connection) as captured:
+                send()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            queries.append(len(captured.captured_queries))
+    finally:
+        tracemalloc.stop()
+
+    if len(latencies) > 1:
+        p99 = statistics.quantiles(latencies, n=100, method="inclusive")[98]
+    else:
+        p99 = latencies[0]
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(p99, 3),
+        "queries": int(statistics.median(queries)),
+        "max_queries": max(queries),
+        "peak_memory_kb": round(max(peaks) / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """List the ways results regressed against baseline"""
+    regressions = []
+    for name, old in baseline["results"].items():
+        new = results["results"].get(name)
+        if new is None:
+            continue
+        # p99 rests on the slowest few requests, so it gets twice the slack
+        for field, slack in (("p50_ms", 1), ("p99_ms", 2)):
+            limit = max(
+                old[field] * (1 + tolerance * slack),
+                old[field] + min_delta_ms * slack,
+            )
+            if new[field] > limit:
+                regressions.append(
+                    f"{name}: {field} {old[field]:.2f} -> {new[field]:.2f}"
+                )
+        if new["queries"] > old["queries"]:
+            regressions.append(f"{name}: queries {old['queries']} -> {new['queries']}")
+        limit = old["peak_memory_kb"] * (1 + tolerance) + 64
+        if new["peak_memory_kb"] > limit:
+            regressions.append(
+                f"{name}: peak memory {old['peak_memory_kb']:.0f} KB"
+                f" -> {new['peak_memory_kb']:.0f} KB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--allocations", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument(
+        "--auth-iterations",
+        type=int,
+        default=5,
+        help="iterations for login and register, which hash a password each",
+    )
+    parser.add_argument("--sample", type=int, default=5, help="profiled requests")
+    parser.add_argument("--only", help="regex on 'METHOD url-name'")
+    parser.add_argument("--output", default="benchmark-endpoints.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed fractional increase in p50 latency and memory",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=2.0,
+        help="p50 increases smaller than this (twice this for p99) always pass",
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["allocations"] != args.allocations:
+            raise SystemExit(
+                f"{args.baseline} was recorded with"
+                f" --allocations {baseline['meta']['allocations']}"
+            )
+
+    setup_django()
+
+    import django
+    from impactreeapi import synthetic
+
+    with test_database():
+        started = time.perf_counter()
+        created = synthetic.generate(allocations=args.allocations)
+        print(
+            f"seeded {created['allocations']} allocations,"
+            f" {created['impact_plans']} plans"
+            f" in {time.perf_counter() - started:.1f}s"
+        )
+
+        fixture = build_fixture()
+        scenarios = build_scenarios(fixture)
+        uncovered = router_routes() - set(scenarios)
+        if uncovered:
+            raise SystemExit(
+                "No benchmark scenario for: "
+                + ", ".join(f"{method} {name}" for name, method in sorted(uncovered))
+            )
+
+        results = {
+            "meta": {
+                "allocations": args.allocations,
+                "iterations": args.iterations,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            },
+            "results": {},
+        }
+        print(
+            f"{'scenario':<40} {'p50 ms':>8} {'p99 ms':>8} {'queries':>7} {'peak KB':>9}"
+        )
+        for (name, method), (client, prepare, expected) in sorted(scenarios.items()):
+            key = f"{method} {name}"
+            if args.only and not re.search(args.only, key):
+                continue
+            iterations = (
+                args.auth_iterations
+                if name in ("login", "register")
+                else args.iterations
+            )
+            result = measure(
+                fixture[client], method, prepare, expected, iterations, args.sample
+            )
+            results["results"][key] = result
+            print(
+                f"{key:<40} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}"
+                f" {result['queries']:>7} {result['peak_memory_kb']:>9.1f}"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"wrote {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regressions against {args.baseline}:")
+            for regression in regressions:
+                print("  " + regression)
+            raise SystemExit(1)
+        print(f"no regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
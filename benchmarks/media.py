@@ -0,0 +1,53 @@
+"""Throughput of /media/ with the development handler and the app handler
+
+Writes a throwaway file into MEDIA_ROOT, then starts gunicorn once per
+MEDIA_SERVING mode and downloads it from a pool of client threads.
+
+Usage: python -m benchmarks.media [--size KB] [--duration S] [--clients N]
+"""
+
+import argparse
+import os
+import statistics
+import uuid
+from benchmarks.common import gunicorn_server, run_clients
+
+MODES = ("static", "app")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=256, help="file size in KB")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    name = f"charityimages/benchmark-{uuid.uuid4()}.png"
+    path = os.path.join("media", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(os.urandom(args.size * 1024))
+
+    print(f"{args.size} KB file, {args.clients} clients, {args.workers} workers")
+    try:
+        for mode in MODES:
+            env = {"MEDIA_SERVING": mode, "WEB_CONCURRENCY": str(args.workers)}
+            with gunicorn_server(args.port, env):
+                paths = ["/media/" + name]
+                run_clients(args.port, paths, {}, args.clients, 1.0)
+                rate, latencies = run_clients(
+                    args.port, paths, {}, args.clients, args.duration
+                )
+            quantiles = statistics.quantiles(latencies, n=100)
+            print(
+                f"{mode:<7} {rate:>8.1f} req/s  {rate * args.size / 1024:>7.1f} MB/s"
+                f"  p50 {quantiles[49]:>6.1f} ms  p99 {quantiles[98]:>6.1f} ms"
+            )
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
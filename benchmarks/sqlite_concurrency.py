@@ -0,0 +1,222 @@
+"""Concurrent plan writes against SQLite with and without the performance profile
+
+Builds a migrated SQLite file with users and charities, then for each
+SQLITE_PERFORMANCE_PROFILE setting starts gunicorn with several worker
+processes on a fresh copy of it. Writer threads create impact plans and then
+rebalance each one through the batch endpoint while reader threads list plans,
+and the script reports throughput, latency and how many requests failed with
+"database is locked".
+
+Usage: python -m benchmarks.sqlite_concurrency [--duration S] [--writers N]
+                                               [--readers N] [--workers N]
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from benchmarks.common import gunicorn_server
+
+CHARITIES = 20
+
+
+def prepare(path, users):
+    """Migrate a new SQLite file at path and fill it; returns a token key"""
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["SQLITE_DB_PATH"] = path
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "impactreeproject.settings")
+    import django
+
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from rest_framework.authtoken.models import Token
+    from impactreeapi.models import Charity
+
+    call_command("migrate", verbosity=0)
+    admin = User.objects.create(username="benchmark", is_staff=True)
+    token = Token.objects.create(user=admin)
+    User.objects.bulk_create(
+        User(username=f"writer-{index}", password="!") for index in range(users)
+    )
+    for index in range(CHARITIES):
+        Charity.objects.create(name=f"Charity {index}", impact_ratio=1.0 + index)
+    connection.close()
+    return token.key
+
+
+def run(port, headers, user_ids, charity_ids, writers, readers, duration):
+    results = {"write": [], "read": [], "locked": 0, "failed": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def request(connection, method, path, body=None):
+        started = time.perf_counter()
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        payload = response.read()
+        return response.status, payload, (time.perf_counter() - started) * 1000
+
+    def record(latencies, status, payload, elapsed, expected):
+        if status == expected:
+            latencies.append(elapsed)
+            return 0, 0
+        if b"database is locked" in payload:
+            return 1, 0
+        return 0, 1
+
+    def writer():
+        connection = http.client.HTTPConnection("localhost", port, timeout=60)
+        latencies, locked, failed = [], 0, 0
+        while time.perf_counter() < deadline:
+            with lock:
+                user_id = next(user_ids)
+            first = user_id % CHARITIES
+            body = json.dumps(
+                {
+                    "user": user_id,
+                    "annual_income": 60000,
+                    "philanthropy_percentage": 5,
+                    "total_annual_allocation": 3000,
+                    "charities": [
+                        {"charity_id": charity_id, "allocation_amount": 1000}
+                        for charity_id in charity_ids[first : first + 3]
+                    ],
+                }
+            )
+            status, payload, elapsed = request(connection, "POST", "/impactplans", body)
+            errors = record(latencies, status, payload, elapsed, 201)
+            if status == 201:
+                # Rebalance the new plan: the delete reads before it writes,
+                # which is where deferred transactions fail to get the lock
+                plan = json.loads(payload)
+                allocations = [row["id"] for row in plan["charities"]]
+                body = json.dumps(
+                    {
+                        "operations": [
+                            {
+                                "op": "update",
+                                "id": allocations[0],
+                                "allocation_amount": 2000,
+                            },
+                            {"op": "delete", "id": allocations[1]},
+                            {
+                                "op": "create",
+                                "impact_plan_id": plan["id"],
+                                "charity_id": charity_ids[first + 3],
+                                "allocation_amount": 500,
+                            },
+                        ]
+                    }
+                )
+                status, payload, elapsed = request(
+                    connection, "POST", "/impactplan_charities/batch", body
+                )
+                errors = record(latencies, status, payload, elapsed, 200)
+            locked += errors[0]
+            failed += errors[1]
+        connection.close()
+        with lock:
+            results["write"].extend(latencies)
+            results["locked"] += locked
+            results["failed"] += failed
+
+    def reader():
+        connection = http.client.HTTPConnection("localhost", port, timeout=60)
+        latencies, locked, failed = [], 0, 0
+        while time.perf_counter() < deadline:
+            status, payload, elapsed = request(
+                connection, "GET", "/impactplans?page_size=20"
+            )
+            errors = record(latencies, status, payload, elapsed, 200)
+            locked += errors[0]
+            failed += errors[1]
+        connection.close()
+        with lock:
+            results["read"].extend(latencies)
+            results["locked"] += locked
+            results["failed"] += failed
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results["elapsed"] = time.perf_counter() - started
+    return results
+
+
+def p99(latencies):
+    if len(latencies) < 2:
+        return float("nan")
+    return statistics.quantiles(latencies, n=100)[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        template = os.path.join(directory, "template.sqlite3")
+        token = prepare(template, users=20_000)
+        headers = {
+            "Authorization": "Token " + token,
+            "Content-Type": "application/json",
+        }
+
+        print(
+            f"{args.workers} gunicorn workers, {args.writers} writers,"
+            f" {args.readers} readers, {args.duration:.0f}s"
+        )
+        for profile in ("False", "True"):
+            path = os.path.join(directory, f"profile-{profile}.sqlite3")
+            shutil.copy(template, path)
+            env = {
+                "SQLITE_DB_PATH": path,
+                "SQLITE_PERFORMANCE_PROFILE": profile,
+                "WEB_CONCURRENCY": str(args.workers),
+            }
+            # User 1 is the benchmark admin; writers take the rest in order
+            user_ids = itertools.count(2)
+            charity_ids = list(range(1, CHARITIES + 1)) * 2
+            with gunicorn_server(args.port, env):
+                results = run(
+                    args.port,
+                    headers,
+                    user_ids,
+                    charity_ids,
+                    args.writers,
+                    args.readers,
+                    args.duration,
+                )
+            elapsed = results["elapsed"]
+            print(
+                f"profile={profile:<5}"
+                f"  writes {len(results['write']) / elapsed:>7.1f}/s"
+                f" p99 {p99(results['write']):>7.1f} ms"
+                f"  reads {len(results['read']) / elapsed:>7.1f}/s"
+                f" p99 {p99(results['read']):>7.1f} ms"
+                f"  locked {results['locked']:>5}  other errors {results['failed']}"
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Cold start: import time, database preparation and gunicorn boot
+
+Reports three things a new container waits on:
+
+  imports   -- python -X importtime for loading the WSGI app and its
+               URLconf, as a worker does, grouped by top-level package and
+               with the slowest single modules
+  database  -- migrate + seed into an empty SQLite file, against copying
+               the snapshot the Dockerfile bakes in
+  gunicorn  -- with GUNICORN_PRELOAD off and on: time from launch to the
+               first response, the first request's latency, and the
+               workers' memory (PSS, which splits shared pages between the
+               processes sharing them, and USS, the pages only that worker
+               holds)
+
+Usage: python -m benchmarks.startup [--workers N] [--runs N] [--top N]
+"""
+
+import argparse
+import http.client
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LOAD_APP = (
+    "from impactreeproject.wsgi import application\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+
+def environment(**extra):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE="impactreeproject.settings")
+    env.pop("DATABASE_URL", None)
+    env.update(extra)
+    return env
+
+
+def import_times(env):
+    """[(module, self us)] for loading the app once"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", LOAD_APP],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us)))
+    return rows
+
+
+def report_imports(env, top):
+    rows = import_times(env)
+    packages = {}
+    for name, self_us in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    total = sum(packages.values())
+    print(f"imports: {len(rows)} modules, {total / 1000:.0f} ms")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<28} {self_us / 1000:>7.1f} ms")
+    print("  slowest modules (self time):")
+    for name, self_us in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"    {name:<48} {self_us / 1000:>6.1f} ms")
+
+
+def run_manage(env, *args):
+    subprocess.run(
+        [sys.executable, "manage.py", *args],
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def report_database(directory, runs):
+    snapshot = os.path.join(directory, "snapshot.sqlite3")
+    run_manage(environment(SQLITE_DB_PATH=snapshot), "migrate", "--noinput")
+    run_manage(environment(SQLITE_DB_PATH=snapshot), "seed")
+
+    prepare, copy = [], []
+    for index in range(runs):
+        path = os.path.join(directory, f"fresh-{index}.sqlite3")
+        env = environment(SQLITE_DB_PATH=path)
+        started = time.perf_counter()
+        run_manage(env, "migrate", "--noinput")
+        run_manage(env, "seed", "--if-empty")
+        prepare.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        shutil.copy(snapshot, path + ".copy")
+        copy.append(time.perf_counter() - started)
+    print(
+        f"database: migrate + seed {statistics.median(prepare) * 1000:>7.0f} ms"
+        f"   copy snapshot {statistics.median(copy) * 1000:>5.1f} ms"
+    )
+    return snapshot
+
+
+def worker_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as file:
+        return [int(child) for child in file.read().split()]
+
+
+def memory_kb(pid):
+    """(PSS, USS) of a process in kB, from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+
+def get(port, path):
+    connection = http.client.HTTPConnection("localhost", port, timeout=5)
+    try:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def boot(port, env, workers):
+    """Launch gunicorn; returns (first response s, first request s, PSS, USS)"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        ["gunicorn", "--log-level", "warning"],
+        env=dict(env, PORT=str(port), WEB_CONCURRENCY=str(workers)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = started + 30
+        while True:
+            try:
+                request_started = time.perf_counter()
+                get(port, "/milestones")
+                break
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise RuntimeError("gunicorn did not start")
+                time.sleep(0.005)
+        first_response = time.perf_counter() - started
+        first_request = time.perf_counter() - request_started
+
+        # Let every worker finish booting and serve a few requests
+        while len(worker_pids(server.pid)) < workers:
+            time.sleep(0.05)
+        for _ in range(workers * 4):
+            get(port, "/milestones")
+        usage = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        return (
+            first_response,
+            first_request,
+            sum(pss for pss, _ in usage),
+            sum(uss for _, uss in usage),
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report_gunicorn(snapshot, directory, port, workers, runs):
+    print(f"gunicorn: {workers} workers, median of {runs} boots")
+    for preload in ("False", "True"):
+        results = []
+        for index in range(runs):
+            path = os.path.join(directory, f"boot-{preload}-{index}.sqlite3")
+            shutil.copy(snapshot, path)
+            env = environment(
+                SQLITE_DB_PATH=path,
+                GUNICORN_PRELOAD=preload,
+                DJANGO_ALLOWED_HOSTS="localhost",
+            )
+            results.append(boot(port, env, workers))
+        first_response, first_request, pss, uss = (
+            statistics.median(column) for column in zip(*results)
+        )
+        print(
+            f"  preload={preload:<5}"
+            f"  first response {first_response * 1000:>6.0f} ms"
+            f"  first request {first_request * 1000:>5.0f} ms"
+            f"  workers PSS {pss / 1024:>6.1f} MiB"
+            f"  USS {uss / 1024:>6.1f} MiB"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        report_imports(environment(), args.top)
+        snapshot = report_database(directory, args.runs)
+        report_gunicorn(snapshot, directory, args.port, args.workers, args.runs)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Requests/sec on an authenticated endpoint with and without the token cache
+
+Usage: python -m benchmarks.token_auth [--duration SECONDS]
+"""
+
+import argparse
+from benchmarks.common import requests_per_second, setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+    from impactreeapi.authentication import CachedTokenAuthentication
+    from impactreeapi.views import MilestoneViewSet
+
+    with test_database():
+        user = User.objects.create(username="benchmark")
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + token.key)
+
+        def send():
+            response = client.get("/milestones")
+            assert response.status_code == 200, response.status_code
+
+        results = {}
+        original = MilestoneViewSet.authentication_classes
+        try:
+            for authentication_class in (
+                TokenAuthentication,
+                CachedTokenAuthentication,
+            ):
+                MilestoneViewSet.authentication_classes = [authentication_class]
+                results[authentication_class.__name__] = requests_per_second(
+                    send, duration=args.duration
+                )
+        finally:
+            MilestoneViewSet.authentication_classes = original
+
+    baseline = results["TokenAuthentication"]
+    for name, rate in results.items():
+        print(f"{name:<28} {rate:>9.1f} req/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+#!/bin/bash
+# Runs once when the db volume is initialised: lets the replica service
+# stream WAL from the primary with the application's credentials
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -0,0 +1,61 @@
+"""Gunicorn settings, read automatically from the working directory
+
+SERVER_MODE picks the entrypoint:
+  wsgi (default) -- impactreeproject.wsgi on sync workers
+  asgi           -- impactreeproject.asgi on uvicorn workers, which enables
+                    the async read and auth views
+
+The worker count comes from WEB_CONCURRENCY, as usual for gunicorn.
+
+The app is loaded once in the arbiter, URLconf and views included, and the
+workers are forked from it. They start without importing anything and share
+its memory copy-on-write. Set GUNICORN_PRELOAD=False to load the app in each
+worker instead, which `gunicorn --reload` needs.
+
+With METRICS_DIR set, the arbiter clears the workers' metric files on startup
+and drops the gauges of each worker that exits; see impactreeapi.prometheus.
+"""
+
+import gc
+import os
+from impactreeapi.prometheus import clear_directory, mark_process_dead
+
+server_mode = os.getenv("SERVER_MODE", "wsgi")
+
+if server_mode == "asgi":
+    wsgi_app = "impactreeproject.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "impactreeproject.wsgi:application"
+    worker_class = "sync"
+
+bind = f":{os.getenv('PORT', '8000')}"
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+metrics_dir = os.getenv("METRICS_DIR")
+
+
+def on_starting(server):
+    if metrics_dir:
+        clear_directory(metrics_dir)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from django.db import connections
+    from django.urls import get_resolver
+
+    # Import every view now rather than on each worker's first request
+    get_resolver().url_patterns
+    # A connection opened while loading must not be shared by the workers
+    connections.close_all()
+    # Objects loaded so far are never collected, so the collector does not
+    # write to (and un-share) the pages they live on
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        mark_process_dead(metrics_dir, worker.pid)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ImpactreeapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'impactreeapi'
+
+    def ready(self):
+        from impactreeapi import signals  # noqa: F401
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+from django.core.cache import caches
+from impactreeapi.models import Charity, CharityCategory, TableVersion
+
+CATALOG_CACHE_ALIAS = "catalog"
+_MISSING = object()
+
+
+def request_cache_key(prefix, request):
+    """Build a cache key for a response that depends on the full request URL
+
+    Paginated responses embed absolute next/previous links, so the host and
+    query string are both part of the key.
+    """
+    digest = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def generation(snapshot):
+    """A cache namespace for a TableVersion.snapshot() result
+
+    The last change time is part of it, so a version number reused after a
+    rolled back bump never names entries cached inside that transaction.
+    """
+    versions, last_modified = snapshot
+    parts = [str(version) for table, version in sorted(versions.items())]
+    if last_modified is not None:
+        parts.append(str(int(last_modified.timestamp() * 1_000_000)))
+    return ".".join(parts)
+
+
+class CatalogCache:
+    """Cache for serialized charity catalog data
+
+    Every key is namespaced by the TableVersion rows of the catalog models,
+    read from the database for each lookup unless the caller passes the
+    snapshot it already took, e.g. the one conditional() stores on the
+    request. Saving or deleting a row in any worker bumps them, so every
+    process stops reading the entries cached before the change at once; they
+    then age out of the backend on their own.
+    """
+
+    def __init__(self, models, alias=CATALOG_CACHE_ALIAS):
+        self.models = models
+        self.alias = alias
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _versioned(self, key, snapshot=None):
+        if snapshot is None:
+            snapshot = TableVersion.snapshot(*self.models)
+        return f"catalog:{generation(snapshot)}:{key}"
+
+    async def _aversioned(self, key, snapshot=None):
+        if snapshot is None:
+            snapshot = await TableVersion.asnapshot(*self.models)
+        return f"catalog:{generation(snapshot)}:{key}"
+
+    def get_or_build(self, key, build, snapshot=None):
+        """Return the cached value for key, calling build() to fill a miss
+
+        ``snapshot`` is a TableVersion.snapshot() of the tables the value is
+        built from; when omitted, the catalog models are read.
+        """
+        versioned_key = self._versioned(key, snapshot)
+        value = self.backend.get(versioned_key, _MISSING)
+        if value is not _MISSING:
+            self._count(hit=True)
+            return value
+
+        self._count(hit=False)
+        value = build()
+        self.backend.set(versioned_key, value)
+        return value
+
+    async def aget_or_build(self, key, build, snapshot=None):
+        """Async version of get_or_build(); build() must return an awaitable"""
+        versioned_key = await self._aversioned(key, snapshot)
+        value = await self.backend.aget(versioned_key, _MISSING)
+        if value is not _MISSING:
+            self._count(hit=True)
+            return value
+
+        self._count(hit=False)
+        value = await build()
+        await self.backend.aset(versioned_key, value)
+        return value
+
+    def set(self, key, value):
+        """Write a freshly serialized value through to the cache"""
+        self.backend.set(self._versioned(key), value)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """Hit and miss counters for this process"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "backend": self.backend.__class__.__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+catalog_cache = CatalogCache((CharityCategory, Charity))
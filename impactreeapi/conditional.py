@@ -0,0 +1,88 @@
+import functools
+import hashlib
+import inspect
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from impactreeapi.models import TableVersion
+
+
+def _validators(request, versions, last_modified):
+    accepted_renderer = getattr(request, "accepted_renderer", None)
+    fingerprint = "|".join(
+        [
+            request.build_absolute_uri(),
+            getattr(accepted_renderer, "format", ""),
+            *(f"{table}={version}" for table, version in sorted(versions.items())),
+        ]
+    )
+    etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp
+
+
+def response_validators(request, models):
+    """Return (strong ETag, Last-Modified timestamp) for a read of ``models``
+
+    The ETag covers the table versions, the full request URL and the
+    negotiated format, so two responses only share one when their bytes
+    match. The versions are read from the database on every call, so each
+    worker sees a write as soon as it commits. The snapshot is kept on
+    ``request.table_snapshot`` for the action to key its cache with.
+    """
+    request.table_snapshot = TableVersion.snapshot(*models)
+    return _validators(request, *request.table_snapshot)
+
+
+async def aresponse_validators(request, models):
+    """Async version of response_validators()"""
+    request.table_snapshot = await TableVersion.asnapshot(*models)
+    return _validators(request, *request.table_snapshot)
+
+
+def _finish(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def conditional(*models):
+    """Decorate a ViewSet read action with ETag / Last-Modified handling
+
+    A request whose If-None-Match or If-Modified-Since still matches gets a
+    304 before the wrapped action runs, so nothing is queried or serialized.
+    Works on both regular and async actions.
+    """
+
+    def decorator(action):
+        if inspect.iscoroutinefunction(action):
+
+            @functools.wraps(action)
+            async def async_wrapper(view, request, *args, **kwargs):
+                etag, last_modified = await aresponse_validators(request, models)
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+                if response is None:
+                    response = await action(view, request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                return _finish(response, etag, last_modified)
+
+            return async_wrapper
+
+        @functools.wraps(action)
+        def wrapper(view, request, *args, **kwargs):
+            etag, last_modified = response_validators(request, models)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = action(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return _finish(response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
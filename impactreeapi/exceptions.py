@@ -0,0 +1,35 @@
+import logging
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler
+from rest_framework.views import set_rollback
+from impactreeapi.metrics import record_exception
+
+logger = logging.getLogger("impactreeapi.errors")
+
+
+def exception_handler(exc, context):
+    """DRF's handler, plus a JSON 500 naming the type of any other exception
+
+    The exception is logged with its traceback and counted in
+    impactree_request_exceptions_total; its message stays out of the
+    response.
+    """
+    response = drf_exception_handler(exc, context)
+    if response is not None:
+        return response
+
+    request = context["request"]
+    record_exception(request, exc)
+    logger.error(
+        "Unhandled %s in %s %s",
+        type(exc).__name__,
+        request.method,
+        request.path,
+        exc_info=exc,
+    )
+    set_rollback()
+    return Response(
+        {"message": "Internal server error", "error": type(exc).__name__},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    )
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+
+class PasswordHashPoolFull(Exception):
+    """Raised when more password hashes are waiting than the pool accepts"""
+
+
+class PasswordHashPool:
+    """Bounded thread pool for password hashing off the event loop
+
+    PBKDF2 in hashlib releases the GIL, so hashes run in parallel on the
+    worker threads while the event loop keeps serving other requests.
+    At most ``workers`` hashes run at once and at most ``max_pending``
+    may be queued or running; beyond that ``run`` raises
+    PasswordHashPoolFull rather than letting the backlog grow.
+    """
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor = None
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    def _call(self, func, args):
+        with self._lock:
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool and return its result"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHashPoolFull()
+            self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), self._call, func, args
+            )
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self.running,
+                "queue_depth": self.pending - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+password_hash_pool = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,124 @@
+import posixpath
+from io import BytesIO
+from django.core.files.base import ContentFile
+
+# Longest side in pixels for each derived size. Images are never upscaled.
+IMAGE_SIZES = {
+    "thumbnail": 160,
+    "medium": 480,
+}
+VARIANTS_DIR = "variants"
+
+
+def _fallback_format(name):
+    """PNG for anything but JPEG originals, so transparency survives"""
+    return "jpeg" if name.lower().endswith((".jpg", ".jpeg")) else "png"
+
+
+def variant_names(name):
+    """Map (size, format) to the storage name of each variant of ``name``
+
+    Variants live next to the original, under ``variants/``, and are named
+    after it, so they can be located without touching the database.
+    """
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    fallback = _fallback_format(name)
+    extensions = {"webp": "webp", "png": "png", "jpeg": "jpg"}
+    return {
+        (size, image_format): posixpath.join(
+            directory, VARIANTS_DIR, f"{stem}-{size}.{extensions[image_format]}"
+        )
+        for size in IMAGE_SIZES
+        for image_format in ("webp", fallback)
+    }
+
+
+def _render(original, longest_side, image_format):
+    from PIL import Image
+
+    image = original.copy()
+    image.thumbnail((longest_side, longest_side), Image.LANCZOS)
+    if image_format == "jpeg":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    buffer = BytesIO()
+    if image_format == "webp":
+        image.save(buffer, "WEBP", quality=80, method=4)
+    elif image_format == "jpeg":
+        image.save(buffer, "JPEG", quality=85, optimize=True, progressive=True)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def ensure_variants(field_file):
+    """Create any missing variants of an ImageField file and return their names
+
+    Variants already on disk are reused, so this is cheap to call again for
+    an image that has been processed. Returns an empty dict when there is no
+    image or it cannot be decoded.
+    """
+    if not field_file:
+        return {}
+
+    storage = field_file.storage
+    names = variant_names(field_file.name)
+    missing = {key: name for key, name in names.items() if not storage.exists(name)}
+    if not missing:
+        return names
+
+    # Pillow is only needed once an image is uploaded, so workers start
+    # without importing it
+    from PIL import Image, ImageOps
+
+    try:
+        with storage.open(field_file.name, "rb") as source:
+            original = Image.open(source)
+            original.load()
+    except (OSError, Image.DecompressionBombError):
+        return {}
+
+    # Apply the EXIF orientation once so every variant is upright
+    original = ImageOps.exif_transpose(original)
+    for (size, image_format), name in missing.items():
+        content = _render(original, IMAGE_SIZES[size], image_format)
+        storage.save(name, ContentFile(content))
+    return names
+
+
+def record_variants(field_file):
+    """Create the variants of an ImageField file and describe them for storage
+
+    Returns the value kept in Charity.image_variants: the image name the
+    variants were made from and {size: {format: name}} for those that
+    exist, which is empty when the image cannot be decoded.
+    """
+    names = {}
+    for (size, image_format), name in ensure_variants(field_file).items():
+        names.setdefault(size, {})[image_format] = name
+    return {"source": field_file.name or "", "names": names}
+
+
+def variants_outdated(field_file, record):
+    """Whether ``record`` was made from another image than ``field_file``"""
+    return (field_file.name or "") != (record or {}).get("source", "")
+
+
+def variant_urls(field_file, record):
+    """Return {size: {format: url}} for the variants recorded for an ImageField file
+
+    Only variants that record_variants() generated for the current image
+    are listed, and their URLs are built without touching storage.
+    """
+    if not field_file or variants_outdated(field_file, record):
+        return {}
+    storage = field_file.storage
+    return {
+        size: {
+            image_format: storage.url(name) for image_format, name in formats.items()
+        }
+        for size, formats in record["names"].items()
+    }
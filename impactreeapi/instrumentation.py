@@ -0,0 +1,267 @@
+"""Per-request timing and query instrumentation
+
+RequestInstrumentationMiddleware, enabled with REQUEST_INSTRUMENTATION=True,
+measures every request:
+
+  total      -- wall time spent in the rest of the middleware and the view
+  db         -- time spent executing SQL, and the number of queries
+  repeated   -- queries whose SQL ran more than once, the usual sign of an N+1
+  serialize  -- time spent in serializer .data, minus the SQL it ran
+
+The figures go out as a Server-Timing header and as one JSON log line per
+request on the "impactreeapi.requests" logger. request_stats also keeps the
+most recent REQUEST_INSTRUMENTATION_WINDOW requests of each view action, and
+GET /stats reports them.
+"""
+
+import functools
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework import serializers
+
+logger = logging.getLogger("impactreeapi.requests")
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+current_metrics = ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """What one request spent its time on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.db = 0.0
+        self.serialize = 0.0
+        self.queries = 0
+        self.statements = Counter()
+        self.serializing = False
+
+    def repeated(self):
+        """(sql, count) for each statement that ran more than once"""
+        return [(sql, count) for sql, count in self.statements.items() if count > 1]
+
+    def duplicate_queries(self):
+        return sum(count - 1 for sql, count in self.repeated())
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper that adds each query to the current request"""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.statements[sql] += 1
+
+
+def install_query_recorder(connection):
+    """Add record_query to a connection once; it stays for the connection's life"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_serializer_data(fget):
+    @functools.wraps(fget)
+    def data(self):
+        metrics = current_metrics.get()
+        # Nested and list serializers reach here again through super().data
+        if metrics is None or metrics.serializing:
+            return fget(self)
+        metrics.serializing = True
+        started = time.perf_counter()
+        db_before = metrics.db
+        try:
+            return fget(self)
+        finally:
+            metrics.serializing = False
+            elapsed = time.perf_counter() - started
+            metrics.serialize += elapsed - (metrics.db - db_before)
+
+    data.instrumented = True
+    return data
+
+
+def instrument_serializers():
+    """Time every serializer's .data; safe to call more than once"""
+    for cls in (
+        serializers.BaseSerializer,
+        serializers.Serializer,
+        serializers.ListSerializer,
+    ):
+        prop = cls.__dict__["data"]
+        if not getattr(prop.fget, "instrumented", False):
+            cls.data = property(timed_serializer_data(prop.fget))
+
+
+def view_label(request):
+    """ViewSet.action for router views, the view's name otherwise"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    cls = getattr(match.func, "cls", None)
+    if cls is None:
+        return match.func.__name__
+    actions = getattr(match.func, "actions", None)
+    if actions:
+        method = request.method.lower()
+        return f"{cls.__name__}.{actions.get(method, method)}"
+    return cls.__name__
+
+
+class RequestStats:
+    """Rolling window of recent requests for each view action"""
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._totals = Counter()
+
+    def record(self, label, metrics):
+        sample = (
+            metrics.total * 1000,
+            metrics.db * 1000,
+            metrics.queries,
+            metrics.duplicate_queries(),
+            metrics.serialize * 1000,
+        )
+        with self._lock:
+            samples = self._samples.get(label)
+            if samples is None:
+                samples = self._samples[label] = deque(maxlen=self.window)
+            samples.append(sample)
+            self._totals[label] += 1
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def stats(self):
+        with self._lock:
+            snapshot = {
+                label: list(samples) for label, samples in self._samples.items()
+            }
+            totals = dict(self._totals)
+        return {
+            label: summarize(samples, totals[label])
+            for label, samples in sorted(snapshot.items())
+        }
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(math.ceil(len(ordered) * fraction) - 1, 0)
+    return round(ordered[index], 3)
+
+
+def summarize(samples, total):
+    count = len(samples)
+    totals = sorted(sample[0] for sample in samples)
+    histogram = {}
+    for bound in LATENCY_BUCKETS_MS:
+        histogram[f"le_{bound}ms"] = sum(1 for value in totals if value <= bound)
+    histogram["inf"] = count
+    return {
+        "requests": total,
+        "window": count,
+        "total_ms": {
+            "p50": percentile(totals, 0.5),
+            "p90": percentile(totals, 0.9),
+            "p99": percentile(totals, 0.99),
+            "max": round(totals[-1], 3),
+        },
+        "db_ms_mean": round(sum(sample[1] for sample in samples) / count, 3),
+        "queries_mean": round(sum(sample[2] for sample in samples) / count, 2),
+        "duplicate_queries_max": max(sample[3] for sample in samples),
+        "serialize_ms_mean": round(sum(sample[4] for sample in samples) / count, 3),
+        "histogram": histogram,
+    }
+
+
+request_stats = RequestStats(
+    window=getattr(settings, "REQUEST_INSTRUMENTATION_WINDOW", 1000)
+)
+
+
+class RequestInstrumentationMiddleware:
+    """Measure each request, see the module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        instrument_serializers()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.finish(request, response, metrics)
+        return response
+
+    def finish(self, request, response, metrics):
+        metrics.total = time.perf_counter() - metrics.started
+        label = view_label(request)
+        duplicates = metrics.duplicate_queries()
+
+        response["Server-Timing"] = ", ".join(
+            [
+                f"total;dur={metrics.total * 1000:.1f}",
+                f'db;dur={metrics.db * 1000:.1f};desc="{metrics.queries} queries'
+                f' ({duplicates} repeated)"',
+                f"serialize;dur={metrics.serialize * 1000:.1f}",
+            ]
+        )
+        request_stats.record(label, metrics)
+
+        if logger.isEnabledFor(logging.INFO):
+            record = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "view": label,
+                "total_ms": round(metrics.total * 1000, 3),
+                "db_ms": round(metrics.db * 1000, 3),
+                "queries": metrics.queries,
+                "duplicate_queries": duplicates,
+                "serialize_ms": round(metrics.serialize * 1000, 3),
+            }
+            if duplicates:
+                record["repeated"] = [
+                    {"sql": sql[:200], "count": count}
+                    for sql, count in metrics.repeated()
+                ]
+            logger.info(json.dumps(record))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from impactreeapi.images import record_variants
+from impactreeapi.models import Charity, TableVersion
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the missing thumbnail and medium variants of every charity "
+        "image, e.g. for images uploaded before variants existed."
+    )
+
+    def handle(self, *args, **options):
+        built = failed = changed = 0
+        charities = Charity.objects.exclude(image="").exclude(image__isnull=True)
+        for charity in charities.only("id", "image", "image_variants").iterator():
+            record = record_variants(charity.image)
+            if record != charity.image_variants:
+                Charity.objects.filter(pk=charity.pk).update(image_variants=record)
+                changed += 1
+            if record["names"]:
+                built += 1
+            else:
+                failed += 1
+                self.stderr.write(
+                    f"  charity {charity.pk}: cannot decode {charity.image.name}"
+                )
+        if changed:
+            # Cached catalog responses still list the old variants
+            TableVersion.bump(Charity)
+        self.stdout.write(
+            self.style.SUCCESS(f"Variants ready for {built} images, {failed} failed")
+        )
@@ -0,0 +1,84 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from impactreeapi import synthetic
+from impactreeapi.seeding import fixture_names, load_fixtures
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk load the fixtures in impactreeapi/fixtures in one transaction, "
+        "and optionally generate synthetic users, plans and allocations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "fixtures",
+            nargs="*",
+            help="Fixture names to load (default: all of them)",
+        )
+        parser.add_argument(
+            "--if-empty",
+            action="store_true",
+            help="Do nothing when the database already has users",
+        )
+        parser.add_argument(
+            "--no-fixtures",
+            action="store_true",
+            help="Skip the fixtures, e.g. to only generate synthetic data",
+        )
+        parser.add_argument(
+            "--scale",
+            type=int,
+            default=0,
+            help="Also generate this many synthetic users with an impact plan each",
+        )
+        parser.add_argument(
+            "--per-plan",
+            type=int,
+            default=5,
+            help="Charity allocations per synthetic plan (default 5)",
+        )
+        parser.add_argument(
+            "--random-seed",
+            type=int,
+            default=0,
+            help="Seed for the synthetic data generator (default 0)",
+        )
+
+    def handle(self, *args, **options):
+        if options["if_empty"] and User.objects.exists():
+            self.stdout.write("Database already has users, nothing to seed")
+            return
+        if options["scale"] < 0:
+            raise CommandError("--scale must not be negative")
+
+        if not options["no_fixtures"]:
+            names = options["fixtures"] or fixture_names()
+            unknown = set(names) - set(fixture_names())
+            if unknown:
+                raise CommandError(f"Unknown fixtures: {', '.join(sorted(unknown))}")
+            started = time.perf_counter()
+            loaded = load_fixtures(names)
+            self.report(loaded, time.perf_counter() - started)
+
+        if options["scale"]:
+            per_plan = options["per_plan"]
+            started = time.perf_counter()
+            created = synthetic.generate(
+                allocations=options["scale"] * per_plan,
+                per_plan=per_plan,
+                seed=options["random_seed"],
+            )
+            self.report(created, time.perf_counter() - started)
+
+    def report(self, counts, elapsed):
+        total = sum(counts.values())
+        for name, count in counts.items():
+            self.stdout.write(f"  {name}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {total} rows in {elapsed:.2f}s"
+                f" ({total / elapsed if elapsed else 0:,.0f} rows/s)"
+            )
+        )
@@ -0,0 +1,176 @@
+"""The API's Prometheus metrics, served at GET /metrics
+
+MetricsMiddleware counts and times every request by view action, and
+impactreeapi.exceptions counts the unhandled exceptions that become 500s.
+Database connections are tracked through connection_created, and the cache
+and worker figures are read when /metrics is scraped.
+
+Set METRICS_DIR when gunicorn runs more than one worker process; see
+impactreeapi.prometheus.
+"""
+
+import threading
+import time
+import weakref
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from impactreeapi.authentication import token_cache
+from impactreeapi.cache import catalog_cache
+from impactreeapi.instrumentation import view_label
+from impactreeapi.prometheus import (
+    CallbackMetric,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+
+# Upper bounds of the request duration buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+registry = Registry(
+    directory=getattr(settings, "METRICS_DIR", None) or None,
+    flush_seconds=getattr(settings, "METRICS_FLUSH_SECONDS", 5),
+)
+
+requests_total = Counter(
+    registry,
+    "impactree_requests_total",
+    "Requests served, by view action, method and status code.",
+    ("view", "method", "status"),
+)
+request_duration = Histogram(
+    registry,
+    "impactree_request_duration_seconds",
+    "Time spent in the middleware and the view, by view action.",
+    ("view",),
+    buckets=DURATION_BUCKETS,
+)
+request_exceptions = Counter(
+    registry,
+    "impactree_request_exceptions_total",
+    "Unhandled exceptions answered with a 500, by view action and type.",
+    ("view", "exception"),
+)
+requests_in_progress = Gauge(
+    registry,
+    "impactree_requests_in_progress",
+    "Requests being handled. A sync worker handles one at a time, so this"
+    " divided by impactree_worker_processes is the share of busy workers.",
+)
+worker_processes = CallbackMetric(
+    registry,
+    "gauge",
+    "impactree_worker_processes",
+    "Worker processes reporting metrics.",
+    (),
+    lambda: {(): 1},
+)
+db_connections_opened = Counter(
+    registry,
+    "impactree_db_connections_opened_total",
+    "Database connections opened, by alias. A steady climb means"
+    " connections are not reused; see DATABASE_CONN_MAX_AGE.",
+    ("alias",),
+)
+
+# Every connection wrapper that has connected, across all threads
+_connections_lock = threading.Lock()
+_connections = weakref.WeakSet()
+
+
+def track_connection(connection):
+    db_connections_opened.inc(connection.alias)
+    with _connections_lock:
+        _connections.add(connection)
+
+
+def open_connections():
+    counts = {(alias,): 0 for alias in connections}
+    with _connections_lock:
+        wrappers = list(_connections)
+    for wrapper in wrappers:
+        if wrapper.connection is not None:
+            counts[(wrapper.alias,)] = counts.get((wrapper.alias,), 0) + 1
+    return counts
+
+
+db_connections = CallbackMetric(
+    registry,
+    "gauge",
+    "impactree_db_connections",
+    "Open database connections, by alias.",
+    ("alias",),
+    open_connections,
+)
+
+
+def cache_counts(field):
+    return lambda: {
+        ("catalog",): catalog_cache.stats()[field],
+        ("token",): token_cache.stats()[field],
+    }
+
+
+cache_hits = CallbackMetric(
+    registry,
+    "counter",
+    "impactree_cache_hits_total",
+    "Lookups answered by the catalog and token caches.",
+    ("cache",),
+    cache_counts("hits"),
+)
+cache_misses = CallbackMetric(
+    registry,
+    "counter",
+    "impactree_cache_misses_total",
+    "Lookups the catalog and token caches had to pass on.",
+    ("cache",),
+    cache_counts("misses"),
+)
+
+
+def record_exception(request, exception):
+    request_exceptions.inc(view_label(request), type(exception).__name__)
+
+
+class MetricsMiddleware:
+    """Count and time every request for /metrics"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        registry.start_flusher()
+        started = time.perf_counter()
+        requests_in_progress.inc()
+        try:
+            response = self.get_response(request)
+        finally:
+            requests_in_progress.dec()
+        self.finish(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        registry.start_flusher()
+        started = time.perf_counter()
+        requests_in_progress.inc()
+        try:
+            response = await self.get_response(request)
+        finally:
+            requests_in_progress.dec()
+        self.finish(request, response, started)
+        return response
+
+    def finish(self, request, response, started):
+        label = view_label(request)
+        request_duration.observe(time.perf_counter() - started, label)
+        requests_total.inc(label, request.method, str(response.status_code))
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:07
+
+from django.db import migrations, models, transaction
+from django.db.utils import OperationalError
+
+FTS_TABLE = "impactreeapi_charity_fts"
+
+CREATE_FTS = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        name, description, impact_metric,
+        content='impactreeapi_charity', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON impactreeapi_charity BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, impact_metric)
+        VALUES (new.id, new.name, new.description, new.impact_metric);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON impactreeapi_charity BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, impact_metric)
+        VALUES ('delete', old.id, old.name, old.description, old.impact_metric);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE ON impactreeapi_charity BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, impact_metric)
+        VALUES ('delete', old.id, old.name, old.description, old.impact_metric);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, impact_metric)
+        VALUES (new.id, new.name, new.description, new.impact_metric);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_charity_fts(apps, schema_editor):
+    """Build the FTS5 index on SQLite; other databases use the fallback search
+
+    Note that SQLite drops these triggers whenever Django has to rebuild
+    impactreeapi_charity for a schema change, so such a migration must
+    run create_charity_fts again afterwards.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            with schema_editor.connection.cursor() as cursor:
+                for statement in CREATE_FTS:
+                    cursor.execute(statement)
+    except OperationalError:
+        # SQLite built without FTS5
+        pass
+
+
+def drop_charity_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_FTS:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("impactreeapi", "0002_tableversion"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="charity",
+            index=models.Index(
+                fields=["impact_ratio"], name="charity_impact_ratio_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="charity",
+            index=models.Index(fields=["name"], name="charity_name_idx"),
+        ),
+        migrations.RunPython(create_charity_fts, drop_charity_fts),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("impactreeapi", "0003_charity_search"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="milestone",
+            index=models.Index(
+                fields=["required_percentage"], name="milestone_required_pct_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="impactplan",
+            constraint=models.UniqueConstraint(
+                fields=("user",), name="impactplan_unique_user"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="impactplancharity",
+            constraint=models.UniqueConstraint(
+                fields=("impact_plan", "charity"),
+                name="impactplancharity_unique_charity",
+            ),
+        ),
+    ]
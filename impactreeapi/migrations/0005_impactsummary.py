@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    ImpactPlanCharity = apps.get_model("impactreeapi", "ImpactPlanCharity")
+    ImpactSummary = apps.get_model("impactreeapi", "ImpactSummary")
+    totals = (
+        ImpactPlanCharity.objects.values("impact_plan_id", "charity__impact_metric")
+        .annotate(
+            total_allocation=models.Sum("allocation_amount"),
+            total_impact=models.Sum(
+                models.F("allocation_amount") * models.F("charity__impact_ratio"),
+                output_field=models.FloatField(),
+            ),
+        )
+        .order_by()
+    )
+    ImpactSummary.objects.bulk_create(
+        ImpactSummary(
+            impact_plan_id=total["impact_plan_id"],
+            impact_metric=total["charity__impact_metric"],
+            total_allocation=total["total_allocation"],
+            total_impact=total["total_impact"],
+        )
+        for total in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("impactreeapi", "0004_access_path_constraints"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImpactSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("impact_metric", models.CharField(max_length=255)),
+                (
+                    "total_allocation",
+                    models.DecimalField(decimal_places=2, max_digits=14),
+                ),
+                ("total_impact", models.FloatField()),
+                (
+                    "impact_plan",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="impact_summaries",
+                        to="impactreeapi.impactplan",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Impact Summaries",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("impact_plan", "impact_metric"),
+                        name="impactsummary_unique_metric",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
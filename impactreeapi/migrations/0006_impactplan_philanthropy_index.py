@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("impactreeapi", "0005_impactsummary"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="impactplan",
+            index=models.Index(
+                fields=["philanthropy_percentage"], name="impactplan_philanthropy_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("impactreeapi", "0006_impactplan_philanthropy_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="charity",
+            name="image_variants",
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
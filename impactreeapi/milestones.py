@@ -0,0 +1,76 @@
+import threading
+import time
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from impactreeapi.models import Milestone, TableVersion
+
+
+class MilestoneResolver:
+    """Process-wide lookup of the milestone reached at a philanthropy percentage
+
+    Milestones are loaded once, sorted by required_percentage, and each
+    lookup is a binary search over the thresholds. Saving or deleting a
+    milestone in this process invalidates them through a signal. Changes
+    made by other workers are picked up by reading the Milestone TableVersion
+    at most once every ttl seconds; a ttl of 0 reads it on every lookup.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_until = 0.0
+        self._thresholds = None
+        self._milestones = None
+
+    def _load(self):
+        with self._lock:
+            if self._version is not None and time.monotonic() < self._checked_until:
+                return self._thresholds, self._milestones
+
+        version = TableVersion.snapshot(Milestone)
+        with self._lock:
+            if self._version != version:
+                milestones = list(
+                    Milestone.objects.order_by("required_percentage", "id")
+                )
+                self._milestones = milestones
+                self._thresholds = [m.required_percentage for m in milestones]
+                self._version = version
+            self._checked_until = time.monotonic() + self.ttl
+            return self._thresholds, self._milestones
+
+    def invalidate(self):
+        """Forget the loaded milestones, so the next lookup reloads them"""
+        with self._lock:
+            self._version = None
+            self._checked_until = 0.0
+            self._thresholds = None
+            self._milestones = None
+
+    def resolve(self, percentage):
+        """Return the highest milestone whose required_percentage <= percentage"""
+        return self.resolve_many([percentage])[0]
+
+    def resolve_many(self, percentages):
+        """Resolve a batch of percentages against one snapshot of the milestones
+
+        Raises ValueError when a percentage is not a decimal number.
+        """
+        thresholds, milestones = self._load()
+        resolved = []
+        for percentage in percentages:
+            try:
+                index = bisect_right(thresholds, Decimal(str(percentage))) - 1
+            except (InvalidOperation, TypeError) as ex:
+                raise ValueError(
+                    "philanthropy_percentage must be a decimal number"
+                ) from ex
+            resolved.append(milestones[index] if index >= 0 else None)
+        return resolved
+
+
+milestone_resolver = MilestoneResolver(
+    ttl=getattr(settings, "MILESTONE_CACHE_TTL", 5),
+)
@@ -3,3 +3,5 @@ from .charitycategory import CharityCategory
 from .impactplan_charity import ImpactPlanCharity
 from .impactplan import ImpactPlan
 from .milestone import Milestone
+from .tableversion import TableVersion
+from .impactsummary import ImpactSummary
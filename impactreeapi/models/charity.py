@@ -1,4 +1,46 @@
-from django.db import models
+from django.db import connections, models
+from django.db.models.expressions import RawSQL
+from impactreeapi.search import (
+    CHARITY_FTS_COLUMNS,
+    CHARITY_FTS_TABLE,
+    charity_fts_ready,
+    fts5_available,
+    fts_match_query,
+    search_terms,
+)
+
+
+class CharityQuerySet(models.QuerySet):
+    def search(self, text):
+        """Keep charities whose name, description or impact metric match text
+
+        Every word has to match as a prefix. On SQLite with FTS5 and the
+        charity FTS table the lookup goes through the full-text index;
+        elsewhere it falls back to case-insensitive substring matches.
+        """
+        terms = search_terms(text)
+        if not terms:
+            return self
+
+        if (
+            connections[self.db].vendor == "sqlite"
+            and fts5_available()
+            and charity_fts_ready(self.db)
+        ):
+            matches = RawSQL(
+                f"SELECT rowid FROM {CHARITY_FTS_TABLE} "
+                f"WHERE {CHARITY_FTS_TABLE} MATCH %s",
+                [fts_match_query(terms)],
+            )
+            return self.filter(id__in=matches)
+
+        queryset = self
+        for term in terms:
+            condition = models.Q()
+            for column in CHARITY_FTS_COLUMNS:
+                condition |= models.Q(**{f"{column}__icontains": term})
+            queryset = queryset.filter(condition)
+        return queryset
 
 
 class Charity(models.Model):
@@ -17,9 +59,34 @@ class Charity(models.Model):
         max_length=None,
         null=True,
     )
+    # Written by impactreeapi.images.record_variants once the resized copies
+    # of the current image exist; nullable so adding it keeps the FTS triggers
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
+
+    objects = CharityQuerySet.as_manager()
+
+    # The fields impact summaries are computed from
+    IMPACT_FIELDS = ("impact_ratio", "impact_metric")
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the summary receiver skip saves that keep the impact fields
+        if set(cls.IMPACT_FIELDS) <= set(field_names):
+            instance._loaded_impact = instance.impact_fields()
+        return instance
+
+    def impact_fields(self):
+        """(impact_ratio, impact_metric) as stored, which impact summaries use"""
+        ratio = self._meta.get_field("impact_ratio").to_python(self.impact_ratio)
+        return ratio, self.impact_metric
+
     class Meta:
         verbose_name_plural = "Charities"
+        indexes = [
+            models.Index(fields=["impact_ratio"], name="charity_impact_ratio_idx"),
+            models.Index(fields=["name"], name="charity_name_idx"),
+        ]
@@ -3,6 +3,31 @@ from django.contrib.auth.models import User
 from .milestone import Milestone
 
 
+class ImpactPlanQuerySet(models.QuerySet):
+    def with_details(self):
+        """Load everything ImpactPlanSerializer touches in a fixed number of queries
+
+        Plans, users and milestones come back in one joined query, the
+        allocations are prefetched together with their charity and category,
+        and the impact summaries in one more query.
+        """
+        from .impactplan_charity import ImpactPlanCharity
+        from .impactsummary import ImpactSummary
+
+        return self.select_related("user", "current_milestone").prefetch_related(
+            models.Prefetch(
+                "impactplancharity_set",
+                queryset=ImpactPlanCharity.objects.select_related(
+                    "charity", "charity__category"
+                ),
+            ),
+            models.Prefetch(
+                "impact_summaries",
+                queryset=ImpactSummary.objects.order_by("impact_metric"),
+            ),
+        )
+
+
 class ImpactPlan(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     annual_income = models.DecimalField(max_digits=12, decimal_places=2)
@@ -12,5 +37,19 @@ class ImpactPlan(models.Model):
         Milestone, on_delete=models.SET_NULL, null=True
     )
 
+    objects = ImpactPlanQuerySet.as_manager()
+
     def __str__(self):
         return f"Impact Plan for {self.user.username}"
+
+    class Meta:
+        constraints = [
+            # Each user has at most one plan; plans are looked up by user
+            models.UniqueConstraint(fields=["user"], name="impactplan_unique_user"),
+        ]
+        indexes = [
+            # Percentile and histogram queries in /analytics
+            models.Index(
+                fields=["philanthropy_percentage"], name="impactplan_philanthropy_idx"
+            ),
+        ]
@@ -13,3 +13,10 @@ class ImpactPlanCharity(models.Model):
 
     class Meta:
         verbose_name_plural = "Impact Plan Charities"
+        constraints = [
+            # Also serves lookups by impact_plan alone, as its leading column
+            models.UniqueConstraint(
+                fields=["impact_plan", "charity"],
+                name="impactplancharity_unique_charity",
+            ),
+        ]
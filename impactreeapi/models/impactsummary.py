@@ -0,0 +1,89 @@
+from django.db import models, router, transaction
+from .impactplan import ImpactPlan
+
+
+class ImpactSummaryQuerySet(models.QuerySet):
+    def refresh(self, impact_plan_ids):
+        """Recompute the summary rows of the given plans from their allocations
+
+        Costs one locking select, one aggregate query, one delete and one
+        bulk insert however many plans are passed, and only reads the
+        allocations of those plans. Call it after any write that skips model
+        signals (bulk_create, bulk_update, queryset update/delete).
+
+        Runs in one transaction that holds the plans' rows with SELECT ...
+        FOR UPDATE, so concurrent refreshes of a plan take turns and readers
+        never see it without its summaries.
+        """
+        from .impactplan_charity import ImpactPlanCharity
+
+        impact_plan_ids = set(impact_plan_ids)
+        if not impact_plan_ids:
+            return
+
+        # The primary (or an explicit using()), even when reads go elsewhere
+        db = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=db):
+            # Locked in id order so that overlapping refreshes cannot deadlock
+            list(
+                ImpactPlan.objects.using(db)
+                .select_for_update()
+                .filter(pk__in=impact_plan_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            totals = (
+                ImpactPlanCharity.objects.using(db)
+                .filter(impact_plan_id__in=impact_plan_ids)
+                .values("impact_plan_id", "charity__impact_metric")
+                .annotate(
+                    total_allocation=models.Sum("allocation_amount"),
+                    total_impact=models.Sum(
+                        models.F("allocation_amount")
+                        * models.F("charity__impact_ratio"),
+                        output_field=models.FloatField(),
+                    ),
+                )
+                .order_by()
+            )
+            rows = [
+                ImpactSummary(
+                    impact_plan_id=total["impact_plan_id"],
+                    impact_metric=total["charity__impact_metric"],
+                    total_allocation=total["total_allocation"],
+                    total_impact=total["total_impact"],
+                )
+                for total in totals
+            ]
+            self.using(db).filter(impact_plan_id__in=impact_plan_ids).delete()
+            self.using(db).bulk_create(rows)
+
+
+class ImpactSummary(models.Model):
+    """Allocated dollars and projected impact per plan and impact metric
+
+    Derived from ImpactPlanCharity and Charity.impact_ratio and kept up to
+    date by impactreeapi.signals, so reading a plan's impact is a lookup
+    rather than a join over its allocations.
+    """
+
+    impact_plan = models.ForeignKey(
+        ImpactPlan, on_delete=models.CASCADE, related_name="impact_summaries"
+    )
+    impact_metric = models.CharField(max_length=255)
+    total_allocation = models.DecimalField(max_digits=14, decimal_places=2)
+    total_impact = models.FloatField()
+
+    objects = ImpactSummaryQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.impact_plan} - {self.impact_metric}"
+
+    class Meta:
+        verbose_name_plural = "Impact Summaries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["impact_plan", "impact_metric"],
+                name="impactsummary_unique_metric",
+            ),
+        ]
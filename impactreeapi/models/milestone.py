@@ -9,3 +9,10 @@ class Milestone(models.Model):
 
     def __str__(self):
         return self.name
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["required_percentage"], name="milestone_required_pct_idx"
+            ),
+        ]
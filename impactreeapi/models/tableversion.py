@@ -0,0 +1,62 @@
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class TableVersion(models.Model):
+    """Monotonic change counter for a whole table
+
+    Bumped whenever a row of the tracked model is saved or deleted, so
+    readers can tell whether anything changed with a single lookup.
+    """
+
+    table = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.table} v{self.version}"
+
+    @classmethod
+    def bump(cls, model):
+        """Record a change to model's table"""
+        table = model._meta.label_lower
+        now = timezone.now()
+        updated = cls.objects.filter(table=table).update(
+            version=F("version") + 1, updated_at=now
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    cls.objects.create(table=table, version=1, updated_at=now)
+            except IntegrityError:
+                cls.objects.filter(table=table).update(
+                    version=F("version") + 1, updated_at=now
+                )
+
+    @classmethod
+    def snapshot(cls, *models):
+        """Return ({table: version}, latest updated_at) for the given models"""
+        return cls._summarize(models, list(cls._rows(models)))
+
+    @classmethod
+    async def asnapshot(cls, *models):
+        """Async version of snapshot()"""
+        return cls._summarize(models, [row async for row in cls._rows(models)])
+
+    @classmethod
+    def _rows(cls, models):
+        tables = [model._meta.label_lower for model in models]
+        return cls.objects.filter(table__in=tables).values_list(
+            "table", "version", "updated_at"
+        )
+
+    @classmethod
+    def _summarize(cls, models, rows):
+        versions = {model._meta.label_lower: 0 for model in models}
+        last_modified = None
+        for table, version, updated_at in rows:
+            versions[table] = version
+            if last_modified is None or updated_at > last_modified:
+                last_modified = updated_at
+        return versions, last_modified
@@ -0,0 +1,44 @@
+from asgiref.sync import sync_to_async
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset pagination ordered by primary key
+
+    Each page is fetched with ``WHERE id > <cursor> ORDER BY id LIMIT n``,
+    so deep pages cost the same as the first one.
+    """
+
+    ordering = "id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+def wants_unpaginated(request):
+    """Return True when the client opted in to the legacy full-array response"""
+    return request.query_params.get("paginate", "").lower() in ("false", "0", "no")
+
+
+def paginated_response(view, request, queryset, serializer_class, ordering=None):
+    """Serialize one page of ``queryset`` and wrap it with next/previous links
+
+    ``ordering`` overrides the paginator's ordering; it should end with a
+    unique field so the cursor position is stable.
+    """
+    paginator = IdCursorPagination()
+    if ordering:
+        paginator.ordering = ordering
+    page = paginator.paginate_queryset(queryset, request, view=view)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
+
+
+async def apaginated_response(view, request, queryset, serializer_class, ordering=None):
+    """Async version of paginated_response
+
+    CursorPagination fetches the page itself, so it runs in a worker thread.
+    """
+    return await sync_to_async(paginated_response)(
+        view, request, queryset, serializer_class, ordering
+    )
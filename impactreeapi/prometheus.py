@@ -0,0 +1,280 @@
+"""A small Prometheus client: per-thread metrics, multi-process merging
+
+Counters, gauges and histograms are updated without locks: each thread
+writes to its own shard, and collecting adds the shards up. CallbackMetric
+reads its values from a function at scrape time instead.
+
+When a Registry has a directory, each process writes its values there every
+flush_seconds, and render() adds up the files of every process. Counters and
+histograms of processes that have exited stay in their files, so totals never
+go down when a worker is replaced; mark_process_dead() drops their gauges.
+
+Only the standard library is imported here, so gunicorn.conf.py can call
+clear_directory() and mark_process_dead() from the arbiter, which never loads
+Django.
+"""
+
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Shards:
+    """One dict of label values -> value per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+
+    def mine(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            # Shards of finished threads stay, so their counts are kept
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def snapshots(self):
+        with self._lock:
+            shards = list(self._shards)
+        # dict.copy() holds the GIL, so a shard is never copied mid-update
+        return [shard.copy() for shard in shards]
+
+    def clear(self):
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.shards = Shards()
+        registry.register(self)
+
+    def inc(self, *labels, amount=1):
+        values = self.shards.mine()
+        values[labels] = values.get(labels, 0) + amount
+
+    def collect(self):
+        """{label values: total} across all threads"""
+        totals = {}
+        for shard in self.shards.snapshots():
+            for labels, value in shard.items():
+                totals[labels] = add(totals.get(labels), value)
+        return totals
+
+
+class Counter(Metric):
+    """Value that only goes up, e.g. requests served"""
+
+    kind = "counter"
+
+
+class Gauge(Metric):
+    """Value that goes up and down, e.g. requests in progress
+
+    A thread's shard can go negative, so inc() and dec() for the same thing
+    may come from different threads.
+    """
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Distribution of observed values, e.g. request durations"""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=()):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, documentation, labelnames)
+
+    def observe(self, value, *labels):
+        values = self.shards.mine()
+        row = values.get(labels)
+        if row is None:
+            # A count per bucket, the last one for +Inf, then the sum
+            row = values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+
+class CallbackMetric(Metric):
+    """Counter or gauge whose values come from a function at scrape time"""
+
+    def __init__(self, registry, kind, name, documentation, labelnames, callback):
+        self.kind = kind
+        self.callback = callback
+        super().__init__(registry, name, documentation, labelnames)
+
+    def collect(self):
+        return self.callback()
+
+
+class Registry:
+    def __init__(self, directory=None, flush_seconds=5):
+        self.metrics = []
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def clear(self):
+        """Reset the values of this process"""
+        for metric in self.metrics:
+            metric.shards.clear()
+
+    def snapshot(self):
+        """This process's values as JSON-compatible data"""
+        return {
+            metric.name: {
+                "kind": metric.kind,
+                "rows": [
+                    [list(labels), value] for labels, value in metric.collect().items()
+                ],
+            }
+            for metric in self.metrics
+        }
+
+    def start_flusher(self):
+        """Start writing this process's values to the directory
+
+        Threads do not survive fork(), so callers check this on every request
+        and each worker starts its own flusher.
+        """
+        if self.directory is None or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, daemon=True).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        write_snapshot(self.directory, os.getpid(), self.snapshot())
+
+    def merged(self):
+        """{metric name: {label values: value}} over every process"""
+        if self.directory is None:
+            return {metric.name: metric.collect() for metric in self.metrics}
+        self.flush()
+        merged = {metric.name: {} for metric in self.metrics}
+        for snapshot in read_snapshots(self.directory):
+            for name, entry in snapshot.items():
+                values = merged.get(name)
+                if values is None:
+                    continue
+                for labels, value in entry["rows"]:
+                    labels = tuple(labels)
+                    values[labels] = add(values.get(labels), value)
+        return merged
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        merged = self.merged()
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in sorted(merged[metric.name].items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind == "histogram":
+                    lines.extend(histogram_lines(metric, pairs, value))
+                else:
+                    lines.append(sample(metric.name, pairs, value))
+        return "\n".join(lines) + "\n"
+
+
+def add(total, value):
+    """Add a counter or gauge value, or a histogram row"""
+    if total is None:
+        return list(value) if isinstance(value, list) else value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(total, value)]
+    return total + value
+
+
+def escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def sample(name, pairs, value):
+    if not pairs:
+        return f"{name} {value}"
+    labels = ",".join(f'{key}="{escape(val)}"' for key, val in pairs)
+    return f"{name}{{{labels}}} {value}"
+
+
+def histogram_lines(metric, pairs, row):
+    cumulative = 0
+    bounds = [repr(float(bound)) for bound in metric.buckets] + ["+Inf"]
+    for bound, count in zip(bounds, row):
+        cumulative += count
+        yield sample(f"{metric.name}_bucket", pairs + [("le", bound)], cumulative)
+    yield sample(f"{metric.name}_sum", pairs, row[-1])
+    yield sample(f"{metric.name}_count", pairs, cumulative)
+
+
+def snapshot_path(directory, pid):
+    return os.path.join(directory, f"metrics-{pid}.json")
+
+
+def write_snapshot(directory, pid, snapshot):
+    path = snapshot_path(directory, pid)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(snapshot, file)
+    # Readers see the old file or the new one, never half of one
+    os.replace(temporary, path)
+
+
+def read_snapshots(directory):
+    for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+        try:
+            with open(path) as file:
+                yield json.load(file)
+        except (OSError, ValueError):
+            # The process exited and its file was cleared meanwhile
+            continue
+
+
+def mark_process_dead(directory, pid):
+    """Drop an exited process's gauges and keep everything else"""
+    try:
+        with open(snapshot_path(directory, pid)) as file:
+            snapshot = json.load(file)
+    except (OSError, ValueError):
+        return
+    kept = {name: entry for name, entry in snapshot.items() if entry["kind"] != "gauge"}
+    write_snapshot(directory, pid, kept)
+
+
+def clear_directory(directory):
+    """Remove the files of a previous run"""
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "metrics-*.json*")):
+        os.remove(path)
@@ -0,0 +1,116 @@
+"""Send safe-method reads to read replicas
+
+ReplicaRoutingMiddleware picks a random alias in DATABASE_REPLICAS for each
+GET, HEAD and OPTIONS request and stores it in a context variable, and
+ReplicaRouter sends every read made while it is set to that one replica.
+Everything else reads and writes default. Because a request never mixes
+replicas, the data it reads is at least as new as the TableVersion rows it
+read first, so catalog cache entries are never older than their keys.
+
+A client that has just sent a write is pinned to default for
+DATABASE_REPLICA_PIN_SECONDS, so it reads its own writes as long as the
+replicas lag by less than that. Clients are told apart by a hash of their
+Authorization header, and pins are kept in the default cache. Settings make
+that a table on the primary when replicas are configured without
+DEFAULT_CACHE_URL, so every worker sees every pin.
+"""
+
+import hashlib
+import random
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+PRIMARY = "default"
+
+# Credentials are always read from the primary, so a token issued a moment
+# ago authenticates even on a lagging replica. So is DatabaseCache's table
+# (app label django_cache), which holds the pins.
+PRIMARY_ONLY_APPS = frozenset(
+    {"auth", "authtoken", "contenttypes", "django_cache", "sessions"}
+)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# The replica alias this request reads from, None for the primary
+read_from_replica = ContextVar("read_from_replica", default=None)
+
+
+class ReplicaRouter:
+    """Database router for DATABASE_REPLICAS, see the module docstring"""
+
+    def db_for_read(self, model, **hints):
+        replica = read_from_replica.get()
+        if replica and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            return replica
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db == PRIMARY
+
+
+def pin_key(request):
+    authorization = request.headers.get("Authorization")
+    if not authorization:
+        return None
+    return "replica-pin:" + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """Route safe-method requests to replicas unless the client is pinned"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        key = pin_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if key:
+                caches["default"].set(key, True, settings.DATABASE_REPLICA_PIN_SECONDS)
+            return response
+
+        if not settings.DATABASE_REPLICAS or (key and caches["default"].get(key)):
+            return self.get_response(request)
+        token = read_from_replica.set(random.choice(settings.DATABASE_REPLICAS))
+        try:
+            return self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
+
+    async def __acall__(self, request):
+        key = pin_key(request)
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            if key:
+                await caches["default"].aset(
+                    key, True, settings.DATABASE_REPLICA_PIN_SECONDS
+                )
+            return response
+
+        if not settings.DATABASE_REPLICAS or (
+            key and await caches["default"].aget(key)
+        ):
+            return await self.get_response(request)
+        token = read_from_replica.set(random.choice(settings.DATABASE_REPLICAS))
+        try:
+            return await self.get_response(request)
+        finally:
+            read_from_replica.reset(token)
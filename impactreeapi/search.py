@@ -0,0 +1,68 @@
+import functools
+import re
+import sqlite3
+
+# External-content FTS5 index over impactreeapi_charity, kept in sync by
+# triggers. Created by migration 0003 when the SQLite build has FTS5.
+CHARITY_FTS_TABLE = "impactreeapi_charity_fts"
+CHARITY_FTS_COLUMNS = ("name", "description", "impact_metric")
+
+WORD_RE = re.compile(r"\w+")
+
+# Connection alias -> whether its database has CHARITY_FTS_TABLE. Filled in
+# as connections open and after migrate, so search() never has to query for
+# it, which it could not do from async views.
+_charity_fts_tables = {}
+
+
+@functools.cache
+def fts5_available():
+    """Return True when the linked SQLite library was built with FTS5
+
+    Probed on a private in-memory database, so it is safe to call from
+    async code and never touches the application's connections.
+    """
+    try:
+        probe = sqlite3.connect(":memory:")
+        try:
+            probe.execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        finally:
+            probe.close()
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def detect_charity_fts(connection):
+    """Record whether a SQLite connection's database has CHARITY_FTS_TABLE
+
+    A database migrated without FTS5, or built from a schema other than
+    the repo's migrations, has no such table.
+    """
+    if connection.vendor != "sqlite":
+        return
+    connection.ensure_connection()
+    row = connection.connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (CHARITY_FTS_TABLE,),
+    ).fetchone()
+    _charity_fts_tables[connection.alias] = row is not None
+
+
+def charity_fts_ready(alias):
+    """Whether searches on alias can use CHARITY_FTS_TABLE; False until known"""
+    return _charity_fts_tables.get(alias, False)
+
+
+def search_terms(text):
+    """Split user input into the words a search must all match"""
+    return WORD_RE.findall(text or "")
+
+
+def fts_match_query(terms):
+    """Build an FTS5 MATCH expression requiring every term as a prefix
+
+    Each term is quoted so operators in user input (AND, NEAR, column
+    filters, ...) are matched as plain text.
+    """
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
@@ -0,0 +1,184 @@
+"""Bulk loading of the fixtures in impactreeapi/fixtures
+
+load_fixtures() reads the JSON fixtures, orders their models so that every
+foreign key points at rows inserted before it, and writes each model with a
+single bulk insert, all in one transaction. As with loaddata, a row whose
+primary key already exists is overwritten.
+
+Bulk inserts skip model signals, so the table versions, caches and impact
+summaries those signals maintain are brought up to date here.
+"""
+
+import json
+from pathlib import Path
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from impactreeapi.authentication import token_cache
+from impactreeapi.milestones import milestone_resolver
+from impactreeapi.models import (
+    Charity,
+    CharityCategory,
+    ImpactPlan,
+    ImpactPlanCharity,
+    ImpactSummary,
+    Milestone,
+    TableVersion,
+)
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# Models whose changes bump_table_version and the catalog cache track
+VERSIONED_MODELS = (CharityCategory, Charity, Milestone)
+
+
+def fixture_names():
+    """Every fixture in FIXTURE_DIR, without the .json suffix"""
+    return sorted(path.stem for path in FIXTURE_DIR.glob("*.json"))
+
+
+def read_fixtures(names):
+    """{model: [fixture rows]} for the named fixtures"""
+    rows = {}
+    for name in names:
+        with open(FIXTURE_DIR / f"{name}.json") as file:
+            for row in json.load(file):
+                model = apps.get_model(row["model"])
+                rows.setdefault(model, []).append(row)
+    return rows
+
+
+def dependency_order(models):
+    """models sorted so that each comes after the models it references"""
+    pending = set(models)
+    ordered = []
+    while pending:
+        ready = sorted(
+            (
+                model
+                for model in pending
+                if not any(
+                    field.related_model in pending and field.related_model is not model
+                    for field in model._meta.concrete_fields
+                    if field.is_relation
+                )
+            ),
+            key=lambda model: model._meta.label,
+        )
+        if not ready:
+            labels = ", ".join(sorted(model._meta.label for model in pending))
+            raise ValueError(f"Circular foreign keys between {labels}")
+        ordered.extend(ready)
+        pending.difference_update(ready)
+    return ordered
+
+
+def build(model, row):
+    """A model instance from a fixture row; foreign keys are given as ids"""
+    values = {}
+    if "pk" in row:
+        values[model._meta.pk.attname] = model._meta.pk.to_python(row["pk"])
+    for name, value in row["fields"].items():
+        field = model._meta.get_field(name)
+        if field.is_relation:
+            values[field.attname] = value
+        else:
+            values[field.attname] = field.to_python(value)
+    return model(**values)
+
+
+def load_fixtures(names=None):
+    """Bulk insert the named fixtures, every fixture by default
+
+    Returns {model label: rows written}.
+    """
+    rows = read_fixtures(names if names is not None else fixture_names())
+    models = dependency_order(rows)
+    loaded = {}
+
+    with transaction.atomic():
+        for model in models:
+            objects = [build(model, row) for row in rows[model]]
+            pk = model._meta.pk
+            update_fields = sorted(
+                {
+                    model._meta.get_field(name).name
+                    for row in rows[model]
+                    for name in row["fields"]
+                }
+                - {pk.name}
+            )
+            model.objects.bulk_create(
+                objects,
+                update_conflicts=bool(update_fields),
+                ignore_conflicts=not update_fields,
+                unique_fields=[pk.name] if update_fields else None,
+                update_fields=update_fields or None,
+            )
+            loaded[model] = objects
+
+        reset_sequences(models)
+        refresh_derived(loaded)
+
+    return {model._meta.label: len(objects) for model, objects in loaded.items()}
+
+
+def refresh_derived(loaded):
+    """Do what the skipped post_save receivers would have done"""
+    plan_ids = {plan.pk for plan in loaded.get(ImpactPlan, [])}
+    plan_ids.update(row.impact_plan_id for row in loaded.get(ImpactPlanCharity, []))
+    if Charity in loaded:
+        plan_ids.update(
+            ImpactPlanCharity.objects.filter(
+                charity__in=[charity.pk for charity in loaded[Charity]]
+            ).values_list("impact_plan_id", flat=True)
+        )
+    ImpactSummary.objects.refresh(plan_ids)
+
+    for model in VERSIONED_MODELS:
+        if model in loaded:
+            TableVersion.bump(model)
+    if Milestone in loaded:
+        milestone_resolver.invalidate()
+    # Overwritten tokens and users may be cached under their old values
+    token_cache.clear()
+
+
+def next_id(model):
+    """The first primary key above every existing row of model"""
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def insert_rows(model, fields, rows):
+    """Insert tuples of database-ready values straight into model's table
+
+    Each statement carries as many rows as the backend takes parameters.
+    Nothing is validated or converted, and neither signals nor the
+    connection's execute wrappers see the inserts, so rows must
+    hold every non-null column, primary key included, and the caller must
+    call reset_sequences() afterwards.
+    """
+    quote = connection.ops.quote_name
+    model_fields = [model._meta.get_field(name) for name in fields]
+    table = quote(model._meta.db_table)
+    columns = ", ".join(quote(field.column) for field in model_fields)
+    placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    batch_size = max(connection.ops.bulk_batch_size(model_fields, rows), 1)
+    # The backend's own cursor: Django's wrapper would log every statement
+    # with all of its parameters whenever DEBUG is on
+    with connection.cursor() as cursor, connection.wrap_database_errors:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            cursor.cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES "
+                + ", ".join([placeholder] * len(batch)),
+                [value for row in batch for value in row],
+            )
+
+
+def reset_sequences(models):
+    """Move PostgreSQL's id sequences past rows inserted with explicit ids"""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
@@ -0,0 +1,161 @@
+import sys
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.signals import got_request_exception
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from impactreeapi.authentication import token_cache
+from impactreeapi.images import record_variants, variants_outdated
+from impactreeapi.instrumentation import install_query_recorder
+from impactreeapi.metrics import record_exception, track_connection
+from impactreeapi.milestones import milestone_resolver
+from impactreeapi.search import detect_charity_fts
+from impactreeapi.models import (
+    Charity,
+    CharityCategory,
+    ImpactPlanCharity,
+    ImpactSummary,
+    Milestone,
+    TableVersion,
+)
+
+
+@receiver(post_save, sender=Charity)
+@receiver(post_delete, sender=Charity)
+@receiver(post_save, sender=CharityCategory)
+@receiver(post_delete, sender=CharityCategory)
+@receiver(post_save, sender=Milestone)
+@receiver(post_delete, sender=Milestone)
+def bump_table_version(sender, **kwargs):
+    """Advance the version that ETags, Last-Modified and the catalog cache use"""
+    TableVersion.bump(sender)
+
+
+@receiver(post_save, sender=Charity)
+def build_image_variants(sender, instance, raw=False, **kwargs):
+    """Resize a newly uploaded charity image while the upload is still hot
+
+    Saves that keep the image the variants were made from do nothing.
+    """
+    if raw or not variants_outdated(instance.image, instance.image_variants):
+        return
+    instance.image_variants = record_variants(instance.image)
+    Charity.objects.filter(pk=instance.pk).update(
+        image_variants=instance.image_variants
+    )
+    # The bump for this save may already have been read by another worker
+    TableVersion.bump(Charity)
+
+
+@receiver(post_save, sender=ImpactPlanCharity)
+def refresh_plan_impact(sender, instance, **kwargs):
+    ImpactSummary.objects.refresh([instance.impact_plan_id])
+
+
+@receiver(post_delete, sender=ImpactPlanCharity)
+def refresh_deleted_allocation_impact(sender, instance, origin, **kwargs):
+    """Refresh the plan of a deleted allocation
+
+    Allocations removed by deleting their plan or charity are skipped: the
+    plan's summaries go with it, and the Charity delete receivers refresh
+    every affected plan once.
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is ImpactPlanCharity:
+        ImpactSummary.objects.refresh([instance.impact_plan_id])
+
+
+@receiver(post_save, sender=Charity)
+def refresh_charity_impact(sender, instance, created, update_fields, **kwargs):
+    """A new impact_ratio or impact_metric changes every plan holding the charity
+
+    Saves that leave both as they were loaded, e.g. name, description or
+    image edits, cannot change a summary and refresh nothing.
+    """
+    if update_fields is not None and not set(Charity.IMPACT_FIELDS) & update_fields:
+        return
+    loaded = getattr(instance, "_loaded_impact", None)
+    instance._loaded_impact = instance.impact_fields()
+    if created or loaded == instance._loaded_impact:
+        return
+    ImpactSummary.objects.refresh(
+        ImpactPlanCharity.objects.filter(charity=instance).values_list(
+            "impact_plan_id", flat=True
+        )
+    )
+
+
+@receiver(pre_delete, sender=Charity)
+def collect_charity_plans(sender, instance, **kwargs):
+    """Note the plans holding a charity before its allocations are deleted"""
+    instance._impact_plan_ids = list(
+        ImpactPlanCharity.objects.filter(charity=instance).values_list(
+            "impact_plan_id", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Charity)
+def refresh_deleted_charity_impact(sender, instance, **kwargs):
+    ImpactSummary.objects.refresh(getattr(instance, "_impact_plan_ids", []))
+
+
+@receiver(post_save, sender=Milestone)
+@receiver(post_delete, sender=Milestone)
+def reload_milestone_resolver(sender, **kwargs):
+    milestone_resolver.invalidate()
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.evict_key(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_user_tokens(sender, instance, **kwargs):
+    """Cached tokens hold a copy of the user, so any change to it evicts them"""
+    token_cache.evict_user(instance.pk)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Tune each new SQLite connection when SQLITE_PERFORMANCE_PROFILE is on"""
+    if connection.vendor != "sqlite":
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def check_charity_fts(sender, connection, **kwargs):
+    """Note whether this database has the charity search index"""
+    detect_charity_fts(connection)
+
+
+@receiver(post_migrate)
+def recheck_charity_fts(sender, using, **kwargs):
+    """Migrations may have created or dropped the charity search index"""
+    detect_charity_fts(connections[using])
+
+
+@receiver(connection_created)
+def record_request_queries(sender, connection, **kwargs):
+    """Let RequestInstrumentationMiddleware time this connection's queries"""
+    install_query_recorder(connection)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    """Count new connections and track open ones for /metrics"""
+    track_connection(connection)
+
+
+@receiver(got_request_exception)
+def count_request_exception(sender, request, **kwargs):
+    """Count exceptions raised outside DRF views, which DRF's handler never sees"""
+    record_exception(request, sys.exc_info()[1])
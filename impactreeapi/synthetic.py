@@ -0,0 +1,204 @@
+"""Synthetic data for benchmarks and load tests
+
+generate() bulk-inserts categories, charities, users, impact plans and
+their allocations with a seeded random generator, so the same arguments
+always produce the same shape of data.
+"""
+
+import random
+import uuid
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+from impactreeapi.milestones import milestone_resolver
+from impactreeapi.models import (
+    Charity,
+    CharityCategory,
+    ImpactPlan,
+    ImpactPlanCharity,
+    ImpactSummary,
+    Milestone,
+    TableVersion,
+)
+from impactreeapi.seeding import insert_rows, next_id, reset_sequences
+
+IMPACT_METRICS = [
+    "trees planted",
+    "meals provided",
+    "people given clean water",
+    "bed nets distributed",
+    "children vaccinated",
+    "homes built",
+]
+
+# Tables written row by row with insert_rows, and their columns in order
+GENERATED_MODELS = (User, ImpactPlan, ImpactPlanCharity, ImpactSummary)
+USER_FIELDS = (
+    "id",
+    "password",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_superuser",
+    "is_staff",
+    "is_active",
+    "date_joined",
+)
+PLAN_FIELDS = (
+    "id",
+    "user",
+    "annual_income",
+    "philanthropy_percentage",
+    "total_annual_allocation",
+    "current_milestone",
+)
+ALLOCATION_FIELDS = ("id", "impact_plan", "charity", "allocation_amount")
+SUMMARY_FIELDS = (
+    "id",
+    "impact_plan",
+    "impact_metric",
+    "total_allocation",
+    "total_impact",
+)
+
+DEFAULT_MILESTONES = [
+    ("Seed Planter", Decimal("1.00")),
+    ("Sapling", Decimal("5.00")),
+    ("Grove Keeper", Decimal("10.00")),
+    ("Forest Guardian", Decimal("20.00")),
+]
+
+
+def generate(
+    allocations=100_000,
+    per_plan=5,
+    charities=200,
+    categories=12,
+    seed=0,
+    batch_size=2_000,
+):
+    """Insert about ``allocations`` ImpactPlanCharity rows with their parents
+
+    Plans are written ``batch_size`` at a time, so memory stays flat however
+    many rows are requested. Bulk inserts skip model signals, so table
+    versions, the catalog cache and the impact summaries are updated here.
+
+    Returns a dict with the number of rows created per model.
+    """
+    rng = random.Random(seed)
+    run = uuid.uuid4().hex[:8]
+    per_plan = max(1, min(per_plan, charities))
+    plan_count = max(1, allocations // per_plan)
+
+    with transaction.atomic():
+        category_rows = CharityCategory.objects.bulk_create(
+            CharityCategory(name=f"Synthetic {run} category {index}")
+            for index in range(categories)
+        )
+        charity_rows = Charity.objects.bulk_create(
+            Charity(
+                name=f"Synthetic {run} charity {index}",
+                category=rng.choice(category_rows),
+                description="Generated for benchmarks",
+                impact_metric=rng.choice(IMPACT_METRICS),
+                impact_ratio=round(rng.lognormvariate(0, 1), 4),
+                website_url="https://example.org",
+            )
+            for index in range(charities)
+        )
+        if not Milestone.objects.exists():
+            Milestone.objects.bulk_create(
+                Milestone(
+                    name=name,
+                    description=name,
+                    required_percentage=percentage,
+                    image_filename="",
+                )
+                for name, percentage in DEFAULT_MILESTONES
+            )
+            TableVersion.bump(Milestone)
+            milestone_resolver.invalidate()
+
+    created = {"allocations": 0, "impact_summaries": 0}
+    ids = {model: next_id(model) for model in GENERATED_MODELS}
+    joined = connection.ops.adapt_datetimefield_value(timezone.now())
+    for start in range(0, plan_count, batch_size):
+        count = min(batch_size, plan_count - start)
+        with transaction.atomic():
+            allocations_made, summaries_made = _generate_plans(
+                rng, run, ids, joined, start, count, per_plan, charity_rows
+            )
+        created["allocations"] += allocations_made
+        created["impact_summaries"] += summaries_made
+
+    with transaction.atomic():
+        TableVersion.bump(CharityCategory)
+        TableVersion.bump(Charity)
+        reset_sequences(GENERATED_MODELS)
+
+    return {
+        "categories": len(category_rows),
+        "charities": len(charity_rows),
+        "users": plan_count,
+        "impact_plans": plan_count,
+        **created,
+    }
+
+
+def _generate_plans(rng, run, ids, joined, start, count, per_plan, charity_rows):
+    """Insert count users, each with a plan, its allocations and its summaries
+
+    Rows go in as plain value tuples with ids taken from ``ids``, which skips
+    building a model instance per row. The summaries are added up here, as
+    ImpactSummary.objects.refresh() would compute them.
+    """
+    user_ids = range(ids[User], ids[User] + count)
+    plan_ids = range(ids[ImpactPlan], ids[ImpactPlan] + count)
+    ids[User] += count
+    ids[ImpactPlan] += count
+
+    percentages = [
+        Decimal(str(round(min(rng.lognormvariate(1.5, 0.7), 99.0), 2)))
+        for _ in range(count)
+    ]
+    milestones = milestone_resolver.resolve_many(percentages)
+
+    users, plans = [], []
+    for index, (user_id, plan_id, percentage, milestone) in enumerate(
+        zip(user_ids, plan_ids, percentages, milestones)
+    ):
+        users.append(
+            (user_id, "!", f"synthetic-{run}-{start + index}", "", "", "")
+            + (False, False, True, joined)
+        )
+        income = Decimal(str(round(rng.lognormvariate(11, 0.5), 2)))
+        total = (income * percentage / 100).quantize(Decimal("0.01"))
+        plans.append(
+            (plan_id, user_id, income, percentage, total, milestone and milestone.pk)
+        )
+
+    allocations, summaries = [], []
+    allocation_id = ids[ImpactPlanCharity]
+    summary_id = ids[ImpactSummary]
+    for plan_id, _, _, _, total, _ in plans:
+        share = (total / per_plan).quantize(Decimal("0.01"))
+        by_metric = {}
+        for charity in rng.sample(charity_rows, per_plan):
+            allocations.append((allocation_id, plan_id, charity.pk, share))
+            allocation_id += 1
+            row = by_metric.setdefault(charity.impact_metric, [Decimal(0), 0.0])
+            row[0] += share
+            row[1] += float(share) * charity.impact_ratio
+        for metric, (allocated, impact) in by_metric.items():
+            summaries.append((summary_id, plan_id, metric, allocated, impact))
+            summary_id += 1
+    ids[ImpactPlanCharity] = allocation_id
+    ids[ImpactSummary] = summary_id
+
+    insert_rows(User, USER_FIELDS, users)
+    insert_rows(ImpactPlan, PLAN_FIELDS, plans)
+    insert_rows(ImpactPlanCharity, ALLOCATION_FIELDS, allocations)
+    insert_rows(ImpactSummary, SUMMARY_FIELDS, summaries)
+    return len(allocations), len(summaries)
@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser
+from django.http.multipartparser import MultiPartParserError
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+# Accepted image types and the extension stored files get
+IMAGE_TYPES = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+
+class ImageTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Image is larger than the upload limit."
+    default_code = "image_too_large"
+
+
+class UnsupportedImageType(APIException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = "Image must be a PNG, JPEG, GIF or WebP file."
+    default_code = "unsupported_image_type"
+
+
+def sniff_image_type(header):
+    """Return the content type matching the leading bytes of an image"""
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Stream an ``image`` form field to a temporary file with limits applied
+
+    Chunks go straight to disk, so memory use stays at one chunk however
+    large the upload is. The request is rejected before anything is
+    buffered when its Content-Length already exceeds the limit, and the
+    declared and sniffed content types are checked before the first chunk
+    is written. Files in any other form field are dropped.
+    """
+
+    field_name = "image"
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.CHARITY_IMAGE_MAX_SIZE
+        self.received = 0
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        # The other form fields are capped by DATA_UPLOAD_MAX_MEMORY_SIZE
+        limit = self.max_size + (settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0)
+        if content_length > limit:
+            raise ImageTooLarge()
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        if field_name != self.field_name:
+            raise SkipFile()
+        if content_type not in IMAGE_TYPES:
+            raise UnsupportedImageType()
+        self.received = 0
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.upload_interrupted()
+            raise ImageTooLarge()
+        if start == 0 and sniff_image_type(raw_data) != self.content_type:
+            self.upload_interrupted()
+            raise UnsupportedImageType()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class ImageMultiPartParser(MultiPartParser):
+    """MultiPartParser that streams uploads through ImageUploadHandler"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context["request"]
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta["CONTENT_TYPE"] = media_type
+        upload_handlers = [ImageUploadHandler(request)]
+
+        try:
+            parser = DjangoMultiPartParser(meta, stream, upload_handlers, encoding)
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError("Multipart form parse error - %s" % str(exc))
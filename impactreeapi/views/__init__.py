@@ -1,7 +1,11 @@
-from .auth import login_user, register_user
+from .auth import login_user, register_user, alogin_user, aregister_user
 from .user import UserViewSet
 from .milestone import MilestoneViewSet
 from .charitycategory import CharityCategoryViewSet
 from .charity import CharityViewSet
 from .impactplan import ImpactPlanViewSet
 from .impactplan_charity import ImpactPlanCharityViewSet
+from .stats import runtime_stats
+from .metrics import prometheus_metrics
+from .media import serve_media
+from .analytics import platform_analytics
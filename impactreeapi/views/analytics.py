@@ -0,0 +1,173 @@
+import math
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Avg, Count, F, Max, Min, Sum, Value
+from django.db.models.functions import Floor
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from impactreeapi.models import (
+    Charity,
+    CharityCategory,
+    ImpactPlan,
+    ImpactPlanCharity,
+    ImpactSummary,
+    Milestone,
+)
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+
+def dollars_by_charity():
+    """Allocation totals per charity, plus the same rolled up per category
+
+    The allocation table is scanned once, grouped by charity_id only; names
+    and categories come from the small charity table and the category
+    totals are summed from the per-charity rows.
+    """
+    totals = (
+        ImpactPlanCharity.objects.values("charity_id")
+        .annotate(total_allocation=Sum("allocation_amount"), allocations=Count("id"))
+        .order_by()
+    )
+    charities = Charity.objects.only("name", "category_id").in_bulk()
+    category_names = dict(CharityCategory.objects.values_list("id", "name"))
+
+    by_charity = []
+    by_category = {}
+    for row in totals:
+        charity = charities.get(row["charity_id"])
+        category_id = charity.category_id if charity else None
+        by_charity.append(
+            {
+                "charity_id": row["charity_id"],
+                "name": charity.name if charity else None,
+                "total_allocation": row["total_allocation"],
+                "allocations": row["allocations"],
+            }
+        )
+        category = by_category.setdefault(
+            category_id,
+            {
+                "category_id": category_id,
+                "name": category_names.get(category_id),
+                "total_allocation": 0,
+                "allocations": 0,
+            },
+        )
+        category["total_allocation"] += row["total_allocation"]
+        category["allocations"] += row["allocations"]
+
+    by_charity.sort(key=lambda row: row["total_allocation"], reverse=True)
+    return by_charity, sorted(
+        by_category.values(), key=lambda row: row["total_allocation"], reverse=True
+    )
+
+
+def dollars_by_milestone():
+    """Allocation totals per milestone, read from the per-plan impact summaries"""
+    totals = (
+        ImpactSummary.objects.values("impact_plan__current_milestone_id")
+        .annotate(
+            total_allocation=Sum("total_allocation"),
+            impact_plans=Count("impact_plan_id", distinct=True),
+        )
+        .order_by()
+    )
+    names = dict(Milestone.objects.values_list("id", "name"))
+    return [
+        {
+            "milestone_id": row["impact_plan__current_milestone_id"],
+            "name": names.get(row["impact_plan__current_milestone_id"]),
+            "total_allocation": row["total_allocation"],
+            "impact_plans": row["impact_plans"],
+        }
+        for row in sorted(totals, key=lambda row: row["total_allocation"], reverse=True)
+    ]
+
+
+def philanthropy_distribution(bucket_width):
+    """Summary statistics, percentiles and a histogram of philanthropy_percentage
+
+    Each percentile is one ``ORDER BY ... LIMIT 1 OFFSET k`` query walking
+    the philanthropy_percentage index, and the histogram is a single
+    GROUP BY over FLOOR(percentage / bucket_width).
+    """
+    plans = ImpactPlan.objects.order_by()
+    stats = plans.aggregate(
+        count=Count("id"),
+        min=Min("philanthropy_percentage"),
+        max=Max("philanthropy_percentage"),
+        mean=Avg("philanthropy_percentage"),
+    )
+
+    percentiles = {}
+    if stats["count"]:
+        ordered = plans.order_by("philanthropy_percentage").values_list(
+            "philanthropy_percentage", flat=True
+        )
+        for percentile in PERCENTILES:
+            # Nearest-rank definition
+            offset = max(math.ceil(percentile / 100 * stats["count"]) - 1, 0)
+            percentiles[f"p{percentile}"] = ordered[offset]
+
+    buckets = (
+        plans.annotate(bucket=Floor(F("philanthropy_percentage") / Value(bucket_width)))
+        .values("bucket")
+        .annotate(count=Count("id"))
+        .order_by("bucket")
+    )
+    histogram = [
+        {
+            "from": row["bucket"] * bucket_width,
+            "to": (row["bucket"] + 1) * bucket_width,
+            "count": row["count"],
+        }
+        for row in buckets
+    ]
+    return {**stats, "percentiles": percentiles, "histogram": histogram}
+
+
+def build_analytics(bucket_width):
+    by_charity, by_category = dollars_by_charity()
+    return {
+        "generated_at": timezone.now(),
+        "by_charity": by_charity,
+        "by_category": by_category,
+        "by_milestone": dollars_by_milestone(),
+        "philanthropy_percentage": philanthropy_distribution(bucket_width),
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def platform_analytics(request):
+    """Report platform-wide allocation totals and plan distributions
+
+    Query parameters:
+      bucket_width -- histogram bucket size in percentage points (default 1)
+      refresh -- true to skip the cached result
+
+    Results are cached for ANALYTICS_CACHE_TIMEOUT seconds.
+    """
+    try:
+        bucket_width = Decimal(request.query_params.get("bucket_width", "1"))
+        if not bucket_width.is_finite() or bucket_width <= 0:
+            raise ValueError(bucket_width)
+    except (ValueError, InvalidOperation):
+        raise serializers.ValidationError(
+            {"bucket_width": "Must be a positive number."}
+        )
+
+    cache = caches["default"]
+    key = f"analytics:{bucket_width}"
+    data = None
+    if request.query_params.get("refresh", "").lower() not in ("true", "1", "yes"):
+        data = cache.get(key)
+    if data is None:
+        data = build_analytics(bucket_width)
+        cache.set(key, data, settings.ANALYTICS_CACHE_TIMEOUT)
+    return Response(data)
@@ -0,0 +1,92 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404
+from rest_framework import routers
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """Async list/retrieve for ViewSets when the app runs under ASGI
+
+    A ViewSet opts in by defining ``alist`` / ``aretrieve`` coroutines next
+    to its regular actions. AsyncReadRouter then sends GET requests for
+    those actions through adispatch(), which runs authentication and
+    permission checks like dispatch() and awaits the action instead of
+    blocking a thread on it. Every other method goes to the sync view.
+
+    The defaults below cover GenericViewSet subclasses; hand-written
+    ViewSets override them.
+    """
+
+    async def adispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = getattr(self, "a" + self.action)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        instances = [instance async for instance in queryset]
+        serializer = self.get_serializer(instances, many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        try:
+            instance = await self.get_queryset().aget(**lookup)
+        except (ObjectDoesNotExist, ValueError, TypeError) as ex:
+            raise Http404 from ex
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+def asgi_view(view):
+    """Wrap a router-generated ViewSet view so GET reads run async
+
+    Views whose ViewSet has no async handler for their GET action are
+    returned unchanged.
+    """
+    cls = getattr(view, "cls", None)
+    actions = getattr(view, "actions", None) or {}
+    read_action = actions.get("get")
+    if cls is None or read_action is None or not hasattr(cls, "a" + read_action):
+        return view
+
+    sync_view = sync_to_async(view)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method != "GET":
+            return await sync_view(request, *args, **kwargs)
+
+        self = cls(**view.initkwargs)
+        self.action_map = actions
+        for method, action in actions.items():
+            setattr(self, method, getattr(self, action))
+        return await self.adispatch(request, *args, **kwargs)
+
+    async_view.cls = cls
+    async_view.initkwargs = view.initkwargs
+    async_view.actions = actions
+    async_view.csrf_exempt = True
+    return async_view
+
+
+class AsyncReadRouter(routers.DefaultRouter):
+    """DefaultRouter whose read routes use the async ViewSet handlers"""
+
+    def get_urls(self):
+        urls = super().get_urls()
+        for url in urls:
+            url.callback = asgi_view(url.callback)
+        return urls
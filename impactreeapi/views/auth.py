@@ -1,11 +1,40 @@
-from django.contrib.auth import authenticate
+import json
+from django.contrib.auth import authenticate, get_backends
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.exceptions import PermissionDenied
 from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.authtoken.models import Token
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from impactreeapi.hashing import PasswordHashPoolFull, password_hash_pool
+
+REQUIRED_REGISTRATION_FIELDS = (
+    "email",
+    "first_name",
+    "last_name",
+    "password",
+    "username",
+)
+
+
+def user_data(user):
+    """The user fields returned by login and register"""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "is_staff": user.is_staff,
+    }
 
 
 @api_view(["POST"])
@@ -30,14 +59,7 @@ def login_user(request):
         data = {
             "valid": True,
             "token": token.key,
-            "user": {
-                "id": authenticated_user.id,
-                "username": authenticated_user.username,
-                "email": authenticated_user.email,
-                "first_name": authenticated_user.first_name,
-                "last_name": authenticated_user.last_name,
-                "is_staff": authenticated_user.is_staff,
-            },
+            "user": user_data(authenticated_user),
         }
         return Response(data)
     else:
@@ -90,14 +112,7 @@ def register_user(request):
         data = {
             "valid": True,
             "token": token.key,
-            "user": {
-                "id": new_user.id,
-                "username": new_user.username,
-                "email": new_user.email,
-                "first_name": new_user.first_name,
-                "last_name": new_user.last_name,
-                "is_staff": new_user.is_staff,
-            },
+            "user": user_data(new_user),
         }
         return Response(data)
 
@@ -107,3 +122,150 @@ def register_user(request):
         },
         status=status.HTTP_400_BAD_REQUEST,
     )
+
+
+def request_payload(request):
+    """Parse a JSON or form encoded body for the async views"""
+    if request.content_type != "application/json":
+        return request.POST
+    payload = json.loads(request.body or b"{}")
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object")
+    return payload
+
+
+async def amodel_backend_authenticate(backend, username, password):
+    """ModelBackend.authenticate() with every hash on the password hash pool"""
+    try:
+        user = await User._default_manager.aget_by_natural_key(username)
+    except User.DoesNotExist:
+        # Hash anyway so response time does not reveal unknown usernames
+        await password_hash_pool.run(make_password, password)
+        return None
+
+    valid, must_update = await password_hash_pool.run(
+        verify_password, password, user.password
+    )
+    if valid and must_update:
+        # Same as check_password's setter: store the hash in the current format
+        await password_hash_pool.run(user.set_password, password)
+        await user.asave(update_fields=["password"])
+    if valid and backend.user_can_authenticate(user):
+        return user
+    return None
+
+
+async def aauthenticate(request, username, password):
+    """authenticate() for the async views
+
+    Walks AUTHENTICATION_BACKENDS like authenticate() does, and sends
+    user_login_failed when none of them accepts the credentials. ModelBackend
+    hashes on the password hash pool; other backends use their own
+    aauthenticate().
+    """
+    for backend in get_backends():
+        try:
+            if isinstance(backend, ModelBackend):
+                user = await amodel_backend_authenticate(backend, username, password)
+            else:
+                user = await backend.aauthenticate(
+                    request, username=username, password=password
+                )
+        except PermissionDenied:
+            break
+        if user is not None:
+            return user
+
+    await user_login_failed.asend(
+        sender=__name__,
+        credentials={"username": username, "password": "********************"},
+        request=request,
+    )
+    return None
+
+
+def busy_response():
+    response = JsonResponse(
+        {"message": "Too many logins in progress, please retry"},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def alogin_user(request):
+    """Async version of login_user used when serving over ASGI
+
+    The password check runs on the bounded password hash pool, so a burst
+    of logins cannot block the event loop serving everything else.
+
+    Method arguments:
+      request -- The full HTTP request object
+    """
+    try:
+        payload = request_payload(request)
+        username = payload["username"]
+        password = payload["password"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse(
+            {"message": "You must provide username and password"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        user = await aauthenticate(request, username, password)
+    except PasswordHashPoolFull:
+        return busy_response()
+
+    if user is None:
+        return JsonResponse({"valid": False})
+
+    token = await Token.objects.aget(user=user)
+    return JsonResponse({"valid": True, "token": token.key, "user": user_data(user)})
+
+
+@csrf_exempt
+@require_POST
+async def aregister_user(request):
+    """Async version of register_user used when serving over ASGI
+
+    Method arguments:
+      request -- The full HTTP request object
+    """
+    try:
+        payload = request_payload(request)
+    except ValueError:
+        payload = {}
+    if any(payload.get(field) is None for field in REQUIRED_REGISTRATION_FIELDS):
+        return JsonResponse(
+            {
+                "message": "You must provide email, username, password, first_name, and last_name"
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        password = await password_hash_pool.run(make_password, payload["password"])
+    except PasswordHashPoolFull:
+        return busy_response()
+
+    try:
+        new_user = await User.objects.acreate(
+            username=User.normalize_username(payload["username"]),
+            email=User.objects.normalize_email(payload["email"]),
+            password=password,
+            first_name=payload["first_name"],
+            last_name=payload["last_name"],
+        )
+    except IntegrityError:
+        return JsonResponse(
+            {"message": "An account with that username already exists"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    token = await Token.objects.acreate(user=new_user)
+    return JsonResponse(
+        {"valid": True, "token": token.key, "user": user_data(new_user)}
+    )
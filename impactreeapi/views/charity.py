@@ -1,9 +1,21 @@
-from django.http import HttpResponseServerError
+from django.core.files.uploadedfile import UploadedFile
 from rest_framework import serializers, status, permissions
+from rest_framework.parsers import FormParser, JSONParser
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
-from impactreeapi.models import Charity
+from impactreeapi.models import Charity, CharityCategory
+from impactreeapi.conditional import conditional
+from impactreeapi.images import variant_urls
+from impactreeapi.cache import catalog_cache, request_cache_key
+from impactreeapi.pagination import (
+    apaginated_response,
+    paginated_response,
+    wants_unpaginated,
+)
+from impactreeapi.uploads import IMAGE_TYPES, ImageMultiPartParser
+from impactreeapi.views.asyncread import AsyncReadMixin
 from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly
+import math
 import uuid
 import base64
 from django.core.files.base import ContentFile
@@ -21,10 +33,79 @@ class IsAdminUserOrReadOnly(IsAuthenticatedOrReadOnly):
         return request.user and request.user.is_staff
 
 
-class CharityViewSet(ViewSet):
+def charity_image(value):
+    """Return a file to store for the image field, or None to keep the current one
+
+    Accepts a streamed multipart upload, whose size and type the parser has
+    already checked, or a base64 data URL in a JSON body.
+    """
+    if isinstance(value, UploadedFile):
+        value.name = f"charity-{uuid.uuid4()}.{IMAGE_TYPES[value.content_type]}"
+        return value
+    if isinstance(value, str) and value.startswith("data:"):
+        format, imgstr = value.split(";base64,")
+        ext = format.split("/")[-1]
+        return ContentFile(
+            base64.b64decode(imgstr), name=f"charity-{uuid.uuid4()}.{ext}"
+        )
+    return None
+
+
+CHARITY_ORDERINGS = ("id", "name", "impact_ratio")
+
+
+def filtered_charities(request):
+    """Apply the list query parameters to the charity queryset
+
+    Returns (queryset, ordering); ordering always ends with id so cursor
+    pagination stays stable on ties. Invalid parameters raise a
+    ValidationError, which DRF turns into a 400.
+    """
+    params = request.query_params
+    charities = Charity.objects.select_related("category")
+    errors = {}
+
+    if params.get("category"):
+        try:
+            category_ids = [int(value) for value in params["category"].split(",")]
+        except ValueError:
+            errors["category"] = "Must be a comma-separated list of category ids."
+        else:
+            charities = charities.filter(category_id__in=category_ids)
+
+    for param, lookup in (
+        ("min_impact_ratio", "impact_ratio__gte"),
+        ("max_impact_ratio", "impact_ratio__lte"),
+    ):
+        if params.get(param):
+            try:
+                bound = float(params[param])
+                if not math.isfinite(bound):
+                    raise ValueError(bound)
+            except ValueError:
+                errors[param] = "Must be a number."
+            else:
+                charities = charities.filter(**{lookup: bound})
+
+    ordering = params.get("ordering", "id")
+    if ordering.lstrip("-") not in CHARITY_ORDERINGS:
+        choices = ", ".join(CHARITY_ORDERINGS)
+        errors["ordering"] = f"Must be one of {choices}, optionally prefixed with -."
+
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    charities = charities.search(params.get("search"))
+    if ordering.lstrip("-") != "id":
+        return charities, (ordering, "id")
+    return charities, (ordering,)
+
+
+class CharityViewSet(AsyncReadMixin, ViewSet):
     """Charity view set"""
 
     permission_classes = [IsAdminUserOrReadOnly]
+    parser_classes = [JSONParser, FormParser, ImageMultiPartParser]
 
     def create(self, request):
         """Handle POST operations
@@ -34,12 +115,9 @@ class CharityViewSet(ViewSet):
         """
         charity = Charity()
 
-        if "image" in request.data and request.data["image"]:
-            format, imgstr = request.data["image"].split(";base64,")
-            ext = format.split("/")[-1]
-            charity.image = ContentFile(
-                base64.b64decode(imgstr), name=f"charity-{uuid.uuid4()}.{ext}"
-            )
+        image = charity_image(request.data.get("image"))
+        if image is not None:
+            charity.image = image
 
         charity.name = request.data["name"]
         charity.description = request.data["description"]
@@ -54,10 +132,12 @@ class CharityViewSet(ViewSet):
         try:
             charity.save()
             serializer = CharitySerializer(charity)
+            catalog_cache.set(f"charities:detail:{charity.pk}", serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as ex:
             return Response({"reason": ex.args[0]}, status=status.HTTP_400_BAD_REQUEST)
 
+    @conditional(Charity, CharityCategory)
     def retrieve(self, request, pk=None):
         """Handle GET requests for single item
 
@@ -65,9 +145,14 @@ class CharityViewSet(ViewSet):
             Response -- JSON serialized instance
         """
         try:
-            charity = Charity.objects.get(pk=pk)
-            serializer = CharitySerializer(charity)
-            return Response(serializer.data)
+            data = catalog_cache.get_or_build(
+                f"charities:detail:{pk}",
+                lambda: CharitySerializer(
+                    Charity.objects.select_related("category").get(pk=pk)
+                ).data,
+                request.table_snapshot,
+            )
+            return Response(data)
         except Charity.DoesNotExist:
             return Response(
                 {"message": "Charity not found"}, status=status.HTTP_404_NOT_FOUND
@@ -77,20 +162,13 @@ class CharityViewSet(ViewSet):
 
     def update(self, request, pk=None):
         """Handle PUT requests"""
+        # A media URL path or an empty value keeps the existing image
+        image = charity_image(request.data.get("image"))
         try:
             charity = Charity.objects.get(pk=pk)
 
-            if "image" in request.data and request.data["image"]:
-                # Only process if it's a new base64 image
-                if request.data["image"].startswith("data:"):
-                    format, imgstr = request.data["image"].split(";base64,")
-                    ext = format.split("/")[-1]
-                    charity.image = ContentFile(
-                        base64.b64decode(imgstr), name=f"charity-{uuid.uuid4()}.{ext}"
-                    )
-                # If it's a media URL path, just preserve the existing image
-                elif request.data["image"].startswith("/media/"):
-                    pass  # Keep existing image, no processing needed
+            if image is not None:
+                charity.image = image
 
             if "name" in request.data:
                 charity.name = request.data["name"]
@@ -106,14 +184,15 @@ class CharityViewSet(ViewSet):
                 charity.category_id = request.data["category"]
 
             charity.save()
+            catalog_cache.set(
+                f"charities:detail:{charity.pk}", CharitySerializer(charity).data
+            )
             return Response(None, status=status.HTTP_204_NO_CONTENT)
 
         except Charity.DoesNotExist:
             return Response(
                 {"message": "Charity not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as ex:
-            return HttpResponseServerError(ex)
 
     def destroy(self, request, pk=None):
         """Handle DELETE requests for a single item
@@ -129,28 +208,88 @@ class CharityViewSet(ViewSet):
             return Response(
                 {"message": "Charity not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as ex:
-            return Response(
-                {"message": ex.args[0]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
 
+    @conditional(Charity, CharityCategory)
     def list(self, request):
         """Handle GET requests for all items
 
+        Query parameters:
+            category -- comma-separated category ids
+            min_impact_ratio, max_impact_ratio -- inclusive bounds
+            search -- words matched against name, description and impact metric
+            ordering -- id, name or impact_ratio, prefixed with - to reverse
+
         Returns:
-            Response -- JSON serialized array
+            Response -- JSON serialized page of charities, or the full
+            array when called with ?paginate=false
         """
+        charities, ordering = filtered_charities(request)
+        data = catalog_cache.get_or_build(
+            request_cache_key("charities:list", request),
+            lambda: self.list_data(request, charities, ordering),
+            request.table_snapshot,
+        )
+        return Response(data, status=status.HTTP_200_OK)
+
+    def list_data(self, request, charities, ordering):
+        """Serialize the charity listing for this request"""
+        if not wants_unpaginated(request):
+            return paginated_response(
+                self, request, charities, CharitySerializer, ordering
+            ).data
+
+        return CharitySerializer(charities.order_by(*ordering), many=True).data
+
+    @conditional(Charity, CharityCategory)
+    async def aretrieve(self, request, pk=None):
+        """Async version of retrieve, used under ASGI"""
+
+        async def build():
+            charity = await Charity.objects.select_related("category").aget(pk=pk)
+            return CharitySerializer(charity).data
+
         try:
-            charities = Charity.objects.all()
-            serializer = CharitySerializer(charities, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            data = await catalog_cache.aget_or_build(
+                f"charities:detail:{pk}", build, request.table_snapshot
+            )
+            return Response(data)
+        except Charity.DoesNotExist:
+            return Response(
+                {"message": "Charity not found"}, status=status.HTTP_404_NOT_FOUND
+            )
         except Exception as ex:
-            return HttpResponseServerError(ex)
+            return Response({"reason": ex.args[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+    @conditional(Charity, CharityCategory)
+    async def alist(self, request):
+        """Async version of list, used under ASGI"""
+        charities, ordering = filtered_charities(request)
+        data = await catalog_cache.aget_or_build(
+            request_cache_key("charities:list", request),
+            lambda: self.alist_data(request, charities, ordering),
+            request.table_snapshot,
+        )
+        return Response(data, status=status.HTTP_200_OK)
+
+    async def alist_data(self, request, charities, ordering):
+        if not wants_unpaginated(request):
+            response = await apaginated_response(
+                self, request, charities, CharitySerializer, ordering
+            )
+            return response.data
+
+        instances = [charity async for charity in charities.order_by(*ordering)]
+        return CharitySerializer(instances, many=True).data
 
 
 class CharitySerializer(serializers.ModelSerializer):
     """JSON serializer for Charity"""
 
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image, obj.image_variants)
+
     class Meta:
         model = Charity
         fields = (
@@ -162,5 +301,6 @@ class CharitySerializer(serializers.ModelSerializer):
             "impact_ratio",
             "website_url",
             "image",
+            "image_variants",
         )
         depth = 1
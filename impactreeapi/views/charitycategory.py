@@ -1,8 +1,12 @@
 from rest_framework import viewsets, serializers
+from rest_framework.response import Response
 from impactreeapi.models import CharityCategory
+from impactreeapi.cache import catalog_cache
+from impactreeapi.conditional import conditional
+from impactreeapi.views.asyncread import AsyncReadMixin
 
 
-class CharityCategoryViewSet(viewsets.ModelViewSet):
+class CharityCategoryViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     queryset = CharityCategory.objects.all()
 
     class CharityCategorySerializer(serializers.ModelSerializer):
@@ -11,3 +15,47 @@ class CharityCategoryViewSet(viewsets.ModelViewSet):
             fields = ["id", "name"]
 
     serializer_class = CharityCategorySerializer
+
+    @conditional(CharityCategory)
+    def list(self, request, *args, **kwargs):
+        parent_list = super().list
+        data = catalog_cache.get_or_build(
+            "charitycategories:list",
+            lambda: parent_list(request, *args, **kwargs).data,
+            request.table_snapshot,
+        )
+        return Response(data)
+
+    @conditional(CharityCategory)
+    def retrieve(self, request, *args, **kwargs):
+        parent_retrieve = super().retrieve
+        data = catalog_cache.get_or_build(
+            f"charitycategories:detail:{kwargs['pk']}",
+            lambda: parent_retrieve(request, *args, **kwargs).data,
+            request.table_snapshot,
+        )
+        return Response(data)
+
+    @conditional(CharityCategory)
+    async def alist(self, request, *args, **kwargs):
+        parent_alist = super().alist
+
+        async def build():
+            return (await parent_alist(request, *args, **kwargs)).data
+
+        data = await catalog_cache.aget_or_build(
+            "charitycategories:list", build, request.table_snapshot
+        )
+        return Response(data)
+
+    @conditional(CharityCategory)
+    async def aretrieve(self, request, *args, **kwargs):
+        parent_aretrieve = super().aretrieve
+
+        async def build():
+            return (await parent_aretrieve(request, *args, **kwargs)).data
+
+        data = await catalog_cache.aget_or_build(
+            f"charitycategories:detail:{kwargs['pk']}", build, request.table_snapshot
+        )
+        return Response(data)
@@ -1,38 +1,71 @@
-from django.http import HttpResponseServerError
+from decimal import Decimal, InvalidOperation
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 from django.contrib.auth.models import User
-from impactreeapi.models import ImpactPlan, Milestone, ImpactPlanCharity
-from django.db.models import Max
-
-
-class ImpactPlanViewSet(ViewSet):
+from django.db import IntegrityError, transaction
+from impactreeapi.models import Charity, ImpactPlan, ImpactPlanCharity, ImpactSummary
+from impactreeapi.milestones import milestone_resolver
+from impactreeapi.pagination import (
+    apaginated_response,
+    paginated_response,
+    wants_unpaginated,
+)
+from impactreeapi.views.asyncread import AsyncReadMixin
+
+
+class ImpactPlanViewSet(AsyncReadMixin, ViewSet):
     """ImpactPlan view set"""
 
     def get_appropriate_milestone(self, philanthropy_percentage):
         """Helper method to get the appropriate milestone based on philanthropy percentage"""
-        return (
-            Milestone.objects.filter(required_percentage__lte=philanthropy_percentage)
-            .order_by("-required_percentage")
-            .first()
+        return milestone_resolver.resolve(philanthropy_percentage)
+
+    def create_allocations(self, impact_plan, charities_data):
+        """Insert all charity allocations for a new plan with one bulk insert
+
+        Every charity id is checked in a single query first; a missing or
+        repeated charity or a malformed amount raises ValueError so the
+        caller's transaction rolls back.
+        """
+        allocations = []
+        for charity_data in charities_data:
+            try:
+                charity_id = int(charity_data["charity_id"])
+                allocation_amount = Decimal(str(charity_data["allocation_amount"]))
+            except (KeyError, TypeError, ValueError, InvalidOperation) as ex:
+                raise ValueError(f"Invalid charity allocation: {charity_data}") from ex
+            if not allocation_amount.is_finite():
+                raise ValueError(f"Invalid charity allocation: {charity_data}")
+            allocations.append(
+                ImpactPlanCharity(
+                    impact_plan=impact_plan,
+                    charity_id=charity_id,
+                    allocation_amount=allocation_amount,
+                )
+            )
+
+        charity_ids = {allocation.charity_id for allocation in allocations}
+        if len(charity_ids) != len(allocations):
+            raise ValueError("Each charity may only appear once per impact plan")
+        found_ids = set(
+            Charity.objects.filter(pk__in=charity_ids).values_list("pk", flat=True)
         )
+        missing_ids = sorted(charity_ids - found_ids)
+        if missing_ids:
+            raise ValueError(f"Charities not found: {missing_ids}")
+
+        ImpactPlanCharity.objects.bulk_create(allocations)
+        # bulk_create sends no signals, so the summary is refreshed here
+        ImpactSummary.objects.refresh([impact_plan.pk])
 
     def create(self, request):
         """Handle POST operations"""
         try:
             user = User.objects.get(pk=request.data["user"])
 
-            # Check if the user already has an impact plan
-            existing_plan = ImpactPlan.objects.filter(user=user).first()
-            if existing_plan:
-                return Response(
-                    {"message": "User already has an impact plan."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
             impact_plan = ImpactPlan()
-            impact_plan.user = User.objects.get(pk=request.data["user"])
+            impact_plan.user = user
             impact_plan.annual_income = request.data["annual_income"]
             impact_plan.philanthropy_percentage = request.data[
                 "philanthropy_percentage"
@@ -46,28 +79,28 @@ class ImpactPlanViewSet(ViewSet):
                 impact_plan.philanthropy_percentage
             )
 
-            impact_plan.save()
-
-            # Handle charity allocations if provided
-            charities_data = request.data.get("charities", [])
-            for charity_data in charities_data:
-                ImpactPlanCharity.objects.create(
-                    impact_plan=impact_plan,
-                    charity_id=charity_data["charity_id"],
-                    allocation_amount=charity_data["allocation_amount"],
-                )
+            # The plan and its allocations are saved together or not at all.
+            # Allocations are deduplicated up front, so the only constraint
+            # the block can violate is the one plan per user.
+            with transaction.atomic():
+                impact_plan.save()
+                self.create_allocations(impact_plan, request.data.get("charities", []))
 
+            impact_plan = ImpactPlan.objects.with_details().get(pk=impact_plan.pk)
             serializer = ImpactPlanSerializer(impact_plan)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except IntegrityError:
+            return Response(
+                {"message": "User already has an impact plan."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         except Exception as ex:
             return Response({"reason": ex.args[0]}, status=status.HTTP_400_BAD_REQUEST)
 
     def retrieve(self, request, pk=None):
         """Handle GET requests for single ImpactPlan"""
         try:
-            impact_plan = ImpactPlan.objects.prefetch_related(
-                "impactplancharity_set", "impactplancharity_set__charity"
-            ).get(pk=pk)
+            impact_plan = ImpactPlan.objects.with_details().get(pk=pk)
             serializer = ImpactPlanSerializer(impact_plan)
             return Response(serializer.data)
         except ImpactPlan.DoesNotExist:
@@ -110,8 +143,8 @@ class ImpactPlanViewSet(ViewSet):
             return Response(serializer.data)
         except ImpactPlan.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        except Exception as ex:
-            return HttpResponseServerError(ex)
+        except ValueError as ex:
+            return Response({"reason": ex.args[0]}, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, pk=None):
         """Handle DELETE requests for a single ImpactPlan"""
@@ -121,21 +154,41 @@ class ImpactPlanViewSet(ViewSet):
             return Response(None, status=status.HTTP_204_NO_CONTENT)
         except ImpactPlan.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        except Exception as ex:
-            return Response(
-                {"message": ex.args[0]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
 
     def list(self, request):
-        """Handle GET requests for all ImpactPlans"""
+        """Handle GET requests for all ImpactPlans
+
+        Responses are cursor paginated; pass ?paginate=false for the full array.
+        """
+        impact_plans = ImpactPlan.objects.with_details().order_by("id")
+        if not wants_unpaginated(request):
+            return paginated_response(self, request, impact_plans, ImpactPlanSerializer)
+
+        serializer = ImpactPlanSerializer(impact_plans, many=True)
+        return Response(serializer.data)
+
+    async def aretrieve(self, request, pk=None):
+        """Async version of retrieve, used under ASGI"""
         try:
-            impact_plans = ImpactPlan.objects.prefetch_related(
-                "impactplancharity_set", "impactplancharity_set__charity"
-            ).all()
-            serializer = ImpactPlanSerializer(impact_plans, many=True)
+            impact_plan = await ImpactPlan.objects.with_details().aget(pk=pk)
+            serializer = ImpactPlanSerializer(impact_plan)
             return Response(serializer.data)
+        except ImpactPlan.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
         except Exception as ex:
-            return HttpResponseServerError(ex)
+            return Response({"reason": ex.args[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+    async def alist(self, request):
+        """Async version of list, used under ASGI"""
+        impact_plans = ImpactPlan.objects.with_details().order_by("id")
+        if not wants_unpaginated(request):
+            return await apaginated_response(
+                self, request, impact_plans, ImpactPlanSerializer
+            )
+
+        instances = [impact_plan async for impact_plan in impact_plans]
+        serializer = ImpactPlanSerializer(instances, many=True)
+        return Response(serializer.data)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -162,6 +215,14 @@ class ImpactPlanCharitySerializer(serializers.ModelSerializer):
         depth = 1
 
 
+class ImpactSummarySerializer(serializers.ModelSerializer):
+    """JSON serializer for ImpactSummary"""
+
+    class Meta:
+        model = ImpactSummary
+        fields = ("impact_metric", "total_allocation", "total_impact")
+
+
 class ImpactPlanSerializer(serializers.ModelSerializer):
     """JSON serializer for ImpactPlan"""
 
@@ -169,6 +230,9 @@ class ImpactPlanSerializer(serializers.ModelSerializer):
     charities = ImpactPlanCharitySerializer(
         source="impactplancharity_set", many=True, read_only=True
     )
+    impact_summary = ImpactSummarySerializer(
+        source="impact_summaries", many=True, read_only=True
+    )
 
     class Meta:
         model = ImpactPlan
@@ -180,5 +244,6 @@ class ImpactPlanSerializer(serializers.ModelSerializer):
             "total_annual_allocation",
             "current_milestone",
             "charities",
+            "impact_summary",
         )
         depth = 1
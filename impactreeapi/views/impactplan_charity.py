@@ -1,8 +1,10 @@
-from django.http import HttpResponseServerError
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
-from impactreeapi.models import ImpactPlanCharity, ImpactPlan, Charity
+from impactreeapi.models import ImpactPlanCharity, ImpactPlan, Charity, ImpactSummary
 
 
 class ImpactPlanCharityViewSet(ViewSet):
@@ -15,24 +17,20 @@ class ImpactPlanCharityViewSet(ViewSet):
             impact_plan = ImpactPlan.objects.get(pk=request.data["impact_plan_id"])
             charity = Charity.objects.get(pk=request.data["charity_id"])
 
-            # Check if relationship already exists
-            existing_relation = ImpactPlanCharity.objects.filter(
-                impact_plan=impact_plan, charity=charity
-            ).first()
-
-            if existing_relation:
+            # The unique (impact_plan, charity) constraint rejects duplicates
+            try:
+                with transaction.atomic():
+                    impact_plan_charity = ImpactPlanCharity.objects.create(
+                        impact_plan=impact_plan,
+                        charity=charity,
+                        allocation_amount=request.data["allocation_amount"],
+                    )
+            except IntegrityError:
                 return Response(
                     {"message": "This charity is already in the impact plan"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Create the new relationship
-            impact_plan_charity = ImpactPlanCharity.objects.create(
-                impact_plan=impact_plan,
-                charity=charity,
-                allocation_amount=request.data["allocation_amount"],
-            )
-
             serializer = ImpactPlanCharitySerializer(impact_plan_charity)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -44,10 +42,6 @@ class ImpactPlanCharityViewSet(ViewSet):
             return Response(
                 {"message": "Charity not found"}, status=status.HTTP_404_NOT_FOUND
             )
-        except Exception as ex:
-            return Response(
-                {"message": str(ex)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
 
     def update(self, request, pk=None):
         """Handle PUT requests for updating allocation amount"""
@@ -71,10 +65,6 @@ class ImpactPlanCharityViewSet(ViewSet):
 
         except ImpactPlanCharity.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        except Exception as ex:
-            return Response(
-                {"message": str(ex)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
 
     def destroy(self, request, pk=None):
         """Handle DELETE requests for a single ImpactPlanCharity relationship"""
@@ -103,8 +93,224 @@ class ImpactPlanCharityViewSet(ViewSet):
                 {"message": "No impact plan found for this user"},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        except Exception as ex:
-            return HttpResponseServerError(ex)
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """Handle POST requests applying many create/update/delete operations
+
+        Expects {"operations": [...]} where each operation is one of
+          {"op": "create", "impact_plan_id", "charity_id", "allocation_amount"}
+          {"op": "update", "id", "allocation_amount"}
+          {"op": "delete", "id"}
+
+        Lookups, the duplicate check and the writes are all set-based, and
+        the batch is applied in one transaction: either every operation
+        succeeds or none is applied.
+
+        Returns:
+            Response -- {"results": [...]} with one entry per operation
+        """
+        if not isinstance(request.data, dict):
+            return Response(
+                {"message": "Expected an object with an operations list"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        operations = request.data.get("operations")
+        if not isinstance(operations, list):
+            return Response(
+                {"message": "operations must be a list"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            parsed, errors = self.parse_operations(operations)
+            errors.update(self.check_operations(parsed))
+            if errors:
+                results = [
+                    errors.get(
+                        index,
+                        {
+                            "status": status.HTTP_424_FAILED_DEPENDENCY,
+                            "message": "Not applied because another operation failed",
+                        },
+                    )
+                    for index in range(len(operations))
+                ]
+                return Response(
+                    {"results": results}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+            results = self.apply_operations(parsed)
+            return Response({"results": results}, status=status.HTTP_200_OK)
+        except IntegrityError:
+            # A concurrent request added one of the pairs after the check
+            return Response(
+                {"message": "This charity is already in the impact plan"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+    def parse_operations(self, operations):
+        """Validate the shape of each operation without touching the database"""
+        parsed = []
+        errors = {}
+        for index, operation in enumerate(operations):
+            try:
+                op = operation["op"]
+                if op == "create":
+                    parsed.append(
+                        {
+                            "op": op,
+                            "impact_plan_id": int(operation["impact_plan_id"]),
+                            "charity_id": int(operation["charity_id"]),
+                            "allocation_amount": self.parse_amount(operation),
+                        }
+                    )
+                elif op == "update":
+                    parsed.append(
+                        {
+                            "op": op,
+                            "id": int(operation["id"]),
+                            "allocation_amount": self.parse_amount(operation),
+                        }
+                    )
+                elif op == "delete":
+                    parsed.append({"op": op, "id": int(operation["id"])})
+                else:
+                    raise ValueError(f"Unknown op: {op}")
+            except (KeyError, TypeError, ValueError, InvalidOperation) as ex:
+                errors[index] = {
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "message": f"Invalid operation: {ex}",
+                }
+                parsed.append(None)
+        return parsed, errors
+
+    def parse_amount(self, operation):
+        amount = Decimal(str(operation["allocation_amount"]))
+        if not amount.is_finite():
+            raise ValueError("allocation_amount must be a number")
+        return amount
+
+    def check_operations(self, parsed):
+        """Resolve every referenced row with one query per table
+
+        Loaded objects are stored back on each operation for apply_operations.
+        Returns a dict of per-index errors.
+        """
+        creates = [op for op in parsed if op and op["op"] == "create"]
+        changes = [op for op in parsed if op and op["op"] != "create"]
+
+        impact_plans = ImpactPlan.objects.in_bulk(
+            {op["impact_plan_id"] for op in creates}
+        )
+        charities = Charity.objects.in_bulk({op["charity_id"] for op in creates})
+        allocations = ImpactPlanCharity.objects.select_related(
+            "impact_plan", "charity"
+        ).in_bulk({op["id"] for op in changes})
+
+        deleted_ids = {op["id"] for op in changes if op["op"] == "delete"}
+        taken_pairs = {
+            pair
+            for pair in ImpactPlanCharity.objects.filter(
+                impact_plan_id__in=list(impact_plans),
+                charity_id__in=list(charities),
+            )
+            .exclude(pk__in=deleted_ids)
+            .values_list("impact_plan_id", "charity_id")
+        }
+
+        errors = {}
+        touched_ids = set()
+        for index, op in enumerate(parsed):
+            if op is None:
+                continue
+            if op["op"] == "create":
+                pair = (op["impact_plan_id"], op["charity_id"])
+                if op["impact_plan_id"] not in impact_plans:
+                    errors[index] = {
+                        "status": status.HTTP_404_NOT_FOUND,
+                        "message": "Impact Plan not found",
+                    }
+                elif op["charity_id"] not in charities:
+                    errors[index] = {
+                        "status": status.HTTP_404_NOT_FOUND,
+                        "message": "Charity not found",
+                    }
+                elif pair in taken_pairs:
+                    errors[index] = {
+                        "status": status.HTTP_400_BAD_REQUEST,
+                        "message": "This charity is already in the impact plan",
+                    }
+                else:
+                    taken_pairs.add(pair)
+                    op["impact_plan"] = impact_plans[op["impact_plan_id"]]
+                    op["charity"] = charities[op["charity_id"]]
+            elif op["id"] not in allocations:
+                errors[index] = {
+                    "status": status.HTTP_404_NOT_FOUND,
+                    "message": "Impact Plan Charity not found",
+                }
+            elif op["id"] in touched_ids:
+                errors[index] = {
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "message": "Each allocation may only appear once per batch",
+                }
+            else:
+                touched_ids.add(op["id"])
+                op["allocation"] = allocations[op["id"]]
+        return errors
+
+    def apply_operations(self, parsed):
+        """Write a checked batch with one statement per operation type"""
+        created = []
+        updated = []
+        deleted_ids = []
+        impact_plan_ids = set()
+        for op in parsed:
+            if op["op"] == "create":
+                created.append(
+                    ImpactPlanCharity(
+                        impact_plan=op["impact_plan"],
+                        charity=op["charity"],
+                        allocation_amount=op["allocation_amount"],
+                    )
+                )
+                impact_plan_ids.add(op["impact_plan_id"])
+            elif op["op"] == "update":
+                op["allocation"].allocation_amount = op["allocation_amount"]
+                updated.append(op["allocation"])
+                impact_plan_ids.add(op["allocation"].impact_plan_id)
+            else:
+                deleted_ids.append(op["id"])
+                impact_plan_ids.add(op["allocation"].impact_plan_id)
+
+        with transaction.atomic():
+            if deleted_ids:
+                # Nothing references an allocation, so a raw DELETE is safe, and
+                # it skips the per-row post_delete summary refresh
+                ImpactPlanCharity.objects.filter(pk__in=deleted_ids)._raw_delete(
+                    ImpactPlanCharity.objects.db
+                )
+            if updated:
+                ImpactPlanCharity.objects.bulk_update(updated, ["allocation_amount"])
+            if created:
+                ImpactPlanCharity.objects.bulk_create(created)
+            # The bulk writes send no signals, so refresh the summaries here
+            ImpactSummary.objects.refresh(impact_plan_ids)
+
+        created_rows = iter(created)
+        results = []
+        for op in parsed:
+            if op["op"] == "create":
+                data = ImpactPlanCharitySerializer(next(created_rows)).data
+                results.append({"status": status.HTTP_201_CREATED, "data": data})
+            elif op["op"] == "update":
+                data = ImpactPlanCharitySerializer(op["allocation"]).data
+                results.append({"status": status.HTTP_200_OK, "data": data})
+            else:
+                results.append({"status": status.HTTP_204_NO_CONTENT, "id": op["id"]})
+        return results
 
 
 class ImpactPlanCharitySerializer(serializers.ModelSerializer):
@@ -0,0 +1,158 @@
+import mimetypes
+import os
+import re
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+from django.views.static import serve
+
+# Uploads in these directories get a fresh UUID name on every upload, so a
+# URL never changes content and clients may cache it forever
+IMMUTABLE_PREFIXES = ("charityimages/",)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def cache_control(path):
+    if path.startswith(IMMUTABLE_PREFIXES):
+        return IMMUTABLE_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
+
+
+def file_etag(stat):
+    return quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+
+def parse_range(header, size):
+    """Return (start, end) for a single byte range, inclusive
+
+    Returns None when the header should be ignored and the whole file sent
+    (missing, malformed or multi-range), and raises ValueError when the
+    range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final ``last`` bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range outside the file")
+    return start, end
+
+
+def range_applies(request, etag, last_modified):
+    """Honour If-Range: only serve a range of the version the client has"""
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def offload(header, value, full_path):
+    """Hand the file body to the front proxy and only send headers"""
+    content_type, encoding = mimetypes.guess_type(full_path)
+    response = HttpResponse(content_type=content_type or "application/octet-stream")
+    response[header] = value
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT according to MEDIA_SERVING
+
+    static            -- django.views.static.serve, as in development
+    app               -- served here with ETag, Range and long-lived caching;
+                         full responses use the server's sendfile support
+    x-accel-redirect  -- nginx sends the body from MEDIA_ACCEL_REDIRECT_PREFIX
+    x-sendfile        -- Apache/lighttpd send the body from the file path
+    """
+    mode = settings.MEDIA_SERVING
+    if mode == "static":
+        return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    try:
+        full_path = safe_join(os.path.abspath(settings.MEDIA_ROOT), path)
+        stat = os.stat(full_path)
+    except (OSError, SuspiciousFileOperation) as ex:
+        raise Http404("File not found") from ex
+    if not os.path.isfile(full_path):
+        raise Http404("File not found")
+
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": cache_control(path),
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None and mode == "x-accel-redirect":
+        prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+        response = offload("X-Accel-Redirect", prefix + path, full_path)
+    elif response is None and mode == "x-sendfile":
+        response = offload("X-Sendfile", full_path, full_path)
+    elif response is None:
+        response = file_response(request, full_path, stat, etag, last_modified)
+
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def file_response(request, full_path, stat, etag, last_modified):
+    size = stat.st_size
+    try:
+        byte_range = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None or not range_applies(request, etag, last_modified):
+        # FileResponse hands the open file to wsgi.file_wrapper, which
+        # gunicorn turns into os.sendfile() on its sync workers
+        response = FileResponse(open(full_path, "rb"))
+    else:
+        start, end = byte_range
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response = StreamingHttpResponse(
+            read_range(full_path, start, end - start + 1),
+            status=206,
+            content_type=content_type or "application/octet-stream",
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    return response
@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from impactreeapi.metrics import registry
+from impactreeapi.prometheus import CONTENT_TYPE
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def prometheus_metrics(request):
+    """Report request, database, cache and worker metrics for Prometheus
+
+    Method arguments:
+      request -- The full HTTP request object
+    """
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
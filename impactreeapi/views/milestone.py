@@ -1,5 +1,7 @@
 from rest_framework import viewsets, serializers
 from impactreeapi.models import Milestone
+from impactreeapi.conditional import conditional
+from impactreeapi.views.asyncread import AsyncReadMixin
 
 
 class MilestoneSerializer(serializers.ModelSerializer):
@@ -8,6 +10,22 @@ class MilestoneSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "description", "required_percentage", "image_filename"]
 
 
-class MilestoneViewSet(viewsets.ModelViewSet):
+class MilestoneViewSet(AsyncReadMixin, viewsets.ModelViewSet):
     queryset = Milestone.objects.all()
     serializer_class = MilestoneSerializer
+
+    @conditional(Milestone)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(Milestone)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @conditional(Milestone)
+    async def alist(self, request, *args, **kwargs):
+        return await super().alist(request, *args, **kwargs)
+
+    @conditional(Milestone)
+    async def aretrieve(self, request, *args, **kwargs):
+        return await super().aretrieve(request, *args, **kwargs)
@@ -0,0 +1,25 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from impactreeapi.authentication import token_cache
+from impactreeapi.cache import catalog_cache
+from impactreeapi.hashing import password_hash_pool
+from impactreeapi.instrumentation import request_stats
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def runtime_stats(request):
+    """Report in-process counters for this worker
+
+    Method arguments:
+      request -- The full HTTP request object
+    """
+    return Response(
+        {
+            "catalog_cache": catalog_cache.stats(),
+            "token_cache": token_cache.stats(),
+            "password_hashing": password_hash_pool.stats(),
+            "requests": request_stats.stats(),
+        }
+    )
@@ -1,4 +1,3 @@
-from django.http import HttpResponseServerError
 from rest_framework import serializers, status
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
@@ -52,9 +51,6 @@ class TemplateView(ViewSet):
         except Void.DoesNotExist:
             return Response(None, status=status.HTTP_404_NOT_FOUND)
 
-        except Exception as ex:
-            return HttpResponseServerError(ex)
-
         return Response(None, status=status.HTTP_204_NO_CONTENT)
 
     def destroy(self, request, pk=None):
@@ -71,23 +67,15 @@ class TemplateView(ViewSet):
         except Void.DoesNotExist as ex:
             return Response({"message": ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
-        except Exception as ex:
-            return Response(
-                {"message": ex.args[0]}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
     def list(self, request):
         """Handle GET requests for all items
 
         Returns:
             Response -- JSON serialized array
         """
-        try:
-            voids = Void.objects.all()
-            serializer = VoidSerializer(voids, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Exception as ex:
-            return HttpResponseServerError(ex)
+        voids = Void.objects.all()
+        serializer = VoidSerializer(voids, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 class VoidSerializer(serializers.ModelSerializer):
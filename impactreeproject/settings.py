@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import dj_database_url
 from django.core.management.utils import get_random_secret_key
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -16,6 +17,10 @@ DEBUG = os.getenv("DEBUG", "False")
 ALLOWED_HOSTS = os.getenv("DJANGO_ALLOWED_HOSTS", "").split(",")
 DEVELOPMENT_MODE = os.getenv("DEVELOPMENT_MODE", "False")
 
+# "wsgi" or "asgi"; impactreeproject/asgi.py defaults this to "asgi" so the
+# async login/register views are routed when served by an ASGI server
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+
 
 # Application definition
 
@@ -34,13 +39,27 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "impactreeapi.authentication.CachedTokenAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    "EXCEPTION_HANDLER": "impactreeapi.exceptions.exception_handler",
 }
 
+# CachedTokenAuthentication keeps up to TOKEN_CACHE_MAX_ENTRIES token -> user
+# lookups per worker, each for at most TOKEN_CACHE_TTL seconds. Deleting a
+# token or deactivating a user evicts it only in the worker that made the
+# change, so the other workers keep accepting it for up to TOKEN_CACHE_TTL
+# seconds. TOKEN_CACHE_TTL=0 turns the cache off.
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "60"))
+
+# The milestone resolver reloads at once after a milestone change in this
+# worker, and notices changes made by other workers within
+# MILESTONE_CACHE_TTL seconds. MILESTONE_CACHE_TTL=0 checks on every lookup.
+MILESTONE_CACHE_TTL = int(os.getenv("MILESTONE_CACHE_TTL", "5"))
+
 CORS_ORIGIN_WHITELIST = (
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -51,6 +70,7 @@ CORS_ORIGIN_WHITELIST = (
 
 
 MIDDLEWARE = [
+    "impactreeapi.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -59,8 +79,45 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "impactreeapi.replicas.ReplicaRoutingMiddleware",
 ]
 
+# REQUEST_INSTRUMENTATION=True adds impactreeapi.instrumentation's middleware
+# first, so it times everything else: it sends Server-Timing headers, logs a
+# JSON line per request on "impactreeapi.requests" and keeps the latest
+# REQUEST_INSTRUMENTATION_WINDOW requests per view action for GET /stats
+
+REQUEST_INSTRUMENTATION = os.getenv("REQUEST_INSTRUMENTATION", "False") == "True"
+REQUEST_INSTRUMENTATION_WINDOW = int(
+    os.getenv("REQUEST_INSTRUMENTATION_WINDOW", "1000")
+)
+if REQUEST_INSTRUMENTATION:
+    MIDDLEWARE.insert(
+        0, "impactreeapi.instrumentation.RequestInstrumentationMiddleware"
+    )
+
+# GET /metrics serves Prometheus metrics. With more than one gunicorn worker,
+# set METRICS_DIR to a directory they share: each worker writes its totals
+# there every METRICS_FLUSH_SECONDS and a scrape adds them up
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "impactreeapi.requests": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = "impactreeproject.urls"
 
 TEMPLATES = [
@@ -84,16 +141,149 @@ WSGI_APPLICATION = "impactreeproject.wsgi.application"
 MEDIA_ROOT = "media"
 MEDIA_URL = "/media/"
 
+# How /media/ is served, see impactreeapi.views.media.serve_media:
+# static (development handler), app, x-accel-redirect or x-sendfile
+MEDIA_SERVING = os.getenv("MEDIA_SERVING", "static")
+# nginx location that aliases MEDIA_ROOT, marked internal
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/"
+)
+
+# Largest charity image accepted by a multipart upload, in bytes
+CHARITY_IMAGE_MAX_SIZE = int(os.getenv("CHARITY_IMAGE_MAX_SIZE", 5 * 1024 * 1024))
+
 
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
+#
+# DATABASE_URL picks the backend, e.g. postgres://user:password@db:5432/impactree;
+# without it the SQLite file at SQLITE_DB_PATH is used.
+#
+# DATABASE_CONN_MAX_AGE keeps each worker's connection open for that many
+# seconds instead of reconnecting on every request, and health checks replace
+# a connection the server has dropped before it is reused. Django advises
+# against persistent connections under ASGI, so the default there is 0.
+# Set DATABASE_DISABLE_SERVER_SIDE_CURSORS when DATABASE_URL points at
+# PgBouncer in transaction pooling mode.
+
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", str(BASE_DIR / "db.sqlite3"))
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{SQLITE_DB_PATH}")
+DATABASE_CONN_MAX_AGE = int(
+    os.getenv("DATABASE_CONN_MAX_AGE", "0" if SERVER_MODE == "asgi" else "600")
+)
 
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-        # "NAME": os.environ.get("SQLITE_DB_PATH", BASE_DIR / "db.sqlite3")
+    "default": dj_database_url.parse(
+        DATABASE_URL,
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=True,
+    )
+}
+
+# DATABASE_REPLICA_URLS is a comma-separated list of read replicas of
+# DATABASE_URL. GET, HEAD and OPTIONS requests read from them; a client that
+# has just written reads from default for DATABASE_REPLICA_PIN_SECONDS, which
+# should exceed the replication lag. See impactreeapi.replicas.
+
+DATABASE_REPLICA_URLS = [
+    url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url
+]
+DATABASE_REPLICAS = []
+for index, url in enumerate(DATABASE_REPLICA_URLS):
+    alias = f"replica{index}"
+    DATABASES[alias] = dj_database_url.parse(
+        url,
+        conn_max_age=DATABASE_CONN_MAX_AGE,
+        conn_health_checks=True,
+        # Tests read replicas through the test default database
+        test_options={"MIRROR": "default"},
+    )
+    DATABASE_REPLICAS.append(alias)
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "5"))
+DATABASE_ROUTERS = ["impactreeapi.replicas.ReplicaRouter"]
+
+if os.getenv("DATABASE_DISABLE_SERVER_SIDE_CURSORS", "False") == "True":
+    for database in DATABASES.values():
+        database["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+# SQLITE_PERFORMANCE_PROFILE=True tunes SQLite for several gunicorn workers:
+# WAL lets readers run alongside the single writer, write transactions take
+# the write lock up front with BEGIN IMMEDIATE instead of failing to upgrade
+# a read lock, and busy_timeout makes a writer wait for the lock rather than
+# raise "database is locked". impactreeapi.signals.apply_sqlite_pragmas runs
+# SQLITE_PRAGMAS on every new connection.
+
+SQLITE_PERFORMANCE_PROFILE = (
+    os.getenv("SQLITE_PERFORMANCE_PROFILE", "False") == "True"
+    and DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3"
+)
+SQLITE_PRAGMAS = {}
+if SQLITE_PERFORMANCE_PROFILE:
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        # milliseconds
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")),
+        # bytes of the file to memory-map
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        # negative values are KiB, so 64 MiB of page cache per connection
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+        "temp_store": "MEMORY",
+    }
+    DATABASES["default"].setdefault("OPTIONS", {})["transaction_mode"] = "IMMEDIATE"
+
+
+# Caches
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+#
+# The "catalog" cache holds serialized charity and category responses. It
+# defaults to an in-process LRU (LocMemCache culls least recently used keys)
+# which is per worker; point CATALOG_CACHE_URL at a Redis-compatible server
+# (redis://host:6379/0) to share it between workers.
+#
+# The "default" cache holds analytics reports and read-replica pins. It uses
+# the Redis-compatible server at DEFAULT_CACHE_URL when set. Otherwise it is
+# per worker, except with read replicas: pins have to reach every worker, so
+# it is then the impactree_cache table on the primary, created by
+# "python manage.py createcachetable".
+
+CATALOG_CACHE_URL = os.getenv("CATALOG_CACHE_URL", "")
+CATALOG_CACHE_TIMEOUT = int(os.getenv("CATALOG_CACHE_TIMEOUT", "300"))
+DEFAULT_CACHE_URL = os.getenv("DEFAULT_CACHE_URL", "")
+
+if DEFAULT_CACHE_URL:
+    DEFAULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": DEFAULT_CACHE_URL,
+    }
+elif DATABASE_REPLICAS:
+    DEFAULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "impactree_cache",
+        # Culling drops a third of the entries, pins included, once full
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+else:
+    DEFAULT_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
     }
+
+CACHES = {
+    "default": DEFAULT_CACHE,
+    "catalog": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CATALOG_CACHE_URL,
+            "TIMEOUT": CATALOG_CACHE_TIMEOUT,
+        }
+        if CATALOG_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "catalog",
+            "TIMEOUT": CATALOG_CACHE_TIMEOUT,
+            "OPTIONS": {"MAX_ENTRIES": 1000},
+        }
+    ),
 }
 
 
@@ -116,6 +306,18 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# GET /analytics results are reused for this many seconds
+ANALYTICS_CACHE_TIMEOUT = int(os.getenv("ANALYTICS_CACHE_TIMEOUT", "60"))
+
+
+# Password hashing for the async login/register views runs on a bounded
+# thread pool: PASSWORD_HASH_WORKERS hashes at once, and beyond
+# PASSWORD_HASH_MAX_PENDING queued or running hashes requests get a 503
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.0/topics/i18n/
 
@@ -1,26 +1,43 @@
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework import routers
 from impactreeapi.views import *
+from impactreeapi.views.asyncread import AsyncReadRouter
 from django.conf.urls import include
 from rest_framework import routers
-from django.conf.urls.static import static
 from django.conf import settings
 
 
-router = routers.DefaultRouter(trailing_slash=False)
-router.register(r"users", UserViewSet, "user")
-router.register(r"milestones", MilestoneViewSet, "milestone")
-router.register(r"charitycategories", CharityCategoryViewSet, "charitycategories")
-router.register(r"charities", CharityViewSet, "charities")
-router.register(r"impactplans", ImpactPlanViewSet, "impactplans")
-router.register(
-    r"impactplan_charities", ImpactPlanCharityViewSet, "impactplan_charities"
-)
+def build_router(router_class):
+    router = router_class(trailing_slash=False)
+    router.register(r"users", UserViewSet, "user")
+    router.register(r"milestones", MilestoneViewSet, "milestone")
+    router.register(r"charitycategories", CharityCategoryViewSet, "charitycategories")
+    router.register(r"charities", CharityViewSet, "charities")
+    router.register(r"impactplans", ImpactPlanViewSet, "impactplans")
+    router.register(
+        r"impactplan_charities", ImpactPlanCharityViewSet, "impactplan_charities"
+    )
+    return router
+
+
+# Under ASGI the read endpoints use the async ViewSet handlers, and the async
+# auth views hash passwords on a worker pool instead of blocking the thread
+# that runs every other sync view
+if settings.SERVER_MODE == "asgi":
+    router = build_router(AsyncReadRouter)
+    auth_views = {"register": aregister_user, "login": alogin_user}
+else:
+    router = build_router(routers.DefaultRouter)
+    auth_views = {"register": register_user, "login": login_user}
 
 urlpatterns = [
     path("", include(router.urls)),
-    path("register", register_user),
-    path("login", login_user),
+    path("register", auth_views["register"]),
+    path("login", auth_views["login"]),
+    path("stats", runtime_stats),
+    path("metrics", prometheus_metrics),
+    path("analytics", platform_analytics),
     path("admin/", admin.site.urls),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.*)$", serve_media),
+]
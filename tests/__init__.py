@@ -1,7 +1,19 @@
-from .auth import AuthTests
+from .auth import AuthTests, AsyncAuthViewTests, CachedTokenAuthenticationTests
 from .user import UserViewSetTests
 from .milestone import MilestoneViewSetTests
 from .charitycategory import CharityCategoryViewSetTests
-from .charity import CharityViewSetTests
-from .impactplan import ImpactPlanViewTests
+from .charity import CharityFilterTests, CharityViewSetTests
+from .impactplan import ImpactPlanViewTests, ImpactSummaryTests
 from .impactplan_charity import ImpactPlanCharityViewSetTests
+from .asgi import AsyncReadViewTests
+from .media import MediaServingTests
+from .indexes import ConstraintTests, QueryPlanTests
+from .analytics import PlatformAnalyticsTests
+from .database import SQLitePragmaTests
+from .replicas import ReplicaRoutingTests
+from .instrumentation import (
+    RequestInstrumentationDisabledTests,
+    RequestInstrumentationTests,
+)
+from .metrics import MetricsEndpointTests, PrometheusRegistryTests
+from .seeding import SeedCommandTests
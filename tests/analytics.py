@@ -0,0 +1,140 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import Sum
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+from impactreeapi import synthetic
+from impactreeapi.milestones import milestone_resolver
+from impactreeapi.models import (
+    Charity,
+    CharityCategory,
+    ImpactPlan,
+    ImpactPlanCharity,
+    Milestone,
+)
+
+
+class PlatformAnalyticsTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        milestone_resolver.invalidate()
+        self.client = APIClient()
+        self.admin_user = User.objects.create(username="analyst", is_staff=True)
+        self.client.force_authenticate(user=self.admin_user)
+
+        self.milestone = Milestone.objects.create(
+            name="Sapling",
+            description="Sapling",
+            required_percentage=5,
+            image_filename="sapling.png",
+        )
+        water = CharityCategory.objects.create(name="Water")
+        health = CharityCategory.objects.create(name="Health")
+        self.wells = Charity.objects.create(
+            name="Wells", category=water, impact_metric="wells", impact_ratio=1.0
+        )
+        self.filters = Charity.objects.create(
+            name="Filters", category=water, impact_metric="filters", impact_ratio=2.0
+        )
+        self.nets = Charity.objects.create(
+            name="Nets", category=health, impact_metric="nets", impact_ratio=3.0
+        )
+
+        allocations = [
+            (2, [(self.wells, 100)]),
+            (4, [(self.wells, 200), (self.nets, 50)]),
+            (6, [(self.filters, 300)]),
+            (8, [(self.nets, 400)]),
+        ]
+        for index, (percentage, rows) in enumerate(allocations):
+            plan = ImpactPlan.objects.create(
+                user=User.objects.create(username=f"planner{index}"),
+                annual_income=100000,
+                philanthropy_percentage=percentage,
+                total_annual_allocation=1000 * percentage,
+                current_milestone=self.milestone if percentage >= 5 else None,
+            )
+            for charity, amount in rows:
+                ImpactPlanCharity.objects.create(
+                    impact_plan=plan, charity=charity, allocation_amount=amount
+                )
+
+    def get(self, query=""):
+        response = self.client.get("/analytics" + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_dollars_by_charity_and_category(self):
+        """Test that allocations are totalled per charity and rolled up per category"""
+        data = self.get()
+        by_charity = [
+            (row["name"], row["total_allocation"]) for row in data["by_charity"]
+        ]
+        self.assertEqual(by_charity[0], ("Nets", 450))
+        self.assertCountEqual(by_charity[1:], [("Wells", 300), ("Filters", 300)])
+        self.assertEqual(
+            [(row["name"], row["total_allocation"]) for row in data["by_category"]],
+            [("Water", 600), ("Health", 450)],
+        )
+
+    def test_dollars_by_milestone(self):
+        """Test that totals are grouped by each plan's current milestone"""
+        data = self.get()
+        by_milestone = {row["name"]: row for row in data["by_milestone"]}
+        self.assertEqual(by_milestone["Sapling"]["total_allocation"], 700)
+        self.assertEqual(by_milestone["Sapling"]["impact_plans"], 2)
+        self.assertEqual(by_milestone[None]["total_allocation"], 350)
+
+    def test_philanthropy_distribution(self):
+        """Test the summary statistics, percentiles and histogram buckets"""
+        distribution = self.get("?bucket_width=5")["philanthropy_percentage"]
+        self.assertEqual(distribution["count"], 4)
+        self.assertEqual(distribution["min"], 2)
+        self.assertEqual(distribution["max"], 8)
+        self.assertEqual(distribution["percentiles"]["p50"], 4)
+        self.assertEqual(distribution["percentiles"]["p75"], 6)
+        self.assertEqual(distribution["percentiles"]["p99"], 8)
+        self.assertEqual(
+            [
+                (row["from"], row["to"], row["count"])
+                for row in distribution["histogram"]
+            ],
+            [(0, 5, 2), (5, 10, 2)],
+        )
+
+    def test_results_are_cached_until_refresh(self):
+        """Test that cached results are reused until refresh=true is passed"""
+        self.get()
+        ImpactPlanCharity.objects.filter(charity=self.nets).delete()
+        self.assertEqual(self.get()["by_category"][1]["total_allocation"], 450)
+        self.assertEqual(len(self.get("?refresh=true")["by_category"]), 1)
+
+    def test_invalid_bucket_width(self):
+        """Test that a non-positive bucket width is rejected"""
+        response = self.client.get("/analytics?bucket_width=0")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        """Test that non-admin users cannot read analytics"""
+        self.client.force_authenticate(user=User.objects.create(username="viewer"))
+        response = self.client.get("/analytics")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_synthetic_dataset(self):
+        """Test that the synthetic generator's rows add up in every breakdown"""
+        created = synthetic.generate(allocations=500, per_plan=5, charities=20)
+        self.assertEqual(created["allocations"], 500)
+        self.assertEqual(created["impact_plans"], 100)
+
+        data = self.get("?refresh=true")
+        self.assertEqual(data["philanthropy_percentage"]["count"], 104)
+        total = ImpactPlanCharity.objects.aggregate(total=Sum("allocation_amount"))
+        self.assertEqual(
+            sum(row["total_allocation"] for row in data["by_charity"]),
+            total["total"],
+        )
+        self.assertEqual(
+            sum(row["total_allocation"] for row in data["by_milestone"]),
+            total["total"],
+        )
@@ -0,0 +1,164 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from impactreeapi.models import (
+    Charity,
+    CharityCategory,
+    ImpactPlan,
+    ImpactPlanCharity,
+    Milestone,
+)
+from impactreeapi.views import alogin_user, aregister_user
+from impactreeapi.views.asyncread import AsyncReadRouter
+from impactreeproject.urls import build_router
+
+# The URLs impactreeproject.urls builds when SERVER_MODE is "asgi"
+urlpatterns = [
+    path("", include(build_router(AsyncReadRouter).urls)),
+    path("register", aregister_user),
+    path("login", alogin_user),
+]
+
+
+@override_settings(ROOT_URLCONF="tests.asgi")
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        caches["catalog"].clear()
+        self.user = User.objects.create(username="asgiuser")
+        self.admin_user = User.objects.create(username="asgiadmin", is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.admin_token = Token.objects.create(user=self.admin_user)
+        self.auth = {"headers": {"authorization": "Token " + self.token.key}}
+
+        self.milestone = Milestone.objects.create(
+            name="Seed Planter",
+            description="First milestone",
+            required_percentage=1.00,
+            image_filename="seed-planter.png",
+        )
+        self.category = CharityCategory.objects.create(name="Water")
+        self.charity = Charity.objects.create(
+            name="Charity Water",
+            category=self.category,
+            description="Clean water",
+            impact_metric="people given water access",
+            impact_ratio=0.05,
+            website_url="http://charitywater.org",
+        )
+        self.impact_plan = ImpactPlan.objects.create(
+            user=self.user,
+            annual_income=100000.00,
+            philanthropy_percentage=5.00,
+            total_annual_allocation=5000.00,
+            current_milestone=self.milestone,
+        )
+        ImpactPlanCharity.objects.create(
+            impact_plan=self.impact_plan,
+            charity=self.charity,
+            allocation_amount=5000.00,
+        )
+
+    async def test_list_charities(self):
+        response = await self.async_client.get("/charities")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(body["results"][0]["name"], "Charity Water")
+        self.assertEqual(body["results"][0]["category"]["name"], "Water")
+
+        response = await self.async_client.get("/charities?paginate=false")
+        self.assertEqual(response.json()[0]["id"], self.charity.id)
+
+    async def test_list_charities_with_filters(self):
+        query = f"category={self.category.id}&search=wat&ordering=-impact_ratio"
+        response = await self.async_client.get("/charities?" + query)
+        self.assertEqual(response.json()["results"][0]["id"], self.charity.id)
+
+        response = await self.async_client.get("/charities?paginate=false&search=zzz")
+        self.assertEqual(response.json(), [])
+
+        response = await self.async_client.get("/charities?min_impact_ratio=abc")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_retrieve_charity(self):
+        response = await self.async_client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["name"], "Charity Water")
+
+        response = await self.async_client.get(f"/charities/{self.charity.id + 100}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_charity_conditional_get(self):
+        response = await self.async_client.get("/charities")
+        response = await self.async_client.get(
+            "/charities", headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_create_charity_uses_sync_view(self):
+        response = await self.async_client.post(
+            "/charities",
+            {
+                "name": "New Charity",
+                "description": "New Description",
+                "impact_metric": "New Metric",
+                "impact_ratio": 2.0,
+                "website_url": "http://newcharity.com",
+            },
+            content_type="application/json",
+            headers={"authorization": "Token " + self.admin_token.key},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = await self.async_client.get("/charities?paginate=false")
+        self.assertEqual(len(response.json()), 2)
+
+    async def test_list_and_retrieve_charity_categories(self):
+        response = await self.async_client.get("/charitycategories", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{"id": self.category.id, "name": "Water"}])
+
+        response = await self.async_client.get(
+            f"/charitycategories/{self.category.id}", **self.auth
+        )
+        self.assertEqual(response.json()["name"], "Water")
+
+        response = await self.async_client.get(
+            f"/charitycategories/{self.category.id + 100}", **self.auth
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_list_and_retrieve_milestones(self):
+        response = await self.async_client.get("/milestones", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["name"], "Seed Planter")
+        self.assertIn("ETag", response)
+
+        response = await self.async_client.get(
+            f"/milestones/{self.milestone.id}", **self.auth
+        )
+        self.assertEqual(response.json()["image_filename"], "seed-planter.png")
+
+    async def test_milestones_require_authentication(self):
+        response = await self.async_client.get("/milestones")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_list_and_retrieve_impact_plans(self):
+        response = await self.async_client.get("/impactplans", **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        plan = response.json()["results"][0]
+        self.assertEqual(plan["user"]["username"], "asgiuser")
+        self.assertEqual(plan["current_milestone"]["name"], "Seed Planter")
+        self.assertEqual(plan["charities"][0]["allocation_amount"], "5000.00")
+
+        response = await self.async_client.get(
+            f"/impactplans/{self.impact_plan.id}", **self.auth
+        )
+        self.assertEqual(response.json()["total_annual_allocation"], "5000.00")
+
+        response = await self.async_client.get(
+            "/impactplans?paginate=false", **self.auth
+        )
+        self.assertEqual(len(response.json()), 1)
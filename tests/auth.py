@@ -1,8 +1,17 @@
-from django.test import TestCase
+from django.db import connection
+import json
+from unittest import mock
+from django.test import AsyncRequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
 from rest_framework import status
+from impactreeapi.authentication import TokenCache
+from impactreeapi.hashing import PasswordHashPool
+from impactreeapi.views import alogin_user, aregister_user
 
 
 class AuthTests(TestCase):
@@ -59,3 +68,145 @@ class AuthTests(TestCase):
         self.assertEqual(user["last_name"], self.user_data["last_name"])
         self.assertIn("is_staff", user)
         self.assertFalse(user["is_staff"])
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(username="cacheduser")
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        return response, len(context.captured_queries)
+
+    def test_repeated_requests_skip_token_lookup(self):
+        response, first_queries = self.count_queries("/milestones")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response, second_queries = self.count_queries("/milestones")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(second_queries, first_queries - 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get("/milestones")
+        self.token.delete()
+        response = self.client.get("/milestones")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get("/milestones")
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get("/milestones")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_changes_are_visible_immediately(self):
+        self.client.get("/milestones")
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/stats")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(response.data["token_cache"]["hits"], 1)
+
+    def test_zero_ttl_disables_cache(self):
+        cache = TokenCache(max_entries=10, ttl=0)
+        cache.set(self.token.key, self.token)
+        self.assertIsNone(cache.get(self.token.key))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+class AsyncAuthViewTests(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user_data = {
+            "username": "asyncuser",
+            "password": "testpassword",
+            "email": "async@example.com",
+            "first_name": "Async",
+            "last_name": "User",
+        }
+
+    def post(self, data):
+        return self.factory.post(
+            "/", json.dumps(data), content_type="application/json"
+        )
+
+    async def test_register_then_login(self):
+        response = await aregister_user(self.post(self.user_data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        registered = json.loads(response.content)
+        self.assertTrue(registered["valid"])
+        self.assertEqual(registered["user"]["email"], "async@example.com")
+
+        response = await alogin_user(
+            self.post({"username": "asyncuser", "password": "testpassword"})
+        )
+        login = json.loads(response.content)
+        self.assertTrue(login["valid"])
+        self.assertEqual(login["token"], registered["token"])
+        self.assertFalse(login["user"]["is_staff"])
+
+    async def test_login_with_wrong_password(self):
+        await aregister_user(self.post(self.user_data))
+        response = await alogin_user(
+            self.post({"username": "asyncuser", "password": "wrong"})
+        )
+        self.assertEqual(json.loads(response.content), {"valid": False})
+
+        response = await alogin_user(
+            self.post({"username": "nobody", "password": "wrong"})
+        )
+        self.assertEqual(json.loads(response.content), {"valid": False})
+
+    async def test_register_duplicate_username(self):
+        await aregister_user(self.post(self.user_data))
+        response = await aregister_user(self.post(self.user_data))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_register_missing_fields(self):
+        response = await aregister_user(self.post({"username": "asyncuser"}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_login_refuses_inactive_user(self):
+        await aregister_user(self.post(self.user_data))
+        await User.objects.filter(username="asyncuser").aupdate(is_active=False)
+        response = await alogin_user(
+            self.post({"username": "asyncuser", "password": "testpassword"})
+        )
+        self.assertEqual(json.loads(response.content), {"valid": False})
+
+    async def test_failed_login_sends_signal(self):
+        handler = mock.Mock()
+        user_login_failed.connect(handler)
+        try:
+            await alogin_user(self.post({"username": "nobody", "password": "wrong"}))
+        finally:
+            user_login_failed.disconnect(handler)
+        handler.assert_called_once()
+        credentials = handler.call_args.kwargs["credentials"]
+        self.assertEqual(credentials["username"], "nobody")
+        self.assertNotEqual(credentials["password"], "wrong")
+
+    async def test_login_upgrades_outdated_password_hash(self):
+        user = await User.objects.acreate(
+            username="asyncuser",
+            password=make_password("testpassword", hasher="pbkdf2_sha1"),
+        )
+        await Token.objects.acreate(user=user)
+        response = await alogin_user(
+            self.post({"username": "asyncuser", "password": "testpassword"})
+        )
+        self.assertTrue(json.loads(response.content)["valid"])
+        user = await User.objects.aget(username="asyncuser")
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+
+    async def test_login_rejected_when_hash_pool_is_full(self):
+        full_pool = PasswordHashPool(workers=1, max_pending=0)
+        with mock.patch("impactreeapi.views.auth.password_hash_pool", full_pool):
+            response = await alogin_user(
+                self.post({"username": "asyncuser", "password": "testpassword"})
+            )
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(full_pool.stats()["rejected"], 1)
@@ -1,13 +1,37 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+import base64
+import shutil
+import tempfile
+from unittest import mock
+from io import BytesIO, StringIO
+from PIL import Image
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from impactreeapi.models import Charity, CharityCategory
+from impactreeapi.images import variant_names
+from impactreeapi.search import (
+    CHARITY_FTS_TABLE,
+    charity_fts_ready,
+    detect_charity_fts,
+)
+from impactreeapi.models import Charity, CharityCategory, TableVersion
 
 
 class CharityViewSetTests(TestCase):
     def setUp(self):
+        # Uploads and their variants go to a throwaway media root
+        self.media_root = tempfile.mkdtemp()
+        self.media_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.media_override.enable()
+
+        caches["catalog"].clear()
         self.client = APIClient()
         self.User = get_user_model()
 
@@ -46,12 +70,50 @@ class CharityViewSetTests(TestCase):
             "category": self.category.id,
         }
 
+    def tearDown(self):
+        self.media_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
     def test_list_charities(self):
         """Test that any user can list charities"""
         url = "/charities"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_list_charities_paginated(self):
+        """Test that charity listings are cursor paginated by id"""
+        for index in range(4):
+            Charity.objects.create(
+                name=f"Paged Charity {index}",
+                description="Paged",
+                impact_metric="Metric",
+                impact_ratio=1.0,
+                website_url="http://paged.com",
+                category=self.category,
+            )
+
+        response = self.client.get("/charities?page_size=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
+
+    def test_list_charities_page_size_is_capped(self):
+        """Test that page_size cannot exceed the configured maximum"""
+        response = self.client.get("/charities?page_size=100000")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_list_charities_unpaginated(self):
+        """Test that ?paginate=false returns the legacy array shape"""
+        response = self.client.get("/charities?paginate=false")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]["name"], "Test Charity")
+
     def test_retrieve_charity(self):
         """Test that any user can retrieve a charity"""
         url = f"/charities/{self.charity.id}"
@@ -108,3 +170,433 @@ class CharityViewSetTests(TestCase):
         data["image"] = self.sample_image
         response = self.client.put(url, data)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def upload(self, name="logo.png", content_type="image/png", content=None):
+        if content is None:
+            content = base64.b64decode(self.sample_image.split(";base64,")[1])
+        return SimpleUploadedFile(name, content, content_type=content_type)
+
+    def test_create_charity_with_multipart_image(self):
+        """Test that an image can be uploaded as a multipart file"""
+        self.client.force_authenticate(user=self.admin_user)
+        data = {**self.charity_data, "image": self.upload()}
+        response = self.client.post("/charities", data, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        charity = Charity.objects.get(pk=response.data["id"])
+        self.assertTrue(charity.image.name.endswith(".png"))
+        self.assertEqual(charity.image.read(), self.upload().read())
+
+    def test_update_charity_with_multipart_image(self):
+        """Test that an image can be replaced with a multipart upload"""
+        self.client.force_authenticate(user=self.admin_user)
+        data = {**self.charity_data, "image": self.upload()}
+        response = self.client.put(
+            f"/charities/{self.charity.id}", data, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.charity.refresh_from_db()
+        self.assertTrue(self.charity.image.name.startswith("charityimages/charity-"))
+
+    def test_image_variants_are_generated_on_upload(self):
+        """Test that thumbnails and WebP variants are written at upload time"""
+        buffer = BytesIO()
+        Image.new("RGB", (1200, 600), "green").save(buffer, "PNG")
+        self.client.force_authenticate(user=self.admin_user)
+        data = {
+            **self.charity_data,
+            "image": self.upload(content=buffer.getvalue()),
+        }
+        response = self.client.post("/charities", data, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        charity = Charity.objects.get(pk=response.data["id"])
+
+        variants = response.data["image_variants"]
+        self.assertEqual(set(variants), {"thumbnail", "medium"})
+        self.assertEqual(set(variants["thumbnail"]), {"webp", "png"})
+
+        storage = charity.image.storage
+        names = variant_names(charity.image.name)
+        with Image.open(storage.open(names[("thumbnail", "webp")])) as thumbnail:
+            self.assertEqual(thumbnail.format, "WEBP")
+            self.assertEqual(thumbnail.size, (160, 80))
+        with Image.open(storage.open(names[("medium", "png")])) as medium:
+            self.assertEqual(medium.size, (480, 240))
+        self.assertTrue(variants["medium"]["webp"].endswith(".webp"))
+
+    def test_charity_without_image_has_no_variants(self):
+        """Test that charities without an image report no variants"""
+        response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.data["image_variants"], {})
+
+    def test_serializing_image_variants_does_not_touch_storage(self):
+        """Test that variant URLs come from the recorded variants alone"""
+        Charity.objects.filter(pk=self.charity.pk).update(
+            image="charityimages/charity-stored.png",
+            image_variants={
+                "source": "charityimages/charity-stored.png",
+                "names": {
+                    "thumbnail": {
+                        "webp": "charityimages/variants/charity-stored-thumbnail.webp"
+                    }
+                },
+            },
+        )
+        with mock.patch.object(
+            FileSystemStorage, "exists", side_effect=AssertionError("exists")
+        ), mock.patch.object(
+            FileSystemStorage, "open", side_effect=AssertionError("open")
+        ):
+            response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["image_variants"],
+            {
+                "thumbnail": {
+                    "webp": "/media/charityimages/variants/charity-stored-thumbnail.webp"
+                }
+            },
+        )
+
+    def test_image_without_recorded_variants_has_no_variants(self):
+        """Test that images stored before their variants advertise none"""
+        Charity.objects.filter(pk=self.charity.pk).update(
+            image="charityimages/charity-legacy.png"
+        )
+        response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.data["image_variants"], {})
+
+    def test_undecodable_image_has_no_variants(self):
+        """Test that an image Pillow cannot read advertises no variants"""
+        self.charity.image = ContentFile(b"not an image", name="broken.png")
+        self.charity.save()
+        self.assertEqual(self.charity.image_variants["names"], {})
+
+        response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.data["image_variants"], {})
+
+    def test_saving_without_a_new_image_keeps_variants(self):
+        """Test that edits leaving the image alone do not touch storage"""
+        buffer = BytesIO()
+        Image.new("RGB", (300, 300), "blue").save(buffer, "PNG")
+        self.charity.image = ContentFile(buffer.getvalue(), name="logo.png")
+        self.charity.save()
+        variants = self.charity.image_variants
+        self.assertEqual(set(variants["names"]), {"thumbnail", "medium"})
+
+        self.charity.refresh_from_db()
+        self.charity.name = "Renamed"
+        with mock.patch.object(
+            FileSystemStorage, "exists", side_effect=AssertionError("exists")
+        ):
+            self.charity.save()
+        self.charity.refresh_from_db()
+        self.assertEqual(self.charity.image_variants, variants)
+
+    def test_build_image_variants_command(self):
+        """Test that the command creates variants for images stored before them"""
+        buffer = BytesIO()
+        Image.new("RGB", (300, 300), "blue").save(buffer, "PNG")
+        storage = Charity._meta.get_field("image").storage
+        name = storage.save(
+            "charityimages/charity-legacy.png", ContentFile(buffer.getvalue())
+        )
+        Charity.objects.filter(pk=self.charity.pk).update(image=name)
+        self.charity.refresh_from_db()
+
+        output = StringIO()
+        call_command("build_image_variants", stdout=output, stderr=StringIO())
+        self.assertIn("Variants ready for 1 images, 0 failed", output.getvalue())
+        for variant in variant_names(name).values():
+            self.assertTrue(storage.exists(variant))
+
+        response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(
+            response.data["image_variants"]["thumbnail"]["webp"],
+            storage.url(variant_names(name)[("thumbnail", "webp")]),
+        )
+
+    def test_multipart_image_with_unsupported_type(self):
+        """Test that non-image uploads are rejected before they are stored"""
+        self.client.force_authenticate(user=self.admin_user)
+        data = {
+            **self.charity_data,
+            "image": self.upload("notes.txt", "text/plain", b"hello"),
+        }
+        response = self.client.post("/charities", data, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertFalse(Charity.objects.filter(name="New Charity").exists())
+
+    def test_multipart_image_content_must_match_type(self):
+        """Test that a file whose bytes are not the declared type is rejected"""
+        self.client.force_authenticate(user=self.admin_user)
+        data = {**self.charity_data, "image": self.upload(content=b"<svg></svg>")}
+        response = self.client.post("/charities", data, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    @override_settings(CHARITY_IMAGE_MAX_SIZE=1024)
+    def test_multipart_image_over_size_limit(self):
+        """Test that images over CHARITY_IMAGE_MAX_SIZE are rejected"""
+        self.client.force_authenticate(user=self.admin_user)
+        content = self.upload().read() + b"\0" * 2048
+        data = {**self.charity_data, "image": self.upload(content=content)}
+        response = self.client.post("/charities", data, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(Charity.objects.filter(name="New Charity").exists())
+
+    @override_settings(CHARITY_IMAGE_MAX_SIZE=1024, DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_multipart_request_over_size_limit(self):
+        """Test that an oversized request is refused from its Content-Length"""
+        self.client.force_authenticate(user=self.admin_user)
+        content = self.upload().read() + b"\0" * 4096
+        data = {**self.charity_data, "image": self.upload(content=content)}
+        response = self.client.post("/charities", data, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def test_list_charities_is_served_from_cache(self):
+        """Test that a repeated listing only reads the table versions"""
+        self.client.get("/charities")
+        # The ETag and the cache key share one TableVersion lookup
+        with self.assertNumQueries(1):
+            response = self.client.get("/charities")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["name"], "Test Charity")
+
+    def test_retrieve_charity_is_served_from_cache(self):
+        """Test that a repeated retrieve only reads the table versions"""
+        self.client.get(f"/charities/{self.charity.id}")
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.data["name"], "Test Charity")
+
+    def test_update_charity_invalidates_cache(self):
+        """Test that cached listings never outlive an update"""
+        self.client.get("/charities")
+        self.client.get(f"/charities/{self.charity.id}")
+
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.put(f"/charities/{self.charity.id}", {"name": "Renamed"})
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get("/charities")
+        self.assertEqual(response.data["results"][0]["name"], "Renamed")
+        response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.data["name"], "Renamed")
+
+    def test_category_change_invalidates_cache(self):
+        """Test that model signals drop cached charities embedding a category"""
+        self.client.get("/charities")
+        self.category.name = "Renamed Category"
+        self.category.save()
+
+        response = self.client.get("/charities")
+        self.assertEqual(
+            response.data["results"][0]["category"]["name"], "Renamed Category"
+        )
+
+    def test_write_in_another_worker_invalidates_cache(self):
+        """Test that a bumped table version drops entries cached by this process"""
+        self.client.get("/charities")
+        self.client.get(f"/charities/{self.charity.id}")
+
+        # Another worker's save: no signals reach this process
+        Charity.objects.filter(pk=self.charity.pk).update(name="Renamed")
+        TableVersion.bump(Charity)
+
+        response = self.client.get("/charities")
+        self.assertEqual(response.data["results"][0]["name"], "Renamed")
+        response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.data["name"], "Renamed")
+
+    def test_delete_charity_invalidates_cache(self):
+        """Test that a deleted charity disappears from cached listings"""
+        self.client.get("/charities")
+        self.client.force_authenticate(user=self.admin_user)
+        self.client.delete(f"/charities/{self.charity.id}")
+        self.client.force_authenticate(user=None)
+
+        response = self.client.get("/charities")
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(f"/charities/{self.charity.id}")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cache_stats_as_admin(self):
+        """Test that admins can read the catalog cache hit and miss counters"""
+        self.client.get("/charities")
+        self.client.get("/charities")
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get("/stats")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreaterEqual(response.data["catalog_cache"]["hits"], 1)
+        self.assertGreaterEqual(response.data["catalog_cache"]["misses"], 1)
+
+    def test_cache_stats_as_regular_user(self):
+        """Test that regular users cannot read runtime stats"""
+        self.client.force_authenticate(user=self.regular_user)
+        response = self.client.get("/stats")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_list_charities_conditional_get(self):
+        """Test that a matching If-None-Match gets a 304 from the table versions"""
+        response = self.client.get("/charities")
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/charities", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_charity_etag_changes_after_update(self):
+        """Test that an update makes previously issued ETags stale"""
+        url = f"/charities/{self.charity.id}"
+        etag = self.client.get(url)["ETag"]
+
+        self.charity.impact_ratio = 3.0
+        self.charity.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_after_write_in_another_worker(self):
+        """Test that a version bumped outside this process is never answered with 304"""
+        etag = self.client.get("/charities")["ETag"]
+        Charity.objects.filter(pk=self.charity.pk).update(name="Renamed")
+        TableVersion.bump(Charity)
+
+        response = self.client.get("/charities", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["name"], "Renamed")
+
+    def test_charity_etag_changes_after_category_delete(self):
+        """Test that deleting an embedded category makes ETags stale"""
+        etag = self.client.get("/charities")["ETag"]
+        self.category.delete()
+        response = self.client.get("/charities", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data["results"][0]["category"])
+
+
+class CharityFilterTests(TestCase):
+    def setUp(self):
+        caches["catalog"].clear()
+        self.client = APIClient()
+        self.water = CharityCategory.objects.create(name="Water")
+        self.health = CharityCategory.objects.create(name="Health")
+        self.climate = CharityCategory.objects.create(name="Climate")
+        rows = [
+            ("Charity Water", self.water, "Clean water wells", "people served", 0.05),
+            ("Water for People", self.water, "Sanitation", "households", 0.2),
+            ("Malaria Consortium", self.health, "Bed nets", "nets distributed", 1.5),
+            ("Helen Keller Intl", self.health, "Vitamin A", "children dosed", 3.0),
+            ("Cool Earth", self.climate, "Rainforest", "trees protected", 12.0),
+        ]
+        for name, category, description, metric, ratio in rows:
+            Charity.objects.create(
+                name=name,
+                category=category,
+                description=description,
+                impact_metric=metric,
+                impact_ratio=ratio,
+                website_url="http://example.com",
+            )
+
+    def names(self, query):
+        response = self.client.get("/charities?paginate=false&" + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [charity["name"] for charity in response.data]
+
+    def test_filter_by_category(self):
+        """Test that category accepts one or more ids"""
+        self.assertEqual(
+            self.names(f"category={self.water.id}"),
+            ["Charity Water", "Water for People"],
+        )
+        self.assertEqual(
+            len(self.names(f"category={self.water.id},{self.climate.id}")), 3
+        )
+
+    def test_filter_by_impact_ratio_range(self):
+        """Test that both impact_ratio bounds are inclusive"""
+        self.assertEqual(
+            self.names("min_impact_ratio=0.2&max_impact_ratio=3"),
+            ["Water for People", "Malaria Consortium", "Helen Keller Intl"],
+        )
+
+    def test_ordering(self):
+        """Test sorting by name and by descending impact_ratio"""
+        self.assertEqual(self.names("ordering=name")[0], "Charity Water")
+        self.assertEqual(self.names("ordering=-impact_ratio")[0], "Cool Earth")
+
+    def test_ordering_with_pagination(self):
+        """Test that cursor pages follow the requested ordering"""
+        response = self.client.get("/charities?ordering=-impact_ratio&page_size=2")
+        names = [charity["name"] for charity in response.data["results"]]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            names += [charity["name"] for charity in response.data["results"]]
+        self.assertEqual(names, self.names("ordering=-impact_ratio"))
+
+    def test_search(self):
+        """Test prefix search across name, description and impact metric"""
+        self.assertEqual(
+            self.names("search=wat"), ["Charity Water", "Water for People"]
+        )
+        self.assertEqual(self.names("search=nets"), ["Malaria Consortium"])
+        self.assertEqual(self.names("search=trees"), ["Cool Earth"])
+        self.assertEqual(self.names("search=water+wells"), ["Charity Water"])
+
+    def test_search_treats_operators_as_text(self):
+        """Test that FTS syntax in the search text cannot break the query"""
+        self.assertEqual(self.names('search=NEAR("water'), [])
+        self.assertEqual(self.names("search=*"), self.names(""))
+
+    def test_search_fallback_without_fts5(self):
+        """Test the substring search used when FTS5 is unavailable"""
+        with mock.patch(
+            "impactreeapi.models.charity.fts5_available", return_value=False
+        ):
+            self.assertEqual(
+                self.names("search=wat"), ["Charity Water", "Water for People"]
+            )
+            self.assertEqual(self.names("search=water+wells"), ["Charity Water"])
+
+    def test_search_fallback_without_fts_table(self):
+        """Test that a database without the FTS table falls back to substrings"""
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {CHARITY_FTS_TABLE}")
+            detect_charity_fts(connection)
+
+            self.assertEqual(
+                self.names("search=wat"), ["Charity Water", "Water for People"]
+            )
+            response = self.client.get("/charities?search=water")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            transaction.set_rollback(True)
+
+        detect_charity_fts(connection)
+        self.assertTrue(charity_fts_ready(connection.alias))
+
+    def test_filters_combine(self):
+        """Test that filters, search and ordering apply together"""
+        self.assertEqual(
+            self.names(
+                f"category={self.water.id},{self.health.id}"
+                "&min_impact_ratio=0.1&ordering=-name"
+            ),
+            ["Water for People", "Malaria Consortium", "Helen Keller Intl"],
+        )
+
+    def test_invalid_parameters(self):
+        """Test that malformed filters get a 400 naming each bad parameter"""
+        response = self.client.get(
+            "/charities?category=water&min_impact_ratio=nan&ordering=website_url"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            set(response.data), {"category", "min_impact_ratio", "ordering"}
+        )
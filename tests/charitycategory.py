@@ -25,3 +25,39 @@ class CharityCategoryViewSetTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], "Education")
+
+    def test_rename_charity_category_invalidates_cache(self):
+        self.client.get("/charitycategories")
+        self.client.get(f"/charitycategories/{self.category1.id}")
+
+        self.category1.name = "Literacy"
+        self.category1.save()
+
+        response = self.client.get("/charitycategories")
+        self.assertIn("Literacy", [category["name"] for category in response.data])
+        response = self.client.get(f"/charitycategories/{self.category1.id}")
+        self.assertEqual(response.data["name"], "Literacy")
+
+    def test_list_charity_categories_conditional_get(self):
+        response = self.client.get("/charitycategories")
+        etag = response["ETag"]
+
+        response = self.client.get("/charitycategories", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        CharityCategory.objects.create(name="Environment")
+        response = self.client.get("/charitycategories", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+
+    def test_warm_category_read_is_one_query(self):
+        self.client.get("/charitycategories")
+        self.client.get(f"/charitycategories/{self.category1.id}")
+
+        # The ETag and the cache key share one TableVersion lookup
+        with self.assertNumQueries(1):
+            response = self.client.get("/charitycategories")
+        self.assertEqual(len(response.data), 2)
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/charitycategories/{self.category1.id}")
+        self.assertEqual(response.data["name"], "Education")
@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from django.db import OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 1234,
+    "mmap_size": 1048576,
+    "cache_size": -2048,
+    "temp_store": "MEMORY",
+}
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "SQLite pragmas")
+class SQLitePragmaTests(SimpleTestCase):
+    def open_connection(self, **options):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        wrapper = DatabaseWrapper(
+            {
+                **connection.settings_dict,
+                "NAME": os.path.join(directory.name, "db.sqlite3"),
+                "OPTIONS": options,
+            },
+            alias="pragmas",
+        )
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS=PRAGMAS)
+    def test_profile_pragmas_are_applied(self):
+        """Test that every new connection gets the performance pragmas"""
+        wrapper = self.open_connection()
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "wal")
+        self.assertEqual(self.pragma(wrapper, "synchronous"), 1)
+        self.assertEqual(self.pragma(wrapper, "busy_timeout"), 1234)
+        self.assertEqual(self.pragma(wrapper, "mmap_size"), 1048576)
+        self.assertEqual(self.pragma(wrapper, "cache_size"), -2048)
+        self.assertEqual(self.pragma(wrapper, "temp_store"), 2)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_default_connection_is_untouched(self):
+        """Test that SQLite keeps its defaults without the profile"""
+        wrapper = self.open_connection()
+        self.assertEqual(self.pragma(wrapper, "journal_mode"), "delete")
+
+    def begin(self, wrapper):
+        # What atomic() does on SQLite, where autocommit is never really off
+        wrapper.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True
+        )
+
+    def test_immediate_transactions_take_the_write_lock(self):
+        """Test that BEGIN IMMEDIATE locks out a second writer before any write"""
+        first = self.open_connection(transaction_mode="IMMEDIATE")
+        second = DatabaseWrapper(first.settings_dict, alias="pragmas")
+        second.ensure_connection()
+        self.addCleanup(second.close)
+        second.connection.execute("PRAGMA busy_timeout = 0")
+
+        self.begin(first)
+        self.addCleanup(first.rollback)
+        with self.assertRaisesMessage(OperationalError, "database is locked"):
+            self.begin(second)
@@ -1,4 +1,7 @@
+from unittest import mock
+from django.db import DatabaseError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework.authtoken.models import Token
@@ -8,8 +11,12 @@ from impactreeapi.models import (
     Milestone,
     Charity,
     ImpactPlanCharity,
+    ImpactSummary,
     CharityCategory,
 )
+from impactreeapi.authentication import token_cache
+from impactreeapi.milestones import milestone_resolver
+from impactreeapi.models.impactsummary import ImpactSummaryQuerySet
 
 
 class ImpactPlanViewTests(TestCase):
@@ -83,6 +90,86 @@ class ImpactPlanViewTests(TestCase):
         self.assertEqual(new_plan.current_milestone, self.milestone)
         self.assertEqual(new_plan.impactplancharity_set.count(), 2)
 
+    def test_create_impact_plan_with_missing_charity_rolls_back(self):
+        self.impact_plan_data["charities"].append(
+            {"charity_id": self.charity2.id + 1000, "allocation_amount": 100.00}
+        )
+        response = self.client.post(
+            "/impactplans", self.impact_plan_data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(self.charity2.id + 1000), response.data["reason"])
+        self.assertEqual(ImpactPlan.objects.count(), 0)
+        self.assertEqual(ImpactPlanCharity.objects.count(), 0)
+
+    def test_create_impact_plan_with_invalid_allocation_rolls_back(self):
+        self.impact_plan_data["charities"][1]["allocation_amount"] = "lots"
+        response = self.client.post(
+            "/impactplans", self.impact_plan_data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImpactPlan.objects.count(), 0)
+        self.assertEqual(ImpactPlanCharity.objects.count(), 0)
+
+        # The user can still create a plan once the request is fixed
+        self.impact_plan_data["charities"][1]["allocation_amount"] = 2500.00
+        response = self.client.post(
+            "/impactplans", self.impact_plan_data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(ImpactPlanCharity.objects.count(), 2)
+
+    def test_create_impact_plan_with_invalid_percentage(self):
+        self.impact_plan_data["philanthropy_percentage"] = "abc"
+        response = self.client.post(
+            "/impactplans", self.impact_plan_data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["reason"], "philanthropy_percentage must be a decimal number"
+        )
+        self.assertEqual(ImpactPlan.objects.count(), 0)
+
+    def test_create_impact_plan_with_repeated_charity_rolls_back(self):
+        self.impact_plan_data["charities"][1]["charity_id"] = self.charity1.id
+        response = self.client.post(
+            "/impactplans", self.impact_plan_data, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImpactPlan.objects.count(), 0)
+
+    def test_create_impact_plan_query_count_is_constant(self):
+        def count_create_queries(user, charities):
+            data = dict(self.impact_plan_data, user=user.id, charities=charities)
+            token_cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post("/impactplans", data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return len(context.captured_queries)
+
+        few = [{"charity_id": self.charity1.id, "allocation_amount": 100.00}]
+        many = [
+            {"charity_id": charity.id, "allocation_amount": 100.00}
+            for charity in Charity.objects.bulk_create(
+                Charity(
+                    name=f"Bulk Charity {index}",
+                    category=self.charity_category,
+                    description="Bulk charity",
+                    impact_metric="trees planted",
+                    impact_ratio=1.0,
+                )
+                for index in range(25)
+            )
+        ]
+
+        milestone_resolver.resolve(0)
+        queries_for_few = count_create_queries(self.user, few)
+        other_user = User.objects.create(username="otheruser")
+        queries_for_many = count_create_queries(other_user, many)
+
+        self.assertEqual(queries_for_few, queries_for_many)
+        self.assertEqual(ImpactPlanCharity.objects.count(), 26)
+
     def test_create_duplicate_impact_plan(self):
         # First, create an impact plan
         self.client.post("/impactplans", self.impact_plan_data, format="json")
@@ -145,6 +232,20 @@ class ImpactPlanViewTests(TestCase):
         self.assertEqual(impact_plan.total_annual_allocation, 3750.00)
         self.assertEqual(impact_plan.current_milestone, self.milestone)
 
+    def test_update_impact_plan_with_invalid_percentage(self):
+        impact_plan = ImpactPlan.objects.create(**self.impact_plan_orm_data)
+        response = self.client.put(
+            f"/impactplans/{impact_plan.id}",
+            {"philanthropy_percentage": "abc"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["reason"], "philanthropy_percentage must be a decimal number"
+        )
+        impact_plan.refresh_from_db()
+        self.assertEqual(impact_plan.philanthropy_percentage, 5.00)
+
     def test_list_impact_plans(self):
         # Create an impact plan first
         impact_plan = ImpactPlan.objects.create(**self.impact_plan_orm_data)
@@ -152,7 +253,7 @@ class ImpactPlanViewTests(TestCase):
             impact_plan=impact_plan, charity=self.charity1, allocation_amount=5000.00
         )
 
-        response = self.client.get("/impactplans")
+        response = self.client.get("/impactplans?paginate=false")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]["annual_income"], "100000.00")
@@ -167,6 +268,29 @@ class ImpactPlanViewTests(TestCase):
             response.data[0]["charities"][0]["allocation_amount"], "5000.00"
         )
 
+    def test_list_impact_plans_paginated(self):
+        for index in range(3):
+            user = User.objects.create(username=f"paged{index}")
+            ImpactPlan.objects.create(
+                user=user,
+                annual_income=50000.00,
+                philanthropy_percentage=5.00,
+                total_annual_allocation=2500.00,
+            )
+
+        response = self.client.get("/impactplans?page_size=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["previous"])
+        first_page_ids = [plan["id"] for plan in response.data["results"]]
+        self.assertEqual(first_page_ids, sorted(first_page_ids))
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNone(response.data["next"])
+        self.assertGreater(response.data["results"][0]["id"], first_page_ids[-1])
+
     def test_delete_impact_plan(self):
         # Create an impact plan first
         impact_plan = ImpactPlan.objects.create(**self.impact_plan_orm_data)
@@ -180,3 +304,274 @@ class ImpactPlanViewTests(TestCase):
         self.assertEqual(
             ImpactPlanCharity.objects.count(), 0
         )  # Verify cascading delete
+
+    def test_list_impact_plans_query_count_is_constant(self):
+        def create_plans(count):
+            for _ in range(count):
+                user = User.objects.create(
+                    username=f"planner{ImpactPlan.objects.count()}"
+                )
+                impact_plan = ImpactPlan.objects.create(
+                    user=user,
+                    annual_income=50000.00,
+                    philanthropy_percentage=5.00,
+                    total_annual_allocation=2500.00,
+                    current_milestone=self.milestone,
+                )
+                ImpactPlanCharity.objects.create(
+                    impact_plan=impact_plan,
+                    charity=self.charity1,
+                    allocation_amount=1500.00,
+                )
+                ImpactPlanCharity.objects.create(
+                    impact_plan=impact_plan,
+                    charity=self.charity2,
+                    allocation_amount=1000.00,
+                )
+
+        def count_list_queries():
+            token_cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get("/impactplans")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        create_plans(1)
+        queries_for_one_plan = count_list_queries()
+
+        create_plans(10)
+        queries_for_many_plans = count_list_queries()
+
+        self.assertEqual(queries_for_one_plan, queries_for_many_plans)
+
+
+class ImpactSummaryTests(TestCase):
+    def setUp(self):
+        # Milestones cached by earlier tests were rolled back with them
+        milestone_resolver.invalidate()
+        self.client = APIClient()
+        self.user = User.objects.create(username="summaryuser")
+        self.client.force_authenticate(user=self.user)
+        self.trees = Charity.objects.create(
+            name="Tree Charity",
+            description="Trees",
+            impact_metric="trees planted",
+            impact_ratio=0.5,
+        )
+        self.more_trees = Charity.objects.create(
+            name="More Trees",
+            description="Trees",
+            impact_metric="trees planted",
+            impact_ratio=2.0,
+        )
+        self.meals = Charity.objects.create(
+            name="Meal Charity",
+            description="Meals",
+            impact_metric="meals provided",
+            impact_ratio=4.0,
+        )
+        response = self.client.post(
+            "/impactplans",
+            {
+                "user": self.user.id,
+                "annual_income": 100000.00,
+                "philanthropy_percentage": 5.00,
+                "total_annual_allocation": 5000.00,
+                "charities": [
+                    {"charity_id": self.trees.id, "allocation_amount": 1000},
+                    {"charity_id": self.more_trees.id, "allocation_amount": 500},
+                    {"charity_id": self.meals.id, "allocation_amount": 250},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.impact_plan = ImpactPlan.objects.get(pk=response.data["id"])
+        self.created_summary = self.as_dict(response.data["impact_summary"])
+
+    def as_dict(self, summary):
+        return {
+            row["impact_metric"]: (float(row["total_allocation"]), row["total_impact"])
+            for row in summary
+        }
+
+    def summary(self):
+        response = self.client.get(f"/impactplans/{self.impact_plan.id}")
+        return self.as_dict(response.data["impact_summary"])
+
+    def test_summary_after_create(self):
+        """Test that impact is summed per metric when a plan is created"""
+        expected = {
+            "trees planted": (1500.0, 1500.0),
+            "meals provided": (250.0, 1000.0),
+        }
+        self.assertEqual(self.created_summary, expected)
+        self.assertEqual(self.summary(), expected)
+
+    def test_summary_follows_allocation_changes(self):
+        """Test that saving and deleting allocations updates the summary"""
+        allocation = ImpactPlanCharity.objects.get(charity=self.meals)
+        response = self.client.put(
+            f"/impactplan_charities/{allocation.id}",
+            {"allocation_amount": 500},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.summary()["meals provided"], (500.0, 2000.0))
+
+        allocation.delete()
+        self.assertNotIn("meals provided", self.summary())
+
+    def test_failed_refresh_keeps_previous_summary(self):
+        """Test that a refresh replaces a plan's summary rows all or nothing"""
+        ImpactPlanCharity.objects.filter(charity=self.meals).update(
+            allocation_amount=500
+        )
+        with mock.patch.object(
+            ImpactSummaryQuerySet, "bulk_create", side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            ImpactSummary.objects.refresh([self.impact_plan.id])
+        self.assertEqual(self.summary(), self.created_summary)
+
+    def test_summary_follows_impact_ratio_changes(self):
+        """Test that a charity's new impact_ratio reaches every plan holding it"""
+        self.more_trees.impact_ratio = 1.0
+        self.more_trees.save()
+        self.assertEqual(self.summary()["trees planted"], (1500.0, 1000.0))
+
+    def summary_queries(self, save):
+        with CaptureQueriesContext(connection) as context:
+            save()
+        return [
+            query["sql"]
+            for query in context.captured_queries
+            if "impactreeapi_impactsummary" in query["sql"]
+        ]
+
+    def test_charity_edits_keeping_impact_do_not_refresh(self):
+        """Test that only impact_ratio and impact_metric changes refresh plans"""
+        charity = Charity.objects.get(pk=self.more_trees.pk)
+        charity.name = "Renamed"
+        charity.description = "Still trees"
+        self.assertEqual(self.summary_queries(charity.save), [])
+
+        charity.impact_ratio = "2.0"
+        self.assertEqual(self.summary_queries(charity.save), [])
+
+        charity.impact_ratio = 1.0
+        self.assertEqual(
+            self.summary_queries(lambda: charity.save(update_fields=["name"])), []
+        )
+        self.assertNotEqual(self.summary_queries(charity.save), [])
+        self.assertEqual(self.summary()["trees planted"], (1500.0, 1000.0))
+
+    def test_summary_follows_impact_metric_changes_through_the_api(self):
+        """Test that renaming a charity's impact metric moves its plan totals"""
+        self.client.force_authenticate(
+            user=User.objects.create(username="metricadmin", is_staff=True)
+        )
+        response = self.client.put(
+            f"/charities/{self.meals.id}", {"impact_metric": "trees planted"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.summary(), {"trees planted": (1750.0, 2500.0)})
+
+    def test_summary_follows_batch_changes(self):
+        """Test that the bulk writes of the batch endpoint refresh the summary"""
+        meals = ImpactPlanCharity.objects.get(charity=self.meals)
+        trees = ImpactPlanCharity.objects.get(charity=self.trees)
+        response = self.client.post(
+            "/impactplan_charities/batch",
+            {
+                "operations": [
+                    {"op": "delete", "id": meals.id},
+                    {"op": "update", "id": trees.id, "allocation_amount": 3000},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.summary(), {"trees planted": (3500.0, 2500.0)})
+
+    def plan_holding(self, charities):
+        """Create a plan for a new user with 10 dollars in each charity"""
+        user = User.objects.create(username=f"holder{User.objects.count()}")
+        impact_plan = ImpactPlan.objects.create(
+            user=user,
+            annual_income=50000.00,
+            philanthropy_percentage=5.00,
+            total_annual_allocation=2500.00,
+        )
+        ImpactPlanCharity.objects.bulk_create(
+            ImpactPlanCharity(
+                impact_plan=impact_plan, charity=charity, allocation_amount=10
+            )
+            for charity in charities
+        )
+        ImpactSummary.objects.refresh([impact_plan.pk])
+        return impact_plan
+
+    def count_delete_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        return len(context.captured_queries)
+
+    def test_destroy_plan_query_count_is_constant(self):
+        """Test that deleting a plan does not refresh its summary per allocation"""
+        charities = Charity.objects.bulk_create(
+            Charity(name=f"Charity {index}", impact_metric="trees", impact_ratio=1.0)
+            for index in range(25)
+        )
+        small = self.plan_holding(charities[:1])
+        large = self.plan_holding(charities)
+
+        self.client.force_authenticate(user=small.user)
+        queries_for_small = self.count_delete_queries(f"/impactplans/{small.id}")
+        self.client.force_authenticate(user=large.user)
+        queries_for_large = self.count_delete_queries(f"/impactplans/{large.id}")
+
+        self.assertEqual(queries_for_small, queries_for_large)
+        self.assertFalse(ImpactSummary.objects.filter(impact_plan=large).exists())
+
+    def test_destroy_charity_query_count_is_constant(self):
+        """Test that deleting a charity refreshes the plans holding it once"""
+        rare, common = Charity.objects.bulk_create(
+            Charity(name=name, impact_metric="meals provided", impact_ratio=1.0)
+            for name in ("Rare", "Common")
+        )
+        # Every plan keeps an allocation, so each refresh writes summary rows
+        plans = [self.plan_holding([self.trees, rare, common])]
+        plans += [self.plan_holding([self.trees, common]) for _ in range(19)]
+        self.client.force_authenticate(
+            user=User.objects.create(username="charityadmin", is_staff=True)
+        )
+
+        queries_for_one_plan = self.count_delete_queries(f"/charities/{rare.id}")
+        queries_for_many_plans = self.count_delete_queries(f"/charities/{common.id}")
+
+        self.assertEqual(queries_for_one_plan, queries_for_many_plans)
+        self.assertFalse(
+            ImpactSummary.objects.filter(
+                impact_plan__in=plans, impact_metric="meals provided"
+            ).exists()
+        )
+        self.assertEqual(
+            ImpactSummary.objects.filter(
+                impact_plan__in=plans, impact_metric="trees planted"
+            ).count(),
+            20,
+        )
+
+    def test_summary_read_does_not_join_allocations(self):
+        """Test that the summary is read from its own table"""
+        with CaptureQueriesContext(connection) as context:
+            self.summary()
+        summary_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "impactreeapi_impactsummary" in query["sql"]
+        ]
+        self.assertEqual(len(summary_queries), 1)
+        self.assertNotIn("impactreeapi_impactplancharity", summary_queries[0])
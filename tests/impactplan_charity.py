@@ -2,6 +2,9 @@ from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
 from impactreeapi.models import ImpactPlan, Charity, ImpactPlanCharity
+from impactreeapi.authentication import token_cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.authtoken.models import Token
 
@@ -121,10 +124,173 @@ class ImpactPlanCharityViewSetTests(APITestCase):
         self.assertGreater(len(response.data), 0, "Expected non-empty response data")
 
         # Check that the returned data includes the created relationships
-        returned_ids = {item["id"] for item in response.data}
+        returned_ids = {item["charity"]["id"] for item in response.data}
         self.assertIn(
             self.charity1.id, returned_ids, "Charity 1 not found in response data"
         )
         self.assertIn(
             self.charity2.id, returned_ids, "Charity 2 not found in response data"
         )
+
+    def test_batch_applies_all_operations(self):
+        """Test creating, updating and deleting allocations in one request"""
+        to_update = ImpactPlanCharity.objects.create(
+            impact_plan=self.impact_plan, charity=self.charity1, allocation_amount=500
+        )
+        to_delete = ImpactPlanCharity.objects.create(
+            impact_plan=self.impact_plan, charity=self.charity2, allocation_amount=300
+        )
+        charity3 = Charity.objects.create(
+            name="Charity3", description="Test charity 3", impact_ratio=2.0
+        )
+        data = {
+            "operations": [
+                {"op": "update", "id": to_update.id, "allocation_amount": 900},
+                {"op": "delete", "id": to_delete.id},
+                {
+                    "op": "create",
+                    "impact_plan_id": self.impact_plan.id,
+                    "charity_id": charity3.id,
+                    "allocation_amount": 250,
+                },
+                {
+                    "op": "create",
+                    "impact_plan_id": self.impact_plan.id,
+                    "charity_id": self.charity2.id,
+                    "allocation_amount": 100,
+                },
+            ]
+        }
+        url = reverse("impactplan_charities-batch")
+        response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            [200, 204, 201, 201],
+        )
+        self.assertEqual(
+            float(response.data["results"][0]["data"]["allocation_amount"]), 900.00
+        )
+        self.assertEqual(
+            response.data["results"][2]["data"]["charity"]["id"], charity3.id
+        )
+        to_update.refresh_from_db()
+        self.assertEqual(float(to_update.allocation_amount), 900.00)
+        self.assertFalse(ImpactPlanCharity.objects.filter(id=to_delete.id).exists())
+        self.assertEqual(
+            set(
+                ImpactPlanCharity.objects.filter(
+                    impact_plan=self.impact_plan
+                ).values_list("charity_id", flat=True)
+            ),
+            {self.charity1.id, self.charity2.id, charity3.id},
+        )
+
+    def test_batch_is_all_or_nothing(self):
+        """Test that one failing operation leaves the portfolio untouched"""
+        existing = ImpactPlanCharity.objects.create(
+            impact_plan=self.impact_plan, charity=self.charity1, allocation_amount=500
+        )
+        data = {
+            "operations": [
+                {"op": "update", "id": existing.id, "allocation_amount": 900},
+                {
+                    "op": "create",
+                    "impact_plan_id": self.impact_plan.id,
+                    "charity_id": self.charity1.id,
+                    "allocation_amount": 100,
+                },
+                {"op": "delete", "id": existing.id + 1000},
+                {"op": "update", "id": existing.id, "allocation_amount": "lots"},
+            ]
+        }
+        url = reverse("impactplan_charities-batch")
+        response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            [424, 400, 404, 400],
+        )
+        self.assertEqual(
+            response.data["results"][1]["message"],
+            "This charity is already in the impact plan",
+        )
+        existing.refresh_from_db()
+        self.assertEqual(float(existing.allocation_amount), 500.00)
+        self.assertEqual(ImpactPlanCharity.objects.count(), 1)
+
+    def test_batch_rejects_a_body_that_is_not_an_object(self):
+        """Test that a JSON list or scalar body gets a 400 instead of a 500"""
+        url = reverse("impactplan_charities-batch")
+        for body in ([{"op": "delete", "id": 1}], "operations", 3):
+            response = self.client.post(url, body, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(
+                response.data["message"], "Expected an object with an operations list"
+            )
+
+    def test_batch_query_count_is_constant(self):
+        """Test that the batch cost does not grow with the number of operations"""
+        charities = Charity.objects.bulk_create(
+            Charity(name=f"Batch Charity {index}", description="Batch", impact_ratio=1.0)
+            for index in range(20)
+        )
+        url = reverse("impactplan_charities-batch")
+
+        def count_batch_queries(batch_charities):
+            operations = [
+                {
+                    "op": "create",
+                    "impact_plan_id": self.impact_plan.id,
+                    "charity_id": charity.id,
+                    "allocation_amount": 10,
+                }
+                for charity in batch_charities
+            ]
+            token_cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(
+                    url, {"operations": operations}, format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        self.assertEqual(
+            count_batch_queries(charities[:1]), count_batch_queries(charities[1:])
+        )
+
+    def test_batch_delete_query_count_is_constant(self):
+        """Test that deleting more allocations does not refresh the summary per row"""
+        charities = Charity.objects.bulk_create(
+            Charity(
+                name=f"Batch Charity {index}", description="Batch", impact_ratio=1.0
+            )
+            for index in range(6)
+        )
+        allocations = ImpactPlanCharity.objects.bulk_create(
+            ImpactPlanCharity(
+                impact_plan=self.impact_plan, charity=charity, allocation_amount=10
+            )
+            for charity in charities
+        )
+        url = reverse("impactplan_charities-batch")
+
+        def count_batch_queries(batch_allocations):
+            operations = [
+                {"op": "delete", "id": allocation.id}
+                for allocation in batch_allocations
+            ]
+            token_cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(
+                    url, {"operations": operations}, format="json"
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        self.assertEqual(
+            count_batch_queries(allocations[:1]), count_batch_queries(allocations[1:-1])
+        )
+        self.assertEqual(ImpactPlanCharity.objects.get().pk, allocations[-1].pk)
@@ -0,0 +1,89 @@
+import unittest
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from impactreeapi.models import (
+    Charity,
+    ImpactPlan,
+    ImpactPlanCharity,
+    Milestone,
+)
+
+
+class ConstraintTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="constraints")
+        self.impact_plan = ImpactPlan.objects.create(
+            user=self.user,
+            annual_income=100000.00,
+            philanthropy_percentage=5.00,
+            total_annual_allocation=5000.00,
+        )
+        self.charity = Charity.objects.create(
+            name="Constraint Charity",
+            description="Constraint",
+            impact_metric="rows",
+            impact_ratio=1.0,
+            website_url="http://example.com",
+        )
+
+    def test_one_impact_plan_per_user(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ImpactPlan.objects.create(
+                user=self.user,
+                annual_income=1,
+                philanthropy_percentage=1,
+                total_annual_allocation=1,
+            )
+
+    def test_charity_once_per_impact_plan(self):
+        ImpactPlanCharity.objects.create(
+            impact_plan=self.impact_plan, charity=self.charity, allocation_amount=1
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ImpactPlanCharity.objects.create(
+                impact_plan=self.impact_plan, charity=self.charity, allocation_amount=2
+            )
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "query plans are SQLite's")
+class QueryPlanTests(TestCase):
+    """The lookups the views make are answered from an index, not a table scan"""
+
+    def assertSearchesIndex(self, queryset, *columns):
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        self.assertIn(f"SEARCH {table} USING", plan)
+        self.assertIn("INDEX", plan)
+        for column in columns:
+            self.assertIn(column, plan)
+
+    def test_impact_plan_by_user(self):
+        self.assertSearchesIndex(ImpactPlan.objects.filter(user_id=1), "user_id=?")
+
+    def test_allocation_by_plan_and_charity(self):
+        self.assertSearchesIndex(
+            ImpactPlanCharity.objects.filter(impact_plan_id=1, charity_id=1),
+            "impact_plan_id=? AND charity_id=?",
+        )
+
+    def test_allocations_by_plan(self):
+        self.assertSearchesIndex(
+            ImpactPlanCharity.objects.filter(impact_plan_id=1), "impact_plan_id=?"
+        )
+
+    def test_milestone_by_required_percentage(self):
+        self.assertSearchesIndex(
+            Milestone.objects.filter(required_percentage__lte=5),
+            "milestone_required_pct_idx",
+        )
+
+    def test_milestones_sorted_by_required_percentage(self):
+        plan = Milestone.objects.order_by("required_percentage").explain()
+        self.assertIn("milestone_required_pct_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_charity_by_impact_ratio(self):
+        self.assertSearchesIndex(
+            Charity.objects.filter(impact_ratio__gte=1), "charity_impact_ratio_idx"
+        )
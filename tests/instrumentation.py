@@ -0,0 +1,125 @@
+import json
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, modify_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from impactreeapi.instrumentation import logger, request_stats
+from impactreeapi.models import Charity, ImpactPlan, ImpactPlanCharity, Milestone
+
+MIDDLEWARE = "impactreeapi.instrumentation.RequestInstrumentationMiddleware"
+
+
+@modify_settings(MIDDLEWARE={"prepend": MIDDLEWARE})
+class RequestInstrumentationTests(TestCase):
+    def setUp(self):
+        request_stats.clear()
+        # Keep the per-request log lines out of the test output
+        self.enterContext(mock.patch.object(logger, "handlers", []))
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="timed", password="testpass")
+        self.admin_user = User.objects.create(username="timedadmin", is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+
+        self.milestone = Milestone.objects.create(
+            name="Sprout",
+            description="Sprout",
+            required_percentage=1,
+            image_filename="sprout.png",
+        )
+        plan = ImpactPlan.objects.create(
+            user=self.user,
+            annual_income=50000,
+            philanthropy_percentage=5,
+            total_annual_allocation=2500,
+        )
+        for index in range(3):
+            charity = Charity.objects.create(name=f"Charity {index}", impact_ratio=1.0)
+            ImpactPlanCharity.objects.create(
+                impact_plan=plan, charity=charity, allocation_amount=100
+            )
+
+    def timing(self, response):
+        """Server-Timing header as {metric: {param: value}}"""
+        metrics = {}
+        for entry in response["Server-Timing"].split(", "):
+            name, *params = entry.split(";")
+            metrics[name] = dict(param.split("=", 1) for param in params)
+        return metrics
+
+    def test_server_timing_header(self):
+        """Test that responses carry total, db and serializer timings"""
+        response = self.client.get("/charities")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = self.timing(response)
+        self.assertEqual(set(timing), {"total", "db", "serialize"})
+        self.assertGreaterEqual(float(timing["total"]["dur"]), 0)
+        self.assertIn("queries", timing["db"]["desc"])
+
+    def test_repeated_queries_are_logged(self):
+        """Test that an N+1 shows up as repeated queries in the request log"""
+        with self.assertLogs("impactreeapi.requests", "INFO") as logs:
+            response = self.client.get("/impactplan_charities")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        record = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(record["view"], "ImpactPlanCharityViewSet.list")
+        self.assertEqual(record["status"], 200)
+        self.assertGreater(record["queries"], 0)
+        self.assertGreater(record["duplicate_queries"], 0)
+        self.assertTrue(all(row["count"] > 1 for row in record["repeated"]))
+
+    def test_function_views_are_labelled_by_name(self):
+        """Test that @api_view views are recorded under their function name"""
+        with self.assertLogs("impactreeapi.requests", "INFO") as logs:
+            self.client.post(
+                "/login", {"username": "timed", "password": "testpass"}, format="json"
+            )
+        self.assertEqual(
+            json.loads(logs.records[-1].getMessage())["view"], "login_user"
+        )
+
+    def test_stats_report_each_action(self):
+        """Test that GET /stats reports rolling figures per view action"""
+        for _ in range(3):
+            self.client.get("/charities")
+        self.client.get("/milestones")
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get("/stats")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        requests = response.data["requests"]
+        self.assertEqual(requests["CharityViewSet.list"]["requests"], 3)
+        self.assertEqual(requests["MilestoneViewSet.list"]["requests"], 1)
+        histogram = requests["CharityViewSet.list"]["histogram"]
+        self.assertEqual(histogram["inf"], 3)
+        self.assertLessEqual(histogram["le_5ms"], histogram["le_5000ms"])
+
+    def test_window_is_bounded(self):
+        """Test that only the most recent requests are kept per action"""
+        request_stats.window = 2
+        self.addCleanup(setattr, request_stats, "window", request_stats.window)
+        request_stats.clear()
+        for _ in range(4):
+            self.client.get("/milestones")
+        stats = request_stats.stats()["MilestoneViewSet.list"]
+        self.assertEqual(stats["requests"], 4)
+        self.assertEqual(stats["window"], 2)
+
+    async def test_async_requests_are_measured(self):
+        """Test that queries run through the async handler are counted"""
+        response = await self.async_client.get(
+            "/milestones", headers={"authorization": "Token " + self.token.key}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("Server-Timing", response)
+        self.assertNotIn('"0 queries', response["Server-Timing"])
+
+
+class RequestInstrumentationDisabledTests(TestCase):
+    def test_no_header_without_middleware(self):
+        """Test that the middleware is opt-in"""
+        response = self.client.get("/charities")
+        self.assertNotIn("Server-Timing", response)
@@ -0,0 +1,121 @@
+import os
+import tempfile
+from django.test import TestCase, override_settings
+from rest_framework import status
+
+CONTENT = bytes(range(256)) * 4
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        os.makedirs(os.path.join(media_root.name, "charityimages"))
+        with open(
+            os.path.join(media_root.name, "charityimages", "logo.png"), "wb"
+        ) as f:
+            f.write(CONTENT)
+        with open(os.path.join(media_root.name, "notes.txt"), "wb") as f:
+            f.write(b"notes")
+
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root.name, MEDIA_SERVING="app"
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = "/media/charityimages/logo.png"
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_response_headers(self):
+        """Test that uploads are served with validators and immutable caching"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.body(response), CONTENT)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_other_media_is_not_immutable(self):
+        """Test that files outside the UUID-named uploads get a short lifetime"""
+        response = self.client.get("/media/notes.txt")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("immutable", response["Cache-Control"])
+
+    def test_if_none_match(self):
+        """Test that a matching ETag gets a 304 with no body"""
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_byte_range(self):
+        """Test that a single byte range gets a 206 with just those bytes"""
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(self.body(response), CONTENT[10:20])
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(CONTENT)}")
+        self.assertEqual(response["Content-Length"], "10")
+
+    def test_open_and_suffix_ranges(self):
+        """Test ranges without an end and ranges counted from the end"""
+        response = self.client.get(self.url, HTTP_RANGE="bytes=1000-")
+        self.assertEqual(self.body(response), CONTENT[1000:])
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-24")
+        self.assertEqual(self.body(response), CONTENT[-24:])
+
+    def test_unsatisfiable_range(self):
+        """Test that a range past the end of the file gets a 416"""
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-6000")
+        self.assertEqual(
+            response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(response["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_stale_if_range_sends_full_file(self):
+        """Test that a range for an older version of the file is not served"""
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.body(response), CONTENT)
+
+        etag = response["ETag"]
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+    def test_path_outside_media_root(self):
+        """Test that paths escaping MEDIA_ROOT are not served"""
+        response = self.client.get("/media/../manage.py")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get("/media/charityimages")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_writes_are_rejected(self):
+        """Test that media can only be read"""
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @override_settings(
+        MEDIA_SERVING="x-accel-redirect", MEDIA_ACCEL_REDIRECT_PREFIX="/internal/"
+    )
+    def test_x_accel_redirect(self):
+        """Test that nginx offload sends headers only"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/internal/charityimages/logo.png"
+        )
+        self.assertEqual(response.content, b"")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    @override_settings(MEDIA_SERVING="static")
+    def test_static_mode(self):
+        """Test that the development handler is still available"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.body(response), CONTENT)
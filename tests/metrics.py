@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from impactreeapi import prometheus
+from impactreeapi.metrics import registry
+from impactreeapi.models import Charity
+
+
+def samples(text):
+    """{sample name with labels: value} from Prometheus text output"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username="metricsuser")
+        self.admin_user = User.objects.create(username="metricsadmin", is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION="Token " + self.token.key)
+        Charity.objects.create(name="Wells", impact_ratio=1.0)
+
+    def scrape(self):
+        client = APIClient()
+        client.force_authenticate(user=self.admin_user)
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], prometheus.CONTENT_TYPE)
+        return samples(response.content.decode())
+
+    def test_metrics_are_admin_only(self):
+        """Test that non-admin users cannot read /metrics"""
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_requests_are_counted_by_action(self):
+        """Test that requests are counted and timed per view action and status"""
+        for _ in range(3):
+            self.client.get("/charities")
+        self.client.get("/charities/999")
+
+        values = self.scrape()
+        self.assertEqual(
+            values[
+                'impactree_requests_total{view="CharityViewSet.list",'
+                'method="GET",status="200"}'
+            ],
+            3,
+        )
+        self.assertEqual(
+            values[
+                'impactree_requests_total{view="CharityViewSet.retrieve",'
+                'method="GET",status="404"}'
+            ],
+            1,
+        )
+        count = values[
+            'impactree_request_duration_seconds_count{view="CharityViewSet.list"}'
+        ]
+        self.assertEqual(count, 3)
+        self.assertEqual(
+            values[
+                "impactree_request_duration_seconds_bucket"
+                '{view="CharityViewSet.list",le="+Inf"}'
+            ],
+            count,
+        )
+
+    def test_cache_and_database_figures(self):
+        """Test that cache lookups and database connections are reported"""
+        self.client.get("/charities")
+        values = self.scrape()
+        self.assertIn('impactree_cache_hits_total{cache="token"}', values)
+        self.assertGreaterEqual(
+            values['impactree_cache_misses_total{cache="catalog"}'], 1
+        )
+        self.assertGreaterEqual(values['impactree_db_connections{alias="default"}'], 1)
+        self.assertEqual(values["impactree_requests_in_progress"], 1)
+        self.assertEqual(values["impactree_worker_processes"], 1)
+
+    def test_unhandled_exceptions_are_typed_500s(self):
+        """Test that an unexpected error becomes a counted JSON 500"""
+        with mock.patch(
+            "impactreeapi.views.impactplan.wants_unpaginated",
+            side_effect=RuntimeError("connection details"),
+        ):
+            with self.assertLogs("impactreeapi.errors", "ERROR"):
+                response = self.client.get("/impactplans?paginate=false")
+
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.json()["error"], "RuntimeError")
+        self.assertNotIn("connection details", response.content.decode())
+        values = self.scrape()
+        self.assertEqual(
+            values[
+                "impactree_request_exceptions_total"
+                '{view="ImpactPlanViewSet.list",exception="RuntimeError"}'
+            ],
+            1,
+        )
+
+
+class PrometheusRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = prometheus.Registry()
+        self.counter = prometheus.Counter(
+            self.registry, "test_total", "Test counter.", ("kind",)
+        )
+        self.gauge = prometheus.Gauge(self.registry, "test_gauge", "Test gauge.")
+
+    def test_threads_are_merged(self):
+        """Test that counts from many threads add up on collection"""
+
+        def work():
+            for _ in range(1000):
+                self.counter.inc("a")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.counter.collect(), {("a",): 8000})
+
+    def test_label_values_are_escaped(self):
+        """Test that quotes, backslashes and newlines in labels are escaped"""
+        self.counter.inc('say "hi"\\\n')
+        self.assertIn(
+            'test_total{kind="say \\"hi\\"\\\\\\n"} 1', self.registry.render()
+        )
+
+    def test_processes_are_merged(self):
+        """Test that a scrape adds up the files of every worker process"""
+        directory = tempfile.mkdtemp()
+        self.registry.directory = directory
+        self.counter.inc("a", amount=2)
+        self.gauge.inc(amount=3)
+        # Another worker, which has since exited
+        prometheus.write_snapshot(directory, 1, self.registry.snapshot())
+        prometheus.mark_process_dead(directory, 1)
+
+        values = samples(self.registry.render())
+        self.assertEqual(values['test_total{kind="a"}'], 4)
+        self.assertEqual(values["test_gauge"], 3)
+
+        prometheus.clear_directory(directory)
+        self.assertEqual(os.listdir(directory), [])
+        os.rmdir(directory)
+
+    def test_dead_process_files_stay_readable(self):
+        """Test that mark_process_dead keeps a valid snapshot"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(prometheus.clear_directory, directory)
+        self.counter.inc("a")
+        prometheus.write_snapshot(directory, 1, self.registry.snapshot())
+        prometheus.mark_process_dead(directory, 1)
+        with open(prometheus.snapshot_path(directory, 1)) as file:
+            self.assertEqual(set(json.load(file)), {"test_total"})
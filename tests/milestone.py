@@ -1,10 +1,13 @@
 # tests.py
+import time
+from unittest.mock import patch
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient
-from impactreeapi.models import Milestone
+from impactreeapi.models import Milestone, TableVersion
+from impactreeapi.milestones import MilestoneResolver, milestone_resolver
 
 User = get_user_model()
 
@@ -51,3 +54,90 @@ class MilestoneViewSetTests(TestCase):
         self.assertEqual(
             response.data["image_filename"], self.milestone1.image_filename
         )
+
+    def test_list_milestones_conditional_get(self):
+        url = reverse("milestone-list")
+        response = self.client.get(url)
+        etag = response["ETag"]
+        last_modified = response["Last-Modified"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.milestone2.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_retrieve_milestone_sends_etag(self):
+        url = reverse("milestone-detail", kwargs={"pk": self.milestone1.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_resolver_picks_highest_reached_milestone(self):
+        self.assertIsNone(milestone_resolver.resolve(10))
+        self.assertEqual(milestone_resolver.resolve(50), self.milestone1)
+        self.assertEqual(milestone_resolver.resolve("74.99"), self.milestone1)
+        self.assertEqual(milestone_resolver.resolve(100), self.milestone2)
+
+    def test_resolver_answers_from_memory(self):
+        milestone_resolver.resolve(60)
+        with self.assertNumQueries(0):
+            resolved = milestone_resolver.resolve_many([0, 50, 60, 75, 99.5])
+        self.assertEqual(
+            resolved,
+            [None, self.milestone1, self.milestone1, self.milestone2, self.milestone2],
+        )
+
+    def test_resolver_reloads_after_change_in_another_worker(self):
+        resolver = MilestoneResolver(ttl=5)
+        self.assertEqual(resolver.resolve(60), self.milestone1)
+
+        # Another worker's save: no signals reach this process
+        Milestone.objects.filter(pk=self.milestone2.pk).update(
+            required_percentage="60.00"
+        )
+        TableVersion.bump(Milestone)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.resolve(60), self.milestone1)
+
+        later = time.monotonic() + 5
+        with patch("impactreeapi.milestones.time.monotonic", return_value=later):
+            self.assertEqual(resolver.resolve(60), self.milestone2)
+
+    def test_resolver_with_zero_ttl_checks_every_lookup(self):
+        resolver = MilestoneResolver(ttl=0)
+        self.assertEqual(resolver.resolve(60), self.milestone1)
+        Milestone.objects.filter(pk=self.milestone2.pk).update(
+            required_percentage="60.00"
+        )
+        TableVersion.bump(Milestone)
+        self.assertEqual(resolver.resolve(60), self.milestone2)
+
+    def test_resolver_reloads_after_viewset_changes(self):
+        self.assertEqual(milestone_resolver.resolve(60), self.milestone1)
+
+        response = self.client.post(
+            reverse("milestone-list"),
+            {
+                "name": "Test Milestone 3",
+                "description": "Description for Test Milestone 3",
+                "required_percentage": "60.00",
+                "image_filename": "branch-builder.png",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(milestone_resolver.resolve(60).id, response.data["id"])
+
+        response = self.client.delete(
+            reverse("milestone-detail", kwargs={"pk": response.data["id"]})
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(milestone_resolver.resolve(60), self.milestone1)
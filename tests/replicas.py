@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from impactreeapi.models import Charity
+from impactreeapi.replicas import (
+    ReplicaRouter,
+    ReplicaRoutingMiddleware,
+    read_from_replica,
+)
+
+REPLICAS = ["replica0", "replica1"]
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, DATABASE_REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        caches["default"].clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.routes = []
+
+    def record_routes(self, request):
+        self.routes.append(
+            {
+                "read": self.router.db_for_read(Charity),
+                "token": self.router.db_for_read(Token),
+                "user": self.router.db_for_read(User),
+                "write": self.router.db_for_write(Charity),
+            }
+        )
+        return HttpResponse()
+
+    def send(self, method, token="first"):
+        middleware = ReplicaRoutingMiddleware(self.record_routes)
+        request = getattr(self.factory, method)(
+            "/charities", HTTP_AUTHORIZATION="Token " + token
+        )
+        middleware(request)
+        return self.routes[-1]
+
+    def test_safe_reads_use_a_replica(self):
+        """Test that GET requests read from one of the replicas"""
+        routes = self.send("get")
+        self.assertIn(routes["read"], REPLICAS)
+        self.assertEqual(routes["write"], "default")
+
+    def test_request_reads_from_one_replica(self):
+        """Test that every read of a request goes to the same replica"""
+
+        def record_reads(request):
+            self.routes.append({self.router.db_for_read(Charity) for _ in range(20)})
+            return HttpResponse()
+
+        for _ in range(10):
+            ReplicaRoutingMiddleware(record_reads)(self.factory.get("/charities"))
+        self.assertTrue(all(len(replicas) == 1 for replicas in self.routes))
+
+    def test_cache_table_is_read_from_primary(self):
+        """Test that pins kept in a DatabaseCache are never read from a replica"""
+        cache_model = DatabaseCache("impactree_cache", {}).cache_model_class
+        token = read_from_replica.set(REPLICAS[0])
+        try:
+            self.assertEqual(self.router.db_for_read(cache_model), "default")
+        finally:
+            read_from_replica.reset(token)
+
+    def test_credentials_are_read_from_primary(self):
+        """Test that token and user lookups never see a lagging replica"""
+        routes = self.send("get")
+        self.assertEqual(routes["token"], "default")
+        self.assertEqual(routes["user"], "default")
+
+    def test_writes_read_from_primary(self):
+        """Test that reads made while handling a write go to the primary"""
+        routes = self.send("put")
+        self.assertEqual(routes["read"], "default")
+        self.assertEqual(routes["write"], "default")
+
+    def test_client_reads_its_own_writes(self):
+        """Test that a client that just wrote is pinned to the primary"""
+        self.send("put", token="first")
+        self.assertEqual(self.send("get", token="first")["read"], "default")
+        self.assertIn(self.send("get", token="second")["read"], REPLICAS)
+
+    def test_outside_a_request(self):
+        """Test that management commands and shells use the primary"""
+        self.assertEqual(self.router.db_for_read(Charity), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Test that everything uses default when no replicas are configured"""
+        self.assertEqual(self.send("get")["read"], "default")
+
+    async def test_async_requests(self):
+        """Test routing and pinning when served through ASGI"""
+
+        async def record_routes(request):
+            return self.record_routes(request)
+
+        middleware = ReplicaRoutingMiddleware(record_routes)
+        factory = AsyncRequestFactory()
+        headers = {"Authorization": "Token async"}
+        await middleware(factory.get("/charities", headers=headers))
+        self.assertIn(self.routes[-1]["read"], REPLICAS)
+
+        await middleware(factory.post("/charities", headers=headers))
+        await middleware(factory.get("/charities", headers=headers))
+        self.assertEqual(self.routes[-1]["read"], "default")
@@ -0,0 +1,118 @@
+import json
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from impactreeapi.models import (
+    Charity,
+    CharityCategory,
+    ImpactPlan,
+    ImpactPlanCharity,
+    ImpactSummary,
+    Milestone,
+    TableVersion,
+)
+from impactreeapi.seeding import FIXTURE_DIR, dependency_order, load_fixtures
+
+
+def summaries(plan_ids):
+    return sorted(
+        ImpactSummary.objects.filter(impact_plan_id__in=plan_ids).values_list(
+            "impact_plan_id", "impact_metric", "total_allocation", "total_impact"
+        )
+    )
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, *args):
+        output = StringIO()
+        call_command("seed", *args, stdout=output)
+        return output.getvalue()
+
+    def test_fixtures_are_loaded(self):
+        """Test that every fixture row is written with its relations"""
+        self.seed()
+        fixtures = {}
+        for name, model in (
+            ("users", User),
+            ("tokens", Token),
+            ("milestones", Milestone),
+            ("charitycategories", CharityCategory),
+            ("charities", Charity),
+            ("impactplans", ImpactPlan),
+            ("impactplan_charities", ImpactPlanCharity),
+        ):
+            with open(FIXTURE_DIR / f"{name}.json") as file:
+                fixtures[name] = json.load(file)
+            self.assertEqual(model.objects.count(), len(fixtures[name]), name)
+
+        token = Token.objects.get(key="9944b09199c62bcf9418ad846dd0e4bbdfc6ee4b")
+        self.assertEqual(token.user_id, 1)
+        charity = fixtures["charities"][0]
+        self.assertEqual(
+            Charity.objects.get(pk=charity["pk"]).category_id,
+            charity["fields"]["category"],
+        )
+
+    def test_summaries_and_versions_are_rebuilt(self):
+        """Test that seeding does what the skipped signals would have done"""
+        self.seed()
+        plan_ids = list(ImpactPlan.objects.values_list("pk", flat=True))
+        seeded = summaries(plan_ids)
+        self.assertTrue(seeded)
+        ImpactSummary.objects.refresh(plan_ids)
+        self.assertEqual(seeded, summaries(plan_ids))
+        self.assertTrue(TableVersion.objects.filter(table="impactreeapi.charity"))
+
+    def test_seeding_twice_overwrites(self):
+        """Test that loading the fixtures again updates rows instead of failing"""
+        self.seed()
+        Charity.objects.filter(pk=1).update(name="Renamed")
+        self.seed("charities")
+        self.assertNotEqual(Charity.objects.get(pk=1).name, "Renamed")
+        self.assertEqual(Charity.objects.count(), 9)
+
+    def test_if_empty_skips_a_seeded_database(self):
+        """Test that --if-empty leaves a database with users alone"""
+        User.objects.create(username="existing")
+        self.assertIn("nothing to seed", self.seed("--if-empty"))
+        self.assertFalse(Charity.objects.exists())
+
+    def test_unknown_fixture(self):
+        """Test that a misspelt fixture name fails before anything is written"""
+        with self.assertRaises(CommandError):
+            self.seed("charites")
+
+    def test_dependency_order(self):
+        """Test that referenced models are written before the rows using them"""
+        order = dependency_order(
+            [ImpactPlanCharity, Token, Charity, ImpactPlan, User, CharityCategory]
+        )
+        self.assertLess(order.index(User), order.index(Token))
+        self.assertLess(order.index(User), order.index(ImpactPlan))
+        self.assertLess(order.index(CharityCategory), order.index(Charity))
+        self.assertLess(order.index(ImpactPlan), order.index(ImpactPlanCharity))
+        self.assertLess(order.index(Charity), order.index(ImpactPlanCharity))
+
+    def test_scale(self):
+        """Test that --scale adds users with plans, allocations and summaries"""
+        self.seed()
+        self.seed("--no-fixtures", "--scale", "40", "--per-plan", "3")
+        plans = ImpactPlan.objects.filter(user__username__startswith="synthetic-")
+        self.assertEqual(plans.count(), 40)
+        self.assertEqual(
+            ImpactPlanCharity.objects.filter(impact_plan__in=plans).count(), 120
+        )
+
+        plan_ids = list(plans.values_list("pk", flat=True))
+        generated = summaries(plan_ids)
+        ImpactSummary.objects.refresh(plan_ids)
+        refreshed = summaries(plan_ids)
+        self.assertEqual([row[:3] for row in generated], [row[:3] for row in refreshed])
+        for row, expected in zip(generated, refreshed):
+            self.assertAlmostEqual(row[3], expected[3], places=6)
+
+        # Ids were assigned by the generator; new rows must not collide
+        User.objects.create(username="after-seeding")
+        load_fixtures(["users"])